@@ -1,44 +1,123 @@
-from fastapi import APIRouter, Depends, Query
+from fastapi import APIRouter, Depends, Query, HTTPException
 from typing import List, Dict, Any, Optional
 from datetime import date
-from planning import fake_shifts_db
-from auth import get_current_user
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+from database import get_db
+from models import Shift as DBShift
+from auth import TokenUser, get_token_user
 
 router = APIRouter(
     prefix="/agenda",
     tags=["agenda"]
 )
 
+# Only the columns the agenda renders; avoids loading full ORM objects and relationships
+AGENDA_COLUMNS = (
+    DBShift.id,
+    DBShift.datum,
+    DBShift.start_tijd,
+    DBShift.eind_tijd,
+    DBShift.location_id,
+    DBShift.locatie,
+    DBShift.status,
+    DBShift.medewerker_id,
+    DBShift.titel,
+)
+
+
+def _date_range_filter(query, start_date: Optional[date], end_date: Optional[date]):
+    """Beperk een query tot een datumbereik op de geïndexeerde kolom shifts.datum."""
+    if start_date and end_date and start_date > end_date:
+        raise HTTPException(status_code=400, detail="start_date mag niet na end_date liggen")
+    if start_date:
+        query = query.filter(DBShift.datum >= start_date)
+    if end_date:
+        query = query.filter(DBShift.datum <= end_date)
+    return query
+
+
+def _grouped_shifts(db: Session, start_date: Optional[date], end_date: Optional[date]) -> Dict[str, List[Any]]:
+    """
+    Haal shifts op binnen het bereik, gesorteerd op (status, datum, start_tijd) in SQL,
+    zodat het groeperen per status een enkele lineaire doorloop is.
+    """
+    agenda = {
+        "approved": [],
+        "pending": [],
+        "rejected": []
+    }
+
+    query = _date_range_filter(db.query(*AGENDA_COLUMNS), start_date, end_date)
+    rows = query.order_by(DBShift.status, DBShift.datum, DBShift.start_tijd).all()
+
+    for row in rows:
+        status = row.status or "pending"
+        agenda.setdefault(status, []).append({
+            "id": row.id,
+            "shift_date": row.datum.isoformat() if row.datum else None,
+            "start_time": row.start_tijd,
+            "end_time": row.eind_tijd,
+            "location_id": row.location_id,
+            "location": row.locatie,
+            "status": status,
+            "employee_id": row.medewerker_id,
+            "titel": row.titel or ""
+        })
+
+    return agenda
+
 
 @router.get("/")
-async def get_agenda(
+def get_agenda(
         start_date: Optional[date] = Query(None, description="Filter op startdatum"),
         end_date: Optional[date] = Query(None, description="Filter op einddatum"),
-        current_user: dict = Depends(get_current_user)
+        current_user: TokenUser = Depends(get_token_user),
+        db: Session = Depends(get_db)
 ) -> Dict[str, List[Any]]:
     """
     Geeft een agenda overzicht van shifts, gegroepeerd per status (approved, pending, rejected).
     Optioneel kun je filteren op een bepaalde periode.
     """
-    agenda = {
-        "approved": [],
-        "pending": [],
-        "rejected": []
+    return _grouped_shifts(db, start_date, end_date)
+
+
+@router.get("/calendar")
+def get_agenda_calendar(
+        start_date: date = Query(..., description="Eerste dag van de kalenderweergave"),
+        end_date: date = Query(..., description="Laatste dag van de kalenderweergave"),
+        current_user: TokenUser = Depends(get_token_user),
+        db: Session = Depends(get_db)
+) -> Dict[str, Any]:
+    """
+    Compacte kalenderweergave: per dag het aantal shifts per status, berekend met één GROUP BY.
+    De shifts zelf worden per dag opgehaald via /agenda/day/{datum}.
+    """
+    query = _date_range_filter(
+        db.query(DBShift.datum, DBShift.status, func.count(DBShift.id)),
+        start_date,
+        end_date
+    )
+    rows = query.group_by(DBShift.datum, DBShift.status).order_by(DBShift.datum).all()
+
+    days: Dict[str, Dict[str, Any]] = {}
+    for datum, status, count in rows:
+        day = days.setdefault(datum.isoformat(), {"date": datum.isoformat(), "total": 0, "per_status": {}})
+        day["per_status"][status or "pending"] = count
+        day["total"] += count
+
+    return {
+        "start_date": start_date.isoformat(),
+        "end_date": end_date.isoformat(),
+        "days": list(days.values())
     }
 
-    for shift in fake_shifts_db:
-        # Zorg dat de shift_date als een date-object beschikbaar is
-        shift_date = shift.get("shift_date")
-        if isinstance(shift_date, str):
-            shift_date = date.fromisoformat(shift_date)
-        if start_date and shift_date < start_date:
-            continue
-        if end_date and shift_date > end_date:
-            continue
-
-        status = shift.get("status", "pending")
-        if status not in agenda:
-            agenda[status] = []
-        agenda[status].append(shift)
 
-    return agenda
+@router.get("/day/{datum}")
+def get_agenda_day(
+        datum: date,
+        current_user: TokenUser = Depends(get_token_user),
+        db: Session = Depends(get_db)
+) -> Dict[str, List[Any]]:
+    """Haal de shifts van één dag op, gegroepeerd per status (detail bij de kalenderweergave)."""
+    return _grouped_shifts(db, datum, datum)
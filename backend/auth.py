@@ -1,14 +1,22 @@
 from datetime import datetime, timedelta
-from typing import Optional, List, Dict
-from fastapi import APIRouter, HTTPException, Depends, status
+from typing import Optional, List, Dict, NamedTuple, Tuple
+from fastapi import APIRouter, HTTPException, Depends, Request, status
+from fastapi.concurrency import run_in_threadpool
 from fastapi.security import OAuth2PasswordBearer, OAuth2PasswordRequestForm
 from pydantic import BaseModel, EmailStr, validator
 from jose import JWTError, jwt
 from passlib.context import CryptContext
-from sqlalchemy.orm import Session
-from database import get_db
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import selectinload
+from database import get_async_db, AsyncSessionLocal
 from models import User, Role, Medewerker
-from config import SECRET_KEY, ALGORITHM, ACCESS_TOKEN_EXPIRE_MINUTES
+from config import SECRET_KEY, ALGORITHM, ACCESS_TOKEN_EXPIRE_MINUTES, REFRESH_TOKEN_EXPIRE_DAYS
+from concurrent.futures import ThreadPoolExecutor
+from rate_limit import TokenBucketLimiter, client_ip, enforce
+import reference_cache
+import token_revocation
+import asyncio
 import logging
 import smtplib
 from email.mime.text import MIMEText
@@ -17,16 +25,40 @@ import secrets
 import string
 import re
 import os
+import time
 
-# Set up logging
-logging.basicConfig(level=logging.DEBUG)
 logger = logging.getLogger(__name__)
 
 router = APIRouter(tags=["auth"])
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/auth/token")
 
-# Password hashing configuration
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+# Password hashing configuration. Hashes with fewer rounds than BCRYPT_ROUNDS count as
+# deprecated and are replaced with a fresh hash at the user's next successful login.
+BCRYPT_ROUNDS = int(os.getenv("BCRYPT_ROUNDS", "12"))
+pwd_context = CryptContext(
+    schemes=["bcrypt"], deprecated="auto",
+    bcrypt__default_rounds=BCRYPT_ROUNDS, bcrypt__min_rounds=BCRYPT_ROUNDS
+)
+
+# bcrypt takes tens of milliseconds of CPU per call. It runs on its own small pool, off the event
+# loop and apart from the database threads, so a login storm queues here instead of stalling requests.
+PASSWORD_HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", "4"))
+_password_executor = ThreadPoolExecutor(max_workers=PASSWORD_HASH_WORKERS, thread_name_prefix="bcrypt")
+
+async def hash_password(password: str) -> str:
+    return await asyncio.get_running_loop().run_in_executor(_password_executor, pwd_context.hash, password)
+
+async def verify_and_update_password(plain_password: str, hashed_password: str) -> Tuple[bool, Optional[str]]:
+    """(valid, replacement hash or None); the replacement is set when the stored hash is deprecated."""
+    return await asyncio.get_running_loop().run_in_executor(
+        _password_executor, pwd_context.verify_and_update, plain_password, hashed_password
+    )
+
+# Token buckets, "<attempts>/<seconds>" (see rate_limit.py)
+login_ip_limiter = TokenBucketLimiter("login_ip", os.getenv("LOGIN_RATE_LIMIT_IP", "20/60"))
+login_user_limiter = TokenBucketLimiter("login_user", os.getenv("LOGIN_RATE_LIMIT_USER", "5/60"))
+forgot_password_ip_limiter = TokenBucketLimiter("forgot_password_ip", os.getenv("FORGOT_PASSWORD_RATE_LIMIT_IP", "5/900"))
+forgot_password_email_limiter = TokenBucketLimiter("forgot_password_email", os.getenv("FORGOT_PASSWORD_RATE_LIMIT_EMAIL", "3/3600"))
 
 # Email configuration
 # EMAIL_CONFIG = {
@@ -55,6 +87,10 @@ RESET_TOKEN_LENGTH = 32
 class Token(BaseModel):
     access_token: str
     token_type: str
+    refresh_token: Optional[str] = None
+
+class RefreshRequest(BaseModel):
+    refresh_token: str
 
 class TokenData(BaseModel):
     username: Optional[str] = None
@@ -126,13 +162,25 @@ class ResetPasswordRequest(BaseModel):
 def verify_password(plain_password: str, hashed_password: str) -> bool:
     return pwd_context.verify(plain_password, hashed_password)
 
-def get_user(db: Session, username: str):
-    return db.query(User).filter(User.username == username).first()
+async def get_user(db: AsyncSession, username: str):
+    # Roles are loaded eagerly: require_roles and most routes read them after the session is gone
+    result = await db.execute(
+        select(User).options(selectinload(User.roles)).where(User.username == username)
+    )
+    return result.scalars().first()
 
-def authenticate_user(db: Session, username: str, password: str) -> Optional[User]:
-    user = get_user(db, username)
-    if not user or not verify_password(password, user.hashed_password):
+async def authenticate_user(db: AsyncSession, username: str, password: str) -> Optional[User]:
+    user = await get_user(db, username)
+    if not user:
+        return None
+    valid, new_hash = await verify_and_update_password(password, user.hashed_password)
+    if not valid:
         return None
+    if new_hash:
+        # Stored with an older bcrypt cost
+        user.hashed_password = new_hash
+        await db.commit()
+        logger.info("Upgraded password hash of user %s", user.username)
     return user
 
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
@@ -141,34 +189,81 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
         expire = datetime.utcnow() + expires_delta
     else:
         expire = datetime.utcnow() + timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
-    to_encode.update({"exp": expire})
+    # Sub-second iat, so a token issued right after a revocation is not caught by it
+    to_encode.update({"exp": expire, "iat": round(time.time(), 3)})
     encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
     return encoded_jwt
 
-async def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)):
-    credentials_exception = HTTPException(
+def create_tokens(user: User) -> dict:
+    """Access token with the user's id and role names as claims, plus a refresh token; roles must be loaded."""
+    access_token = create_access_token(
+        data={"sub": user.username, "uid": user.id, "roles": [role.name for role in user.roles]},
+        expires_delta=timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
+    )
+    refresh_token = create_access_token(
+        data={"sub": user.username, "uid": user.id, "type": "refresh"},
+        expires_delta=timedelta(days=REFRESH_TOKEN_EXPIRE_DAYS)
+    )
+    return {"access_token": access_token, "token_type": "bearer", "refresh_token": refresh_token}
+
+def _credentials_exception() -> HTTPException:
+    return HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
         headers={"WWW-Authenticate": "Bearer"},
     )
+
+def decode_token(token: str, token_type: str = "access") -> dict:
+    """Verified claims of an unrevoked token of the given type; 401 otherwise."""
     try:
         payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-        username: str = payload.get("sub")
-        if username is None:
-            raise credentials_exception
-        token_data = TokenData(username=username)
     except JWTError:
-        raise credentials_exception
-    user = get_user(db, username=token_data.username)
+        raise _credentials_exception()
+    if payload.get("sub") is None or payload.get("type", "access") != token_type:
+        raise _credentials_exception()
+    if token_revocation.is_revoked(payload.get("uid"), payload.get("iat")):
+        raise _credentials_exception()
+    return payload
+
+async def get_current_user(token: str = Depends(oauth2_scheme), db: AsyncSession = Depends(get_async_db)):
+    payload = decode_token(token)
+    token_data = TokenData(username=payload["sub"])
+    user = await get_user(db, username=token_data.username)
     if user is None:
-        raise credentials_exception
+        raise _credentials_exception()
     return user
 
 async def get_current_active_user(current_user: User = Depends(get_current_user)):
     return current_user
 
+class RoleClaim(NamedTuple):
+    name: str
+
+class TokenUser:
+    """
+    The caller as described by the access token, for authorization without a query. Offers the
+    attributes role checks read from a User: id, username and roles (objects with a .name).
+    """
+    __slots__ = ("id", "username", "roles")
+
+    def __init__(self, id: int, username: str, roles: List[str]):
+        self.id = id
+        self.username = username
+        self.roles = [RoleClaim(name) for name in roles]
+
+async def get_token_user(token: str = Depends(oauth2_scheme)) -> TokenUser:
+    payload = decode_token(token)
+    if "uid" in payload and "roles" in payload:
+        return TokenUser(payload["uid"], payload["sub"], payload["roles"])
+    # Issued before tokens carried claims; these expire within ACCESS_TOKEN_EXPIRE_MINUTES
+    async with AsyncSessionLocal() as db:
+        user = await get_user(db, payload["sub"])
+    if user is None:
+        raise _credentials_exception()
+    return TokenUser(user.id, user.username, [role.name for role in user.roles])
+
 def require_roles(required_roles: List[str]):
-    async def role_checker(current_user: User = Depends(get_current_user)):
+    async def role_checker(current_user: TokenUser = Depends(get_token_user)):
         user_roles = [role.name for role in current_user.roles]
         logger.debug(f"User roles: {user_roles}, Required roles: {required_roles}")
         if not any(role in user_roles for role in required_roles):
@@ -181,21 +276,28 @@ def require_roles(required_roles: List[str]):
 
 @router.post("/auth/token", response_model=Token)
 async def login_for_access_token(
+    request: Request,
     form_data: OAuth2PasswordRequestForm = Depends(),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
-    user = authenticate_user(db, form_data.username, form_data.password)
+    enforce((login_ip_limiter, client_ip(request)), (login_user_limiter, form_data.username.lower()))
+    user = await authenticate_user(db, form_data.username, form_data.password)
     if not user:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Incorrect username or password",
             headers={"WWW-Authenticate": "Bearer"},
         )
-    access_token_expires = timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
-    access_token = create_access_token(
-        data={"sub": user.username}, expires_delta=access_token_expires
-    )
-    return {"access_token": access_token, "token_type": "bearer"}
+    return create_tokens(user)
+
+@router.post("/auth/refresh", response_model=Token)
+async def refresh_access_token(request: RefreshRequest, db: AsyncSession = Depends(get_async_db)):
+    """New access and refresh token for a valid refresh token, with the user's current roles."""
+    payload = decode_token(request.refresh_token, token_type="refresh")
+    user = await get_user(db, payload["sub"])
+    if user is None or user.id != payload.get("uid"):
+        raise _credentials_exception()
+    return create_tokens(user)
 
 @router.get("/users/me", response_model=UserResponse)
 async def read_users_me(current_user: User = Depends(get_current_active_user)):
@@ -205,36 +307,32 @@ async def read_users_me(current_user: User = Depends(get_current_active_user)):
 @router.post("/users/", response_model=UserResponse)
 async def create_user(
     user: UserCreate, 
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user: dict = Depends(require_roles(["admin"]))
 ):
     logger.info(f"Starting user creation process for username: {user.username}")
     logger.info(f"Role requested: '{user.role}'")
     
     try:
-        # Start a transaction
-        db.begin()
-        logger.info("Transaction started")
-        
-        # Check if username already exists
-        db_user = db.query(User).filter(User.username == user.username).first()
+        # Check if username already exists (the session begins its transaction on first use)
+        db_user = (await db.execute(select(User.id).where(User.username == user.username))).first()
         if db_user:
             logger.warning(f"Username {user.username} already exists")
             raise HTTPException(status_code=400, detail="Username already registered")
         
         # Check if email already exists in both User and Medewerker tables
-        existing_email_user = db.query(User).filter(User.email == user.email).first()
+        existing_email_user = (await db.execute(select(User.id).where(User.email == user.email))).first()
         if existing_email_user:
             logger.warning(f"Email {user.email} already exists in users table")
             raise HTTPException(status_code=400, detail="Email address already registered")
             
-        existing_email_employee = db.query(Medewerker).filter(Medewerker.email == user.email).first()
+        existing_email_employee = (await db.execute(select(Medewerker.id).where(Medewerker.email == user.email))).first()
         if existing_email_employee:
             logger.warning(f"Email {user.email} already exists in medewerkers table")
             raise HTTPException(status_code=400, detail="Email address already registered")
         
         # Get the role
-        role = db.query(Role).filter(Role.name == user.role).first()
+        role = (await db.execute(select(Role).where(Role.name == user.role))).scalars().first()
         if not role:
             logger.error(f"Role '{user.role}' not found")
             raise HTTPException(status_code=404, detail="Role not found")
@@ -243,23 +341,23 @@ async def create_user(
         
         # Create the user
         logger.info("Creating user account...")
-        hashed_password = pwd_context.hash(user.password)
+        hashed_password = await hash_password(user.password)
         db_user = User(
             username=user.username,
             email=user.email,
             hashed_password=hashed_password,
             full_name=user.full_name
         )
-        db_user.roles.append(role)
+        db_user.roles = [role]
         db.add(db_user)
         try:
-            db.flush()  # Flush to get the user ID without committing
+            await db.flush()  # Flush to get the user ID without committing
             logger.info(f"Successfully created user account: {db_user.username}")
         except Exception as e:
             logger.error(f"Failed to create user account: {str(e)}")
             logger.error(f"Error type: {type(e)}")
             logger.error(f"Error details: {e.__dict__ if hasattr(e, '__dict__') else 'No details available'}")
-            db.rollback()
+            await db.rollback()
             raise HTTPException(status_code=500, detail=f"Failed to create user account: {str(e)}")
         
         # If the role is employee, create an employee profile
@@ -309,61 +407,77 @@ async def create_user(
                 logger.info(f"Created Medewerker object: {employee.__dict__}")
                 db.add(employee)
                 try:
-                    db.flush()  # Flush to check for any constraint violations
+                    await db.flush()  # Flush to check for any constraint violations
                     logger.info(f"Successfully created employee profile for: {db_user.username}")
                 except Exception as e:
                     logger.error(f"Failed to create employee profile: {str(e)}")
                     logger.error(f"Error type: {type(e)}")
                     logger.error(f"Error details: {e.__dict__ if hasattr(e, '__dict__') else 'No details available'}")
-                    db.rollback()
+                    await db.rollback()
                     raise HTTPException(status_code=500, detail=f"Failed to create employee profile: {str(e)}")
             except Exception as e:
                 logger.error(f"Failed to create employee profile: {str(e)}")
                 logger.error(f"Error type: {type(e)}")
                 logger.error(f"Error details: {e.__dict__ if hasattr(e, '__dict__') else 'No details available'}")
-                db.rollback()
+                await db.rollback()
                 raise HTTPException(status_code=500, detail=f"Failed to create employee profile: {str(e)}")
         
         # Commit the transaction
         try:
-            db.commit()
+            await db.commit()
             logger.info("Transaction committed successfully")
         except Exception as e:
             logger.error(f"Failed to commit transaction: {str(e)}")
             logger.error(f"Error type: {type(e)}")
             logger.error(f"Error details: {e.__dict__ if hasattr(e, '__dict__') else 'No details available'}")
-            db.rollback()
+            await db.rollback()
             raise HTTPException(status_code=500, detail=f"Failed to commit transaction: {str(e)}")
         
         return db_user
     except HTTPException:
-        db.rollback()
+        await db.rollback()
         raise
     except Exception as e:
         logger.error(f"Unexpected error in create_user: {str(e)}")
         logger.error(f"Error type: {type(e)}")
         logger.error(f"Error details: {e.__dict__ if hasattr(e, '__dict__') else 'No details available'}")
-        db.rollback()
+        await db.rollback()
         raise HTTPException(status_code=500, detail=str(e))
 
 @router.post("/roles/", response_model=RoleResponse)
-async def create_role(role: RoleCreate, current_user: dict = Depends(require_roles(["admin"]))):
-    db = next(get_db())
+async def create_role(
+    role: RoleCreate,
+    current_user: dict = Depends(require_roles(["admin"])),
+    db: AsyncSession = Depends(get_async_db)
+):
     db_role = Role(name=role.name, permissions=role.permissions)
     db.add(db_role)
-    db.commit()
-    db.refresh(db_role)
+    await db.commit()
+    reference_cache.bump("roles")
+    await db.refresh(db_role)
     return db_role
 
 @router.get("/roles/", response_model=List[RoleResponse])
-async def get_roles(current_user: dict = Depends(require_roles(["admin"]))):
-    db = next(get_db())
-    return db.query(Role).all()
+async def get_roles(
+    request: Request,
+    current_user: dict = Depends(require_roles(["admin"])),
+    db: AsyncSession = Depends(get_async_db)
+):
+    async def load():
+        rows = (await db.execute(select(Role.id, Role.name, Role.permissions))).all()
+        return [{"id": row.id, "name": row.name, "permissions": row.permissions} for row in rows]
+
+    return await reference_cache.cached_response_async(request, ("roles",), load)
 
 @router.delete("/roles/{role_id}", response_model=RoleResponse)
-async def delete_role(role_id: int, current_user: dict = Depends(require_roles(["admin"]))):
-    db = next(get_db())
-    role = db.query(Role).filter(Role.id == role_id).first()
+async def delete_role(
+    role_id: int,
+    current_user: dict = Depends(require_roles(["admin"])),
+    db: AsyncSession = Depends(get_async_db)
+):
+    role = (await db.execute(
+        select(Role).options(selectinload(Role.users)).where(Role.id == role_id)
+    )).scalars().first()
     if not role:
         raise HTTPException(status_code=404, detail="Role not found")
     
@@ -371,8 +485,9 @@ async def delete_role(role_id: int, current_user: dict = Depends(require_roles([
     if role.users:
         raise HTTPException(status_code=400, detail="Cannot delete role that is assigned to users")
     
-    db.delete(role)
-    db.commit()
+    await db.delete(role)
+    await db.commit()
+    reference_cache.bump("roles")
     return role
 
 def generate_reset_token() -> str:
@@ -423,9 +538,10 @@ def send_reset_email(email: str, token: str):
         )
 
 @router.post("/auth/forgot-password")
-async def forgot_password(request: ForgotPasswordRequest, db: Session = Depends(get_db)):
+async def forgot_password(request: ForgotPasswordRequest, http_request: Request, db: AsyncSession = Depends(get_async_db)):
     """Handle password reset request."""
-    user = db.query(User).filter(User.email == request.email).first()
+    enforce((forgot_password_ip_limiter, client_ip(http_request)), (forgot_password_email_limiter, request.email.lower()))
+    user = (await db.execute(select(User).where(User.email == request.email))).scalars().first()
     
     # Always return success even if email doesn't exist (security best practice)
     if user:
@@ -436,21 +552,21 @@ async def forgot_password(request: ForgotPasswordRequest, db: Session = Depends(
         # Store token in user record
         user.reset_token = reset_token
         user.reset_token_expiry = token_expiry
-        db.commit()
+        await db.commit()
         
-        # Send reset email
-        send_reset_email(user.email, reset_token)
+        # Send reset email (SMTP is blocking, keep it off the event loop)
+        await run_in_threadpool(send_reset_email, user.email, reset_token)
     
     return {"message": "If an account exists with this email, you will receive password reset instructions."}
 
 @router.post("/auth/reset-password")
-async def reset_password(request: ResetPasswordRequest, db: Session = Depends(get_db)):
+async def reset_password(request: ResetPasswordRequest, db: AsyncSession = Depends(get_async_db)):
     """Handle password reset with token."""
     # Find user with valid reset token
-    user = db.query(User).filter(
+    user = (await db.execute(select(User).where(
         User.reset_token == request.token,
         User.reset_token_expiry > datetime.utcnow()
-    ).first()
+    ))).scalars().first()
     
     if not user:
         raise HTTPException(
@@ -459,9 +575,10 @@ async def reset_password(request: ResetPasswordRequest, db: Session = Depends(ge
         )
     
     # Update password
-    user.hashed_password = pwd_context.hash(request.password)
+    user.hashed_password = await hash_password(request.password)
     user.reset_token = None
     user.reset_token_expiry = None
-    db.commit()
+    await token_revocation.revoke_user_tokens_async(db, user.id)
+    await db.commit()
     
     return {"message": "Password has been reset successfully"}
@@ -4,8 +4,17 @@ from typing import List, Optional
 from auth import require_roles
 from database import get_db
 from sqlalchemy.orm import Session
-from models import AutoApproval, User, Shift, Location, AutoApprovalGlobalConfig, LocationAutoApprovalConfig
-from datetime import datetime, timedelta
+from sqlalchemy import and_
+from models import (
+    AutoApproval, User, Shift, Location, AutoApprovalGlobalConfig, LocationAutoApprovalConfig,
+    EmployeeLocationExperience, Dienstaanvraag
+)
+from datetime import datetime, timedelta, date
+from typing import Dict
+import logging
+import time
+
+logger = logging.getLogger(__name__)
 
 router = APIRouter(
     prefix="/auto_approval",
@@ -37,7 +46,7 @@ class LocationConfig(BaseModel):
         orm_mode = True
 
 @router.get("/", response_model=List[AutoApprovalSetting])
-async def get_auto_approval_settings(
+def get_auto_approval_settings(
     employee_id: Optional[str] = Query(None),
     location: Optional[str] = Query(None),
     current_user: User = Depends(require_roles(["planner", "admin"])),
@@ -50,8 +59,16 @@ async def get_auto_approval_settings(
         query = query.filter(AutoApproval.location == location)
     return query.all()
 
+@router.get("/pending-eligibility", response_model=Dict[int, bool])
+def get_pending_eligibility(
+    current_user: User = Depends(require_roles(["planner", "admin"])),
+    db: Session = Depends(get_db)
+):
+    """Auto-approval-uitkomst per openstaande dienstaanvraag (aanvraag_id -> bool), in één query."""
+    return evaluate_pending_requests(db)
+
 @router.get("/{setting_id}", response_model=AutoApprovalSetting)
-async def get_auto_approval_setting(
+def get_auto_approval_setting(
     setting_id: int,
     current_user: User = Depends(require_roles(["planner", "admin"])),
     db: Session = Depends(get_db)
@@ -62,22 +79,17 @@ async def get_auto_approval_setting(
     return setting
 
 @router.post("/", response_model=AutoApprovalSetting, status_code=201)
-async def create_auto_approval_setting(
+def create_auto_approval_setting(
     setting: AutoApprovalSetting,
     current_user: User = Depends(require_roles(["planner", "admin"])),
     db: Session = Depends(get_db)
 ):
-    print(f"Creating auto-approval setting: {setting}")
-    
     # Verify the employee exists - check both id and username
     employee = db.query(User).filter(
         (User.id == setting.employee_id) | (User.username == setting.employee_id)
     ).first()
     
     if not employee:
-        # Try to find the employee to give a helpful message
-        all_employees = db.query(User).all()
-        print("Available employees:", [(e.id, e.username) for e in all_employees])
         raise HTTPException(
             status_code=404, 
             detail=f"Employee with ID {setting.employee_id} not found. Please use either the employee's ID or username."
@@ -89,9 +101,6 @@ async def create_auto_approval_setting(
     # Verify the location exists
     location = db.query(Location).filter(Location.naam == setting.location).first()
     if not location:
-        # List available locations for debugging
-        all_locations = db.query(Location).all()
-        print("Available locations:", [loc.naam for loc in all_locations])
         raise HTTPException(
             status_code=404, 
             detail=f"Location {setting.location} not found. Please check the location name."
@@ -108,7 +117,7 @@ async def create_auto_approval_setting(
         existing_setting.auto_approve = setting.auto_approve
         db.commit()
         db.refresh(existing_setting)
-        print(f"Updated existing auto-approval setting: {existing_setting.__dict__}")
+        logger.info("Updated auto-approval for %s at %s: %s", setting.employee_id, setting.location, setting.auto_approve)
         return existing_setting
     
     # Create new setting
@@ -122,15 +131,15 @@ async def create_auto_approval_setting(
     try:
         db.commit()
         db.refresh(db_setting)
-        print(f"Created new auto-approval setting: {db_setting.__dict__}")
+        logger.info("Created auto-approval for %s at %s: %s", setting.employee_id, setting.location, setting.auto_approve)
         return db_setting
     except Exception as e:
         db.rollback()
-        print(f"Error creating auto-approval setting: {str(e)}")
+        logger.exception("Error creating auto-approval setting")
         raise HTTPException(status_code=500, detail=f"Failed to create auto-approval setting: {str(e)}")
 
 @router.put("/{setting_id}", response_model=AutoApprovalSetting)
-async def update_auto_approval_setting(
+def update_auto_approval_setting(
     setting_id: int,
     setting: AutoApprovalSetting,
     current_user: User = Depends(require_roles(["planner", "admin"])),
@@ -149,7 +158,7 @@ async def update_auto_approval_setting(
     return db_setting
 
 @router.delete("/{setting_id}", response_model=AutoApprovalSetting)
-async def delete_auto_approval_setting(
+def delete_auto_approval_setting(
     setting_id: int,
     current_user: User = Depends(require_roles(["planner", "admin"])),
     db: Session = Depends(get_db)
@@ -164,7 +173,7 @@ async def delete_auto_approval_setting(
 
 # Global Configuration Endpoints
 @router.get("/global-config", response_model=GlobalConfig)
-async def get_global_config(
+def get_global_config(
     current_user: User = Depends(require_roles(["admin"])),
     db: Session = Depends(get_db)
 ):
@@ -178,7 +187,7 @@ async def get_global_config(
     return config
 
 @router.put("/global-config", response_model=GlobalConfig)
-async def update_global_config(
+def update_global_config(
     config: GlobalConfig,
     current_user: User = Depends(require_roles(["admin"])),
     db: Session = Depends(get_db)
@@ -193,11 +202,12 @@ async def update_global_config(
     
     db.commit()
     db.refresh(db_config)
+    invalidate_config_cache()
     return db_config
 
 # Location Configuration Endpoints
 @router.get("/location-config/{location_id}", response_model=LocationConfig)
-async def get_location_config(
+def get_location_config(
     location_id: int,
     current_user: User = Depends(require_roles(["admin", "planner"])),
     db: Session = Depends(get_db)
@@ -214,7 +224,7 @@ async def get_location_config(
     return config
 
 @router.put("/location-config/{location_id}", response_model=LocationConfig)
-async def update_location_config(
+def update_location_config(
     location_id: int,
     config: LocationConfig,
     current_user: User = Depends(require_roles(["admin", "planner"])),
@@ -232,96 +242,198 @@ async def update_location_config(
     
     db.commit()
     db.refresh(db_config)
+    invalidate_config_cache()
     return db_config
 
+# In-process cache of the (rarely changing) auto-approval configuration.
+# Refreshed after CONFIG_CACHE_TTL_SECONDS so other workers pick up changes, and
+# invalidated immediately in this worker when the config endpoints write.
+CONFIG_CACHE_TTL_SECONDS = 60
+DEFAULT_GLOBAL_CONFIG = (True, 3)  # (enable_experience_based_approval, default_priority_window_hours)
+DEFAULT_LOCATION_CONFIG = (True, None)  # (enable_experience_based_approval, priority_window_hours)
+RECENT_EXPERIENCE_DAYS = 30
+
+# Which auto-approval rule applies, strongest first; decides contended claim windows (shift_claims.py)
+PRIORITY_AUTO_APPROVE = 1
+PRIORITY_EXPERIENCE = 2
+PRIORITY_RECENT = 3
+
+_config_cache = {"loaded_at": 0.0, "global": DEFAULT_GLOBAL_CONFIG, "locations": {}, "location_ids": {}}
+
+
+def invalidate_config_cache():
+    _config_cache["loaded_at"] = 0.0
+
+
+def _get_configs(db: Session) -> dict:
+    """Laad globale config, locatieconfigs en locatienaam -> id in drie kleine queries, hooguit eens per TTL."""
+    if time.monotonic() - _config_cache["loaded_at"] < CONFIG_CACHE_TTL_SECONDS:
+        return _config_cache
+
+    global_row = db.query(
+        AutoApprovalGlobalConfig.enable_experience_based_approval,
+        AutoApprovalGlobalConfig.default_priority_window_hours
+    ).first()
+    _config_cache["global"] = tuple(global_row) if global_row else DEFAULT_GLOBAL_CONFIG
+    _config_cache["locations"] = {
+        row.location_id: (row.enable_experience_based_approval, row.priority_window_hours)
+        for row in db.query(
+            LocationAutoApprovalConfig.location_id,
+            LocationAutoApprovalConfig.enable_experience_based_approval,
+            LocationAutoApprovalConfig.priority_window_hours
+        )
+    }
+    _config_cache["location_ids"] = {row.naam: row.id for row in db.query(Location.id, Location.naam)}
+    _config_cache["loaded_at"] = time.monotonic()
+    return _config_cache
+
+
+def _location_id(db: Session, configs: dict, location: str) -> Optional[int]:
+    location_id = configs["location_ids"].get(location)
+    if location_id is None:
+        # Location created after the cache was filled
+        row = db.query(Location.id).filter(Location.naam == location).first()
+        if row:
+            location_id = configs["location_ids"][location] = row.id
+    return location_id
+
+
+def _approval_priority(
+    configs: dict,
+    location_id: int,
+    auto_approve: bool,
+    completed_count: Optional[int],
+    last_completed_date: Optional[date],
+    shift_date: Optional[date]
+) -> Optional[int]:
+    """Beslisregels voor auto-approval, los van hoe de gegevens zijn opgehaald: de PRIORITY_* van
+    de eerste regel die geldt, of None als de aanvraag niet automatisch goedgekeurd wordt."""
+    # 1. Per-employee, per-location auto-approval setting
+    if auto_approve:
+        return PRIORITY_AUTO_APPROVE
+
+    global_enabled, default_window = configs["global"]
+    location_enabled, location_window = configs["locations"].get(location_id, DEFAULT_LOCATION_CONFIG)
+
+    # 2. Location experience (if enabled)
+    if global_enabled and location_enabled and completed_count:
+        return PRIORITY_EXPERIENCE
+
+    # 3. Priority for recently worked employees, while the shift is within the priority window
+    if shift_date is None or last_completed_date is None:
+        return None
+    if last_completed_date < datetime.now().date() - timedelta(days=RECENT_EXPERIENCE_DAYS):
+        return None
+    priority_window = location_window if location_window is not None else default_window
+    shift_creation_time = datetime.combine(shift_date, datetime.min.time())
+    if datetime.now() - shift_creation_time <= timedelta(hours=priority_window):
+        return PRIORITY_RECENT
+    return None
+
+
+def _is_eligible(*args) -> bool:
+    return _approval_priority(*args) is not None
+
+
 def check_auto_approval_eligibility(
     db: Session,
     employee_id: str,
     location: str,
-    shift_id: int
+    shift_id: int,
+    shift_date: Optional[date] = None
 ) -> bool:
     """
     Check if a shift request should be auto-approved based on:
-    1. Per-employee, per-location auto-approval settings
+    1. Per-employee, per-location auto-approval setting
     2. Location experience (if enabled)
     3. Priority for recently worked employees
     """
-    # Get global configuration
-    global_config = db.query(AutoApprovalGlobalConfig).first()
-    if not global_config:
-        global_config = AutoApprovalGlobalConfig()
-        db.add(global_config)
-        db.commit()
-        db.refresh(global_config)
-
-    # Get location configuration
-    location_obj = db.query(Location).filter(Location.naam == location).first()
-    if not location_obj:
-        return False
+    return auto_approval_priority(db, employee_id, location, shift_id, shift_date) is not None
 
-    location_config = db.query(LocationAutoApprovalConfig).filter(
-        LocationAutoApprovalConfig.location_id == location_obj.id
-    ).first()
-    if not location_config:
-        location_config = LocationAutoApprovalConfig(location_id=location_obj.id)
-        db.add(location_config)
-        db.commit()
-        db.refresh(location_config)
 
-    # Get the employee to ensure we have their username
-    employee = db.query(User).filter(
-        (User.id == employee_id) | (User.username == employee_id)
-    ).first()
-    if not employee:
-        return False
+def auto_approval_priority(
+    db: Session,
+    employee_id: str,
+    location: str,
+    shift_id: int,
+    shift_date: Optional[date] = None
+) -> Optional[int]:
+    """
+    The PRIORITY_* of the first auto-approval rule that applies, None when none does.
 
-    # Use the employee's username for consistency
-    employee_username = employee.username
+    employee_id is the username. Configuration comes from the in-process cache and the
+    experience from employee_location_experience, so this is a single indexed lookup.
+    """
+    configs = _get_configs(db)
+    location_id = _location_id(db, configs, location)
+    if location_id is None:
+        return None
 
-    # Check per-employee, per-location auto-approval setting
-    auto_approval = db.query(AutoApproval).filter(
-        AutoApproval.employee_id == employee_username,  # Use username
+    auto_approve = db.query(AutoApproval.id).filter(
+        AutoApproval.employee_id == employee_id,
         AutoApproval.location == location,
         AutoApproval.auto_approve == True
-    ).first()
-    
-    if auto_approval:
-        return True
-    
-    # Check if experience-based approval is enabled
-    if (global_config.enable_experience_based_approval and 
-        location_config.enable_experience_based_approval):
-        # Check if employee has worked at this location before
-        previous_shifts = db.query(Shift).filter(
-            Shift.medewerker_id == employee_username,  # Use username
-            Shift.locatie == location,
-            Shift.status == "completed"
-        ).count()
-        
-        if previous_shifts > 0:
-            return True
-    
-    # Check if employee has worked at this location recently (within priority window)
-    shift = db.query(Shift).filter(Shift.id == shift_id).first()
-    if not shift:
-        return False
-        
-    recent_shifts = db.query(Shift).filter(
-        Shift.medewerker_id == employee_username,  # Use username
-        Shift.locatie == location,
-        Shift.status == "completed",
-        Shift.datum >= datetime.now().date() - timedelta(days=30)  # Last 30 days
-    ).order_by(Shift.datum.desc()).first()
-    
-    if recent_shifts:
-        # Use location-specific priority window if set, otherwise use global default
-        priority_window = (location_config.priority_window_hours 
-                         if location_config.priority_window_hours is not None 
-                         else global_config.default_priority_window_hours)
-        
-        # If the shift was created within the priority window
-        shift_creation_time = datetime.combine(shift.datum, datetime.min.time())
-        if datetime.now() - shift_creation_time <= timedelta(hours=priority_window):
-            return True
-    
-    return False
+    ).exists()
+    experience = db.query(EmployeeLocationExperience).filter(
+        EmployeeLocationExperience.employee_id == employee_id,
+        EmployeeLocationExperience.location_id == location_id
+    )
+    columns = [
+        auto_approve.label("auto_approve"),
+        experience.with_entities(EmployeeLocationExperience.completed_count).scalar_subquery().label("completed_count"),
+        experience.with_entities(EmployeeLocationExperience.last_completed_date).scalar_subquery().label("last_completed_date"),
+    ]
+    if shift_date is None:
+        columns.append(db.query(Shift.datum).filter(Shift.id == shift_id).scalar_subquery().label("shift_date"))
+    row = db.query(*columns).one()
+
+    return _approval_priority(
+        configs,
+        location_id,
+        bool(row.auto_approve),
+        row.completed_count,
+        row.last_completed_date,
+        shift_date if shift_date is not None else row.shift_date
+    )
+
+
+def evaluate_pending_requests(db: Session) -> Dict[int, bool]:
+    """Bepaal de auto-approval-uitkomst voor alle openstaande dienstaanvragen in één query."""
+    configs = _get_configs(db)
+    rows = db.query(
+        Dienstaanvraag.id,
+        Shift.location_id,
+        Shift.datum,
+        AutoApproval.id.label("auto_approval_id"),
+        EmployeeLocationExperience.completed_count,
+        EmployeeLocationExperience.last_completed_date
+    ).join(
+        Shift, Shift.id == Dienstaanvraag.shift_id
+    ).outerjoin(
+        AutoApproval,
+        and_(
+            AutoApproval.employee_id == Dienstaanvraag.employee_id,
+            AutoApproval.location == Shift.locatie,
+            AutoApproval.auto_approve == True
+        )
+    ).outerjoin(
+        EmployeeLocationExperience,
+        and_(
+            EmployeeLocationExperience.employee_id == Dienstaanvraag.employee_id,
+            EmployeeLocationExperience.location_id == Shift.location_id
+        )
+    ).filter(Dienstaanvraag.status == "requested").all()
+
+    results: Dict[int, bool] = {}
+    for row in rows:
+        eligible = row.location_id is not None and _is_eligible(
+            configs,
+            row.location_id,
+            row.auto_approval_id is not None,
+            row.completed_count,
+            row.last_completed_date,
+            row.datum
+        )
+        # A request can join several matching settings; any match approves it
+        results[row.id] = results.get(row.id, False) or eligible
+    return results
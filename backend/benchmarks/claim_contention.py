@@ -0,0 +1,144 @@
+"""
+Concurrency benchmark for shift claiming.
+
+Fires N parallel claims against one open shift and checks that exactly one
+claimant wins, then reports latency percentiles. Runs against a throwaway
+SQLite file by default; pass --url to hit a real MySQL database.
+
+With --window the claims are held in a closed claim window with mixed
+priorities instead, and N workers settle it at once: exactly one must award
+the shift, to the strongest claim.
+
+    python benchmarks/claim_contention.py --claims 500 --workers 64
+    python benchmarks/claim_contention.py --window
+    python benchmarks/claim_contention.py --url mysql+pymysql://user:pw@localhost/planner_bench
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# database.py builds its engine at import time; point it somewhere harmless
+os.environ.setdefault("DATABASE_URL", "sqlite://")
+
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker
+from models import Base, User, Opdrachtgever, Location, Shift, Dienstaanvraag
+from shift_claims import claim_shift, reject_competing_requests, settle_claim_window
+
+TABLES = [User.__table__, Opdrachtgever.__table__, Location.__table__, Shift.__table__, Dienstaanvraag.__table__]
+
+
+def priority(i: int) -> int:
+    # bench2 is the first claim with the strongest priority
+    return 3 - i % 3
+
+
+def setup(engine, claims: int, window: bool = False) -> int:
+    Base.metadata.drop_all(bind=engine, tables=list(reversed(TABLES)))
+    Base.metadata.create_all(bind=engine, tables=TABLES)
+    Session = sessionmaker(bind=engine)
+    db = Session()
+    try:
+        db.add_all([User(username=f"bench{i}", email=f"bench{i}@example.com", full_name=f"Bench {i}")
+                    for i in range(claims)])
+        client = Opdrachtgever(naam="Bench", email="bench-client@example.com")
+        db.add(client)
+        db.flush()
+        location = Location(naam="Bench locatie", opdrachtgever_id=client.id)
+        db.add(location)
+        db.flush()
+        shift = Shift(datum=date.today(), start_tijd="08:00", eind_tijd="16:00",
+                      location_id=location.id, locatie=location.naam, status="open")
+        db.add(shift)
+        db.flush()
+        opened_at = datetime.utcnow() - timedelta(hours=1)
+        db.add_all([Dienstaanvraag(shift_id=shift.id, employee_id=f"bench{i}", opdrachtgever_id=client.id,
+                                   aanvraag_date=date.today(), status="requested",
+                                   requested_at=opened_at + timedelta(milliseconds=i),
+                                   claim_priority=priority(i) if window else None)
+                    for i in range(claims)])
+        db.commit()
+        return shift.id
+    finally:
+        db.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", help="Database URL (default: temporary SQLite file)")
+    parser.add_argument("--claims", type=int, default=300, help="Number of parallel claims")
+    parser.add_argument("--workers", type=int, default=64, help="Thread pool size")
+    parser.add_argument("--window", action="store_true", help="Settle a closed claim window in parallel instead")
+    args = parser.parse_args()
+
+    url = args.url or "sqlite:///" + os.path.join(tempfile.mkdtemp(), "claim_bench.db")
+    if url.startswith("sqlite"):
+        engine = create_engine(url, connect_args={"timeout": 30, "check_same_thread": False})
+    else:
+        engine = create_engine(url, pool_size=args.workers, max_overflow=0)
+    if url.startswith("sqlite"):
+        # Take the write lock up front so SQLite behaves like a row lock instead of failing on upgrade
+        @event.listens_for(engine, "begin")
+        def _begin_immediate(conn):
+            conn.exec_driver_sql("BEGIN IMMEDIATE")
+
+        @event.listens_for(engine, "connect")
+        def _disable_pysqlite_transactions(dbapi_conn, _):
+            dbapi_conn.isolation_level = None
+
+    shift_id = setup(engine, args.claims, args.window)
+    Session = sessionmaker(bind=engine)
+
+    def attempt(i: int):
+        db = Session()
+        started = time.perf_counter()
+        try:
+            if args.window:
+                won = settle_claim_window(db, shift_id) is not None
+            else:
+                won = claim_shift(db, shift_id, f"bench{i}", "assigned")
+                if won:
+                    reject_competing_requests(db, shift_id)
+                db.commit()
+            return won, time.perf_counter() - started
+        finally:
+            db.close()
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.workers) as pool:
+        results = list(pool.map(attempt, range(args.claims)))
+    elapsed = time.perf_counter() - started
+
+    winners = sum(1 for won, _ in results if won)
+    latencies = sorted(latency for _, latency in results)
+
+    def pct(p):
+        return latencies[min(len(latencies) - 1, int(len(latencies) * p))] * 1000
+
+    db = Session()
+    shift = db.query(Shift).get(shift_id)
+    open_requests = db.query(Dienstaanvraag).filter(Dienstaanvraag.status == "requested").count()
+    db.close()
+
+    print(f"claims:      {args.claims} ({args.workers} workers) against {engine.url.get_backend_name()}")
+    print(f"winners:     {winners}  (assigned to {shift.medewerker_id}, status {shift.status})")
+    print(f"open reqs:   {open_requests} after set-based rejection")
+    print(f"wall time:   {elapsed * 1000:.1f} ms  ({args.claims / elapsed:.0f} claims/s)")
+    print(f"latency ms:  p50 {pct(0.50):.2f}  p95 {pct(0.95):.2f}  p99 {pct(0.99):.2f}  max {latencies[-1] * 1000:.2f}")
+
+    if winners != 1:
+        print("FAIL: expected exactly one winner")
+        sys.exit(1)
+    if args.window and shift.medewerker_id != "bench2":
+        print("FAIL: expected the strongest claim (bench2) to win")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
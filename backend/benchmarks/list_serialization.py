@@ -0,0 +1,122 @@
+"""
+Per-row cost of serving a large shift list.
+
+Compares the old path of GET /planning/ (ORM objects with their location,
+ShiftResponse per row, response_model validation and jsonable_encoder, then
+json.dumps) with the fast path (column projection, plain dicts, orjson via
+FastJSONResponse). Runs against a throwaway SQLite file by default.
+
+    python benchmarks/list_serialization.py --rows 10000
+    python benchmarks/list_serialization.py --url mysql+pymysql://user:pw@localhost/planner_bench
+"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+from datetime import date, timedelta
+from typing import List
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# database.py builds its engine at import time; point it somewhere harmless
+os.environ.setdefault("DATABASE_URL", "sqlite://")
+
+from fastapi.encoders import jsonable_encoder
+from pydantic import parse_obj_as
+from sqlalchemy import create_engine, select
+from sqlalchemy.orm import sessionmaker, selectinload
+from fast_json import FastJSONResponse
+from models import Base, Opdrachtgever, Location, Shift
+from planning import ShiftResponse, SHIFT_FIELDS, _shift_list_query
+
+TABLES = [Opdrachtgever.__table__, Location.__table__, Shift.__table__]
+
+
+def setup(engine, rows: int) -> None:
+    Base.metadata.drop_all(bind=engine, tables=list(reversed(TABLES)))
+    Base.metadata.create_all(bind=engine, tables=TABLES)
+    Session = sessionmaker(bind=engine)
+    db = Session()
+    try:
+        client = Opdrachtgever(naam="Bench", email="bench-client@example.com")
+        db.add(client)
+        db.flush()
+        locations = [Location(naam=f"Bench locatie {i}", adres=f"Straat {i}", stad="Utrecht",
+                              provincie="Utrecht", opdrachtgever_id=client.id) for i in range(50)]
+        db.add_all(locations)
+        db.flush()
+        start = date.today()
+        db.add_all([Shift(datum=start + timedelta(days=i % 365), start_tijd="08:00", eind_tijd="16:00",
+                          location_id=locations[i % 50].id, locatie=locations[i % 50].naam,
+                          status="open" if i % 3 else "approved", medewerker_id=None if i % 3 else f"bench{i}",
+                          titel=f"Dienst {i}", stad="Utrecht", provincie="Utrecht", adres=f"Straat {i % 50}")
+                    for i in range(rows)])
+        db.commit()
+    finally:
+        db.close()
+
+
+def old_path(db) -> bytes:
+    shifts = db.execute(select(Shift).options(selectinload(Shift.location))).scalars().all()
+    result = []
+    for shift in shifts:
+        location_details = None
+        if shift.location:
+            location_details = {"id": shift.location.id, "naam": shift.location.naam, "adres": shift.location.adres,
+                                "stad": shift.location.stad, "provincie": shift.location.provincie}
+        result.append(ShiftResponse(
+            shift_date=shift.datum.isoformat(), start_time=shift.start_tijd, end_time=shift.eind_tijd,
+            location_id=shift.location_id, status=shift.status, id=shift.id, employee_id=shift.medewerker_id,
+            titel=shift.titel or "", stad=shift.stad or "", provincie=shift.provincie or "",
+            adres=shift.adres or "", required_profile=shift.required_profile, location=shift.locatie,
+            location_details=location_details, reiskilometers=shift.reiskilometers
+        ))
+    # What FastAPI does with a response_model: validate again, then encode
+    validated = parse_obj_as(List[ShiftResponse], result)
+    return json.dumps(jsonable_encoder(validated)).encode("utf-8")
+
+
+def fast_path(db) -> bytes:
+    names = SHIFT_FIELDS.parse(None)
+    rows = db.execute(_shift_list_query(names)).all()
+    to_dict = SHIFT_FIELDS.serializer(names, extra=(Shift.id,))
+    return FastJSONResponse([to_dict(row) for row in rows]).body
+
+
+def measure(label: str, fn, Session, rows: int, repeat: int) -> float:
+    timings = []
+    for _ in range(repeat):
+        db = Session()
+        try:
+            started = time.perf_counter()
+            body = fn(db)
+            timings.append(time.perf_counter() - started)
+        finally:
+            db.close()
+    best = min(timings)
+    print(f"{label:<6} best of {repeat}: {best * 1000:8.1f} ms  {best / rows * 1e6:6.1f} µs/row  {len(body) / 1024:.0f} KiB")
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", help="Database URL (default: temporary SQLite file)")
+    parser.add_argument("--rows", type=int, default=10000, help="Number of shifts")
+    parser.add_argument("--repeat", type=int, default=5, help="Runs per path; the best one is reported")
+    args = parser.parse_args()
+
+    url = args.url or "sqlite:///" + os.path.join(tempfile.mkdtemp(), "list_bench.db")
+    engine = create_engine(url)
+    setup(engine, args.rows)
+    Session = sessionmaker(bind=engine)
+
+    print(f"rows: {args.rows} against {engine.url.get_backend_name()}")
+    old = measure("old", old_path, Session, args.rows, args.repeat)
+    fast = measure("fast", fast_path, Session, args.rows, args.repeat)
+    print(f"speedup: {old / fast:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
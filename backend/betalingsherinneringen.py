@@ -2,11 +2,14 @@ from datetime import date
 from database import get_db
 from sqlalchemy.orm import Session
 from models import Factuur
+from job_telemetry import tracked_job, job_stats
 import logging
 
 logger = logging.getLogger(__name__)
 
+@tracked_job("send_payment_reminders")
 def send_payment_reminders():
+    stats = job_stats()
     today = date.today()
     logger.info(f"{today} - Checking payment reminders...")
     
@@ -14,6 +17,7 @@ def send_payment_reminders():
     try:
         # Get all open invoices
         open_invoices = db.query(Factuur).filter(Factuur.status == "open").all()
+        stats.rows_scanned += len(open_invoices)
         
         for factuur in open_invoices:
             factuur_date = factuur.factuurdatum
@@ -21,15 +25,18 @@ def send_payment_reminders():
             
             if days_diff >= 30:
                 factuur.status = "herinnering30"
+                stats.rows_written += 1
                 logger.info(f"Factuur {factuur.id} krijgt 30 dagen herinnering (oud: {days_diff} dagen).")
             elif days_diff >= 14:
                 factuur.status = "herinnering14"
+                stats.rows_written += 1
                 logger.info(f"Factuur {factuur.id} krijgt 14 dagen herinnering (oud: {days_diff} dagen).")
         
         db.commit()
         logger.info(f"{today} - Finished checking payment reminders.")
     except Exception as e:
         logger.error(f"Error in send_payment_reminders: {str(e)}")
+        stats.record_error(e)
         db.rollback()
     finally:
         db.close()
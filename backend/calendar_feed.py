@@ -0,0 +1,184 @@
+from fastapi import APIRouter, Depends, HTTPException, Request, Response
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from typing import Dict, Optional, Tuple
+from database import get_db
+from models import Shift as DBShift, User
+from auth import get_current_user
+from config import SECRET_KEY
+import base64
+import hashlib
+import hmac
+import logging
+import threading
+
+logger = logging.getLogger(__name__)
+
+router = APIRouter(
+    prefix="/calendar",
+    tags=["calendar"]
+)
+
+# Shifts with these statuses are not published in the feed
+EXCLUDED_STATUSES = ["canceled", "cancelled", "rejected"]
+CONFIRMED_STATUSES = {"approved", "assigned", "completed"}
+
+# Rendered feeds per username: (etag, body). Entries are replaced as soon as the ETag changes.
+MAX_CACHED_FEEDS = 1000
+_feed_cache: "OrderedDict[str, Tuple[str, bytes]]" = OrderedDict()
+_feed_cache_lock = threading.Lock()  # The feed route runs in the thread pool
+
+
+def _sign(username: str) -> str:
+    # Separate HMAC domain so a feed token can never be used as an API bearer token
+    return hmac.new(SECRET_KEY.encode(), f"calendar:{username}".encode(), hashlib.sha256).hexdigest()[:32]
+
+
+def create_feed_token(username: str) -> str:
+    """Maak het token voor de kalenderfeed-URL van een medewerker."""
+    encoded = base64.urlsafe_b64encode(username.encode()).decode().rstrip("=")
+    return f"{encoded}.{_sign(username)}"
+
+
+def verify_feed_token(token: str) -> Optional[str]:
+    """Geef de username terug als het token geldig is, anders None."""
+    try:
+        encoded, signature = token.rsplit(".", 1)
+        username = base64.urlsafe_b64decode(encoded + "=" * (-len(encoded) % 4)).decode()
+    except (ValueError, UnicodeDecodeError):
+        return None
+    if not hmac.compare_digest(signature, _sign(username)):
+        return None
+    return username
+
+
+def _feed_etag(db: Session, username: str) -> str:
+    """
+    Strong ETag uit de wijzigingsversie van de shifts van de medewerker.
+    Het aantal shifts vangt verwijderde of overgedragen shifts af, max(updated_at) elke wijziging.
+    """
+    count, last_change, max_id = db.query(
+        func.count(DBShift.id),
+        func.max(DBShift.updated_at),
+        func.max(DBShift.id)
+    ).filter(DBShift.medewerker_id == username).one()
+    version = f"{username}:{count}:{max_id}:{last_change.isoformat() if last_change else ''}"
+    return '"' + hashlib.sha1(version.encode()).hexdigest() + '"'
+
+
+def _escape(value: Optional[str]) -> str:
+    if not value:
+        return ""
+    return (value.replace("\\", "\\\\").replace(";", "\\;")
+            .replace(",", "\\,").replace("\n", "\\n"))
+
+
+def _ics_datetime(value: datetime) -> str:
+    return value.strftime("%Y%m%dT%H%M%S")
+
+
+def render_feed(db: Session, username: str) -> bytes:
+    """Bouw de iCalendar-feed (RFC 5545) voor alle shifts van een medewerker."""
+    rows = db.query(
+        DBShift.id,
+        DBShift.datum,
+        DBShift.start_tijd,
+        DBShift.eind_tijd,
+        DBShift.locatie,
+        DBShift.adres,
+        DBShift.stad,
+        DBShift.titel,
+        DBShift.status,
+        DBShift.updated_at
+    ).filter(
+        DBShift.medewerker_id == username,
+        DBShift.status.notin_(EXCLUDED_STATUSES)
+    ).order_by(DBShift.datum, DBShift.start_tijd).all()
+
+    now = datetime.utcnow()
+    lines = [
+        "BEGIN:VCALENDAR",
+        "VERSION:2.0",
+        "PRODID:-//Secufy//Planning//NL",
+        "CALSCALE:GREGORIAN",
+        "METHOD:PUBLISH",
+        f"X-WR-CALNAME:{_escape('Diensten ' + username)}",
+        "X-WR-TIMEZONE:Europe/Amsterdam",
+    ]
+    for row in rows:
+        try:
+            start = datetime.combine(row.datum, datetime.strptime(row.start_tijd, "%H:%M").time())
+            end = datetime.combine(row.datum, datetime.strptime(row.eind_tijd, "%H:%M").time())
+        except (TypeError, ValueError):
+            logger.warning("Skipping shift %s with invalid times in calendar feed", row.id)
+            continue
+        if end <= start:
+            end += timedelta(days=1)  # Dienst over middernacht
+
+        location = ", ".join(part for part in (row.locatie, row.adres, row.stad) if part)
+        lines.extend([
+            "BEGIN:VEVENT",
+            f"UID:shift-{row.id}@planning",
+            f"DTSTAMP:{_ics_datetime(row.updated_at or now)}Z",
+            f"DTSTART;TZID=Europe/Amsterdam:{_ics_datetime(start)}",
+            f"DTEND;TZID=Europe/Amsterdam:{_ics_datetime(end)}",
+            f"SUMMARY:{_escape(row.titel or row.locatie or 'Dienst')}",
+            f"LOCATION:{_escape(location)}",
+            f"STATUS:{'CONFIRMED' if row.status in CONFIRMED_STATUSES else 'TENTATIVE'}",
+            "END:VEVENT",
+        ])
+    lines.append("END:VCALENDAR")
+    return ("\r\n".join(lines) + "\r\n").encode("utf-8")
+
+
+@router.get("/feed-url")
+async def get_feed_url(
+    request: Request,
+    current_user: User = Depends(get_current_user)
+) -> Dict[str, str]:
+    """Geef de persoonlijke kalenderfeed-URL van de ingelogde gebruiker (om te abonneren in een agenda-app)."""
+    token = create_feed_token(current_user.username)
+    return {
+        "token": token,
+        "url": str(request.url_for("get_calendar_feed", token=token))
+    }
+
+
+@router.get("/{token}.ics", name="get_calendar_feed")
+def get_calendar_feed(
+    token: str,
+    request: Request,
+    db: Session = Depends(get_db)
+):
+    """
+    iCalendar-feed met de shifts van een medewerker, beveiligd met het token uit de URL.
+    Ondersteunt conditional GET: bij een ongewijzigde roostering volgt 304 zonder dat de feed wordt opgebouwd.
+    """
+    username = verify_feed_token(token)
+    if username is None:
+        raise HTTPException(status_code=404, detail="Kalender niet gevonden")
+
+    etag = _feed_etag(db, username)
+    headers = {"ETag": etag, "Cache-Control": "private, no-cache"}
+
+    if_none_match = request.headers.get("if-none-match", "")
+    if etag in [tag.strip() for tag in if_none_match.split(",")]:
+        return Response(status_code=304, headers=headers)
+
+    with _feed_cache_lock:
+        cached = _feed_cache.get(username)
+        if cached and cached[0] == etag:
+            _feed_cache.move_to_end(username)
+    if cached and cached[0] == etag:
+        body = cached[1]
+    else:
+        body = render_feed(db, username)
+        with _feed_cache_lock:
+            _feed_cache[username] = (etag, body)
+            _feed_cache.move_to_end(username)
+            while len(_feed_cache) > MAX_CACHED_FEEDS:
+                _feed_cache.popitem(last=False)
+
+    return Response(content=body, media_type="text/calendar; charset=utf-8", headers=headers)
@@ -1,31 +1,40 @@
 from fastapi import APIRouter, WebSocket, WebSocketDisconnect, Depends
 from typing import List
 from auth import get_current_user
+from message_bus import bus
+from websocket_hub import WebSocketHub
 
 router = APIRouter(
     prefix="/chat",
     tags=["chat"]
 )
 
+CHAT_ROOM_CHANNEL = "chat_room"
+
 class ConnectionManager:
-    """Beheert actieve WebSocket-verbindingen."""
+    """Beheert de actieve WebSocket-verbindingen van deze worker; berichten lopen via de message bus."""
     def __init__(self):
-        self.active_connections: List[WebSocket] = []
+        self.hub = WebSocketHub("chat_room")
+
+    @property
+    def active_connections(self) -> List[WebSocket]:
+        return list(self.hub.clients)
 
     async def connect(self, websocket: WebSocket):
-        await websocket.accept()
-        self.active_connections.append(websocket)
+        await self.hub.accept(websocket)
 
     def disconnect(self, websocket: WebSocket):
-        if websocket in self.active_connections:
-            self.active_connections.remove(websocket)
+        self.hub.disconnect(websocket)
 
     async def broadcast(self, message: str):
-        """Verstuur een bericht naar alle actieve gebruikers."""
-        for connection in self.active_connections:
-            await connection.send_text(message)
+        """Verstuur een bericht naar alle actieve gebruikers, op alle workers."""
+        await bus.publish(CHAT_ROOM_CHANNEL, {"text": message})
+
+    async def deliver(self, envelope: dict):
+        self.hub.broadcast(envelope["text"])
 
 manager = ConnectionManager()
+bus.subscribe(CHAT_ROOM_CHANNEL, manager.deliver)
 
 @router.websocket("/ws/{username}")
 async def websocket_endpoint(websocket: WebSocket, username: str, current_user: dict = Depends(get_current_user)):
@@ -43,6 +52,9 @@ async def websocket_endpoint(websocket: WebSocket, username: str, current_user:
     try:
         while True:
             data = await websocket.receive_text()
+            if data == "ping":
+                manager.hub.send(websocket, "pong")
+                continue
             message = f"{username}: {data}"
             await manager.broadcast(message)
     except WebSocketDisconnect:
@@ -14,7 +14,9 @@ API_URL = os.getenv('PROD_API_URL') if ENVIRONMENT == 'production' else os.geten
 # JWT Configuration
 SECRET_KEY = os.getenv('SECRET_KEY', 'mijnzeergeheime_sleutel')  # Use environment variable in production
 ALGORITHM = "HS256"
-ACCESS_TOKEN_EXPIRE_MINUTES = 30
+# Access tokens carry the user's roles, so keep them short-lived; clients renew them with the refresh token
+ACCESS_TOKEN_EXPIRE_MINUTES = int(os.getenv('ACCESS_TOKEN_EXPIRE_MINUTES', '30'))
+REFRESH_TOKEN_EXPIRE_DAYS = int(os.getenv('REFRESH_TOKEN_EXPIRE_DAYS', '7'))
 
 # CORS configuration
 if ENVIRONMENT == 'production':
@@ -1,4 +1,5 @@
 from fastapi import APIRouter, Depends, HTTPException
+from fastapi.concurrency import run_in_threadpool
 from auth import require_roles, get_current_user
 from planning import fake_shifts_db
 from dienstaanvragen import router as dienstaanvragen_router
@@ -11,6 +12,9 @@ from pydantic import BaseModel
 from database import get_db
 from sqlalchemy.orm import Session
 from models import Dienstaanvraag, Factuur
+import logging
+
+logger = logging.getLogger(__name__)
 
 router = APIRouter(
     prefix="/dashboard",
@@ -24,7 +28,7 @@ class EmployeeDashboardResponse(BaseModel):
     profile: Dict[str, Any]
 
 @router.get("/")
-async def get_dashboard(
+def get_dashboard(
     current_user: dict = Depends(require_roles(["planner", "admin"])),
     db: Session = Depends(get_db)
 ):
@@ -37,7 +41,7 @@ async def get_dashboard(
             day_hours, evening_hours, night_hours = calculate_shift_hours(shift["start_time"], shift["end_time"])
             total_shift_hours += (day_hours + evening_hours + night_hours)
         except Exception as e:
-            print("Fout bij urenberekening voor shift {}: {}".format(shift.get("id"), e))
+            logger.warning("Fout bij urenberekening voor shift %s: %s", shift.get("id"), e)
             continue
 
     aanvraag_stats = {}
@@ -55,7 +59,7 @@ async def get_dashboard(
         try:
             total_factuur_amount += float(factuur.bedrag)
         except Exception as e:
-            print("Fout bij factuur bedrag voor factuur {}: {}".format(factuur.id, e))
+            logger.warning("Fout bij factuur bedrag voor factuur %s: %s", factuur.id, e)
             continue
 
     dashboard_data = {
@@ -91,9 +95,11 @@ async def get_employee_dashboard(
         ]
         
         # 2. Get employee's service requests
-        employee_requests = db.query(Dienstaanvraag).filter(
-            Dienstaanvraag.employee_id == current_user["username"]
-        ).all()
+        employee_requests = await run_in_threadpool(
+            lambda: db.query(Dienstaanvraag).filter(
+                Dienstaanvraag.employee_id == current_user["username"]
+            ).all()
+        )
         
         # 3. Get employee's payroll data
         current_year = date.today().year
@@ -104,7 +110,7 @@ async def get_employee_dashboard(
         )
         
         # 4. Get employee's profile
-        employee_profile = await get_employee_profile(current_user)
+        employee_profile = await run_in_threadpool(get_employee_profile, current_user)
         
         return EmployeeDashboardResponse(
             shifts=employee_shifts,
@@ -1,13 +1,16 @@
 from fastapi import APIRouter, HTTPException, Depends
+from fastapi.concurrency import run_in_threadpool
 from pydantic import BaseModel
 from typing import List, Optional
 from datetime import datetime, date
 from auth import get_current_user, require_roles
-from database import get_db
-from sqlalchemy.orm import Session
+from database import get_async_db
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from models import User, Shift as DBShift, Dienstaanvraag as DBDienstaanvraag, Opdrachtgever, Location
 from email_utils import send_shift_registration_email, send_shift_unregistration_email
-from auto_approval import check_auto_approval_eligibility
+from auto_approval import auto_approval_priority
+from shift_claims import CLAIM_WINDOW_SECONDS, claim_shift, approve_request, reject_competing_requests
 import logging
 
 router = APIRouter(
@@ -43,7 +46,7 @@ class DienstaanvraagCreate(BaseModel):
 @router.get("/", response_model=List[Dienstaanvraag])
 async def get_dienstaanvragen(
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     Haal dienstaanvragen op.
@@ -55,17 +58,26 @@ async def get_dienstaanvragen(
         user_roles = [role.name for role in current_user.roles] if hasattr(current_user, 'roles') else []
         logger.info(f"User roles: {user_roles}")
         
-        if any(role in ["planner", "admin"] for role in user_roles):
-            requests = db.query(DBDienstaanvraag).all()
-        else:
-            requests = db.query(DBDienstaanvraag).filter(DBDienstaanvraag.employee_id == current_user.username).all()
+        query = select(DBDienstaanvraag)
+        if not any(role in ["planner", "admin"] for role in user_roles):
+            query = query.where(DBDienstaanvraag.employee_id == current_user.username)
+        requests = (await db.execute(query)).scalars().all()
+        
+        # Load the associated shifts in one query instead of one per request
+        shift_ids = {request.shift_id for request in requests if request.shift_id is not None}
+        shifts = {}
+        if shift_ids:
+            shifts = {
+                shift.id: shift
+                for shift in (await db.execute(select(DBShift).where(DBShift.id.in_(shift_ids)))).scalars()
+            }
         
         # Enhance the requests with shift details
         enhanced_requests = []
         for request in requests:
             try:
                 # Get the associated shift
-                shift = db.query(DBShift).filter(DBShift.id == request.shift_id).first()
+                shift = shifts.get(request.shift_id)
                 
                 # Format the aanvraag_date as a string
                 aanvraag_date_str = request.aanvraag_date.isoformat() if request.aanvraag_date else None
@@ -98,7 +110,7 @@ async def get_dienstaanvragen(
 @router.get("/my-requests", response_model=List[Dienstaanvraag])
 async def get_my_requests(
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     Get all shift requests for the current user.
@@ -108,20 +120,17 @@ async def get_my_requests(
         if not any(role.name == "employee" for role in current_user.roles):
             raise HTTPException(status_code=403, detail="Only employees can view their requests")
         
-        # Get all requests for the current user
-        requests = db.query(DBDienstaanvraag).filter(
-            DBDienstaanvraag.employee_id == current_user.username
-        ).all()
+        # Get all requests for the current user together with their shift (requests without a shift are skipped)
+        rows = (await db.execute(
+            select(DBDienstaanvraag, DBShift)
+            .join(DBShift, DBShift.id == DBDienstaanvraag.shift_id)
+            .where(DBDienstaanvraag.employee_id == current_user.username)
+        )).all()
         
         # Convert requests to Dienstaanvraag format
         my_requests = []
-        for request in requests:
+        for request, shift in rows:
             try:
-                # Get the associated shift
-                shift = db.query(DBShift).filter(DBShift.id == request.shift_id).first()
-                if not shift:
-                    continue
-                
                 # Format the aanvraag_date as a string
                 aanvraag_date_str = request.aanvraag_date.isoformat() if request.aanvraag_date else None
                 
@@ -152,7 +161,7 @@ async def get_my_requests(
 async def get_my_request(
     request_id: int,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     Get a specific service request for the current user.
@@ -161,23 +170,27 @@ async def get_my_request(
     if not any(role.name == "employee" for role in current_user.roles):
         raise HTTPException(status_code=403, detail="Only employees can view their own requests")
     
-    request = db.query(DBDienstaanvraag).filter(
-        DBDienstaanvraag.id == request_id,
-        DBDienstaanvraag.employee_id == current_user.username
-    ).first()
+    row = (await db.execute(
+        select(DBDienstaanvraag, DBShift)
+        .outerjoin(DBShift, DBShift.id == DBDienstaanvraag.shift_id)
+        .where(
+            DBDienstaanvraag.id == request_id,
+            DBDienstaanvraag.employee_id == current_user.username
+        )
+    )).first()
     
-    if not request:
+    if not row:
         raise HTTPException(status_code=404, detail="Request not found or not assigned to you")
     
-    # Get the associated shift
-    shift = db.query(DBShift).filter(DBShift.id == request.shift_id).first()
+    # The associated shift comes from the same query
+    request, shift = row
     
     # Create a dictionary with the request data
     request_dict = {
         "id": request.id,
         "shift_id": request.shift_id,
         "employee_id": request.employee_id,
-        "aanvraag_date": request.aanvraag_date,
+        "aanvraag_date": request.aanvraag_date.isoformat() if request.aanvraag_date else None,
         "status": request.status,
         "notes": None  # Add notes field if needed
     }
@@ -198,7 +211,7 @@ async def get_my_request(
 async def create_dienstaanvraag(
     aanvraag: DienstaanvraagCreate,  # <-- use the creation schema here
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     Medewerkers dienen een dienstaanvraag in voor een specifieke shift.
@@ -211,21 +224,20 @@ async def create_dienstaanvraag(
         if not any(role.name == "employee" for role in current_user.roles):
             raise HTTPException(status_code=403, detail="Only employees can submit service requests")
         
-        # Check if the shift exists and is open
-        shift = db.query(DBShift).filter(DBShift.id == aanvraag.shift_id).first()
-        if not shift:
+        # Fetch the shift together with its opdrachtgever in a single round trip
+        row = (await db.execute(
+            select(DBShift, Location.id, Location.opdrachtgever_id)
+            .outerjoin(Location, Location.id == DBShift.location_id)
+            .where(DBShift.id == aanvraag.shift_id)
+        )).first()
+        if not row:
             raise HTTPException(status_code=404, detail="Shift not found")
+        shift, location_id, opdrachtgever_id = row
         
-        logger.info(f"Found shift: {shift.id} with location_id: {shift.location_id}")
-        
-        # Get the location and opdrachtgever_id
-        location = db.query(Location).filter(Location.id == shift.location_id).first()
-        if not location:
+        if location_id is None:
             raise HTTPException(status_code=404, detail="Location not found")
         
-        logger.info(f"Found location: {location.id} with opdrachtgever_id: {location.opdrachtgever_id}")
-        
-        if not location.opdrachtgever_id:
+        if not opdrachtgever_id:
             raise HTTPException(status_code=400, detail="Location has no associated opdrachtgever")
         
         # Only allow requests for open shifts
@@ -233,50 +245,62 @@ async def create_dienstaanvraag(
             raise HTTPException(status_code=400, detail="Shift is not open for requests")
         
         # Check if employee already has an active request for this shift
-        existing_request = db.query(DBDienstaanvraag).filter(
+        existing_request = (await db.execute(select(DBDienstaanvraag.id).where(
             DBDienstaanvraag.shift_id == aanvraag.shift_id,
             DBDienstaanvraag.employee_id == current_user.username,
             DBDienstaanvraag.status.in_(["requested", "approved"])
-        ).first()
+        ))).first()
         if existing_request:
             raise HTTPException(status_code=400, detail="You already have an active request for this shift")
         
-        # Check if the request should be auto-approved
-        should_auto_approve = check_auto_approval_eligibility(
-            db=db,
-            employee_id=current_user.username,
-            location=shift.locatie,
-            shift_id=shift.id
+        # Check if the request should be auto-approved (shared sync helper, run on the async connection)
+        priority = await db.run_sync(
+            lambda sync_db: auto_approval_priority(
+                db=sync_db,
+                employee_id=current_user.username,
+                location=shift.locatie,
+                shift_id=shift.id,
+                shift_date=shift.datum
+            )
         )
+        # With a claim window, auto-approvable requests are held and the worker awards the shift
+        # to the strongest of them when the window closes (see shift_claims.py)
+        held = priority is not None and CLAIM_WINDOW_SECONDS > 0
+        should_auto_approve = priority is not None and not held
+        
+        logger.info(f"Auto-approval check result: priority={priority}, held={held}")
         
-        logger.info(f"Auto-approval check result: {should_auto_approve}")
+        # Auto-approved requests claim the shift with a single conditional UPDATE:
+        # under contention exactly one claimant wins, the others get a 409.
+        if should_auto_approve and not await db.run_sync(claim_shift, shift.id, current_user.username, "assigned"):
+            await db.rollback()
+            raise HTTPException(status_code=409, detail="Shift has just been assigned to another employee")
         
         # Create new request with opdrachtgever_id
         db_aanvraag = DBDienstaanvraag(
             shift_id=aanvraag.shift_id,
             employee_id=current_user.username,
             aanvraag_date=datetime.utcnow().date(),
+            requested_at=datetime.utcnow(),
             status="approved" if should_auto_approve else "requested",
+            claim_priority=priority if held else None,
             notes=aanvraag.notes,
-            opdrachtgever_id=location.opdrachtgever_id
+            opdrachtgever_id=opdrachtgever_id
         )
         
-        logger.info(f"Creating service request with data: {db_aanvraag.__dict__}")
-        
         db.add(db_aanvraag)
         
-        # If auto-approved, update the shift status
-        if should_auto_approve:
-            shift.status = "assigned"
-            shift.medewerker_id = current_user.username
-        
         try:
-            db.commit()
-            db.refresh(db_aanvraag)
+            await db.flush()
+            if should_auto_approve:
+                # The shift is taken: close all competing requests in one statement
+                await db.run_sync(reject_competing_requests, shift.id, db_aanvraag.id)
+            await db.commit()
+            await db.refresh(db_aanvraag)
             logger.info(f"Successfully created service request: {db_aanvraag.id}")
         except Exception as e:
             logger.error(f"Database error while creating service request: {str(e)}")
-            db.rollback()
+            await db.rollback()
             raise HTTPException(status_code=500, detail=f"Database error: {str(e)}")
 
         # Send confirmation email
@@ -291,7 +315,7 @@ async def create_dienstaanvraag(
                     'end_time': shift.eind_tijd,
                     'status': 'approved' if should_auto_approve else 'requested'
                 }
-                send_shift_registration_email(employee_email, shift_dict)
+                await run_in_threadpool(send_shift_registration_email, employee_email, shift_dict)
             except Exception as e:
                 # Log the error but don't fail the request
                 logger.error(f"Failed to send confirmation email: {str(e)}")
@@ -323,7 +347,7 @@ async def create_dienstaanvraag(
 async def approve_dienstaanvraag(
     aanvraag_id: int,
     current_user: User = Depends(require_roles(["planner", "admin"])),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     Approve a shift request and update the associated shift.
@@ -331,7 +355,9 @@ async def approve_dienstaanvraag(
     """
     try:
         # Get the request
-        aanvraag = db.query(DBDienstaanvraag).filter(DBDienstaanvraag.id == aanvraag_id).first()
+        aanvraag = (await db.execute(
+            select(DBDienstaanvraag).where(DBDienstaanvraag.id == aanvraag_id)
+        )).scalars().first()
         if not aanvraag:
             raise HTTPException(status_code=404, detail="Dienstaanvraag niet gevonden")
         
@@ -339,33 +365,26 @@ async def approve_dienstaanvraag(
             raise HTTPException(status_code=400, detail="Can only approve requests in 'requested' status")
         
         # Get the associated shift
-        shift = db.query(DBShift).filter(DBShift.id == aanvraag.shift_id).first()
+        shift = (await db.execute(select(DBShift).where(DBShift.id == aanvraag.shift_id))).scalars().first()
         if not shift:
             raise HTTPException(status_code=404, detail="Associated shift not found")
         
-        if shift.status != "open":
+        # Claim the shift with a conditional UPDATE so two planners approving
+        # competing requests at the same time cannot both assign it
+        if not await db.run_sync(claim_shift, shift.id, str(aanvraag.employee_id), "approved"):
+            await db.rollback()
             raise HTTPException(status_code=400, detail="Shift is no longer open")
         
-        # Update the request status
-        aanvraag.status = "approved"
-        
-        # Update the shift
-        shift.status = "approved"
-        # Ensure employee_id is a string
-        shift.medewerker_id = str(aanvraag.employee_id)
-        
-        # Reject any other pending requests for this shift
-        other_requests = db.query(DBDienstaanvraag).filter(
-            DBDienstaanvraag.shift_id == aanvraag.shift_id,
-            DBDienstaanvraag.id != aanvraag_id,
-            DBDienstaanvraag.status == "requested"
-        ).all()
+        if not await db.run_sync(approve_request, aanvraag.id):
+            await db.rollback()
+            raise HTTPException(status_code=409, detail="Request was already processed")
         
-        for request in other_requests:
-            request.status = "rejected"
+        # Reject any other pending requests for this shift in one statement
+        await db.run_sync(reject_competing_requests, aanvraag.shift_id, aanvraag.id)
         
-        db.commit()
-        db.refresh(aanvraag)
+        await db.commit()
+        await db.refresh(aanvraag)
+        await db.refresh(shift)
         
         # Format the response to match the Dienstaanvraag model
         response_dict = {
@@ -382,7 +401,10 @@ async def approve_dienstaanvraag(
         }
         
         return response_dict
+    except HTTPException:
+        raise
     except Exception as e:
+        await db.rollback()
         logger.error(f"Error in approve_dienstaanvraag: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Internal server error: {str(e)}")
 
@@ -391,14 +413,16 @@ async def approve_dienstaanvraag(
 async def reject_dienstaanvraag(
     aanvraag_id: int,
     current_user: User = Depends(require_roles(["planner", "admin"])),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     Reject a shift request.
     Only planners and admins can reject requests.
     """
     try:
-        aanvraag = db.query(DBDienstaanvraag).filter(DBDienstaanvraag.id == aanvraag_id).first()
+        aanvraag = (await db.execute(
+            select(DBDienstaanvraag).where(DBDienstaanvraag.id == aanvraag_id)
+        )).scalars().first()
         if not aanvraag:
             raise HTTPException(status_code=404, detail="Dienstaanvraag niet gevonden")
         
@@ -406,12 +430,12 @@ async def reject_dienstaanvraag(
             raise HTTPException(status_code=400, detail="Can only reject requests in 'requested' status")
         
         # Get the associated shift
-        shift = db.query(DBShift).filter(DBShift.id == aanvraag.shift_id).first()
+        shift = (await db.execute(select(DBShift).where(DBShift.id == aanvraag.shift_id))).scalars().first()
         
         # Update the request status
         aanvraag.status = "rejected"
-        db.commit()
-        db.refresh(aanvraag)
+        await db.commit()
+        await db.refresh(aanvraag)
         
         # Format the response to match the Dienstaanvraag model
         response_dict = {
@@ -437,14 +461,16 @@ async def reject_dienstaanvraag(
 async def delete_dienstaanvraag(
     aanvraag_id: int,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     Delete a service request.
     Only the employee who created the request or an admin can delete it.
     """
     try:
-        db_aanvraag = db.query(DBDienstaanvraag).filter(DBDienstaanvraag.id == aanvraag_id).first()
+        db_aanvraag = (await db.execute(
+            select(DBDienstaanvraag).where(DBDienstaanvraag.id == aanvraag_id)
+        )).scalars().first()
         if not db_aanvraag:
             raise HTTPException(status_code=404, detail="Service request not found")
         
@@ -452,8 +478,8 @@ async def delete_dienstaanvraag(
         if db_aanvraag.employee_id != current_user.id and not any(role.name == "admin" for role in current_user.roles):
             raise HTTPException(status_code=403, detail="You don't have permission to delete this request")
         
-        db.delete(db_aanvraag)
-        db.commit()
+        await db.delete(db_aanvraag)
+        await db.commit()
         
         return db_aanvraag
     except Exception as e:
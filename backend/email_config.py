@@ -1,4 +1,3 @@
-import os
 import smtplib
 import logging
 from email.mime.text import MIMEText
@@ -6,31 +5,12 @@ from email.mime.multipart import MIMEMultipart
 from email.mime.application import MIMEApplication
 from datetime import datetime
 from dotenv import load_dotenv
-import sys
+from logging_config import LogFileHandler
 
-# Create logs directory if it doesn't exist
-os.makedirs('logs', exist_ok=True)
-
-# Configure logging
+# File log in logs/email.log; console output goes through the root logger (logging_config).
+# Level via LOG_LEVELS=email_service=DEBUG
 logger = logging.getLogger('email_service')
-logger.setLevel(logging.DEBUG)
-
-# Create file handler
-file_handler = logging.FileHandler('logs/email.log')
-file_handler.setLevel(logging.DEBUG)
-
-# Create console handler
-console_handler = logging.StreamHandler(sys.stdout)
-console_handler.setLevel(logging.DEBUG)
-
-# Create formatter
-formatter = logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s')
-file_handler.setFormatter(formatter)
-console_handler.setFormatter(formatter)
-
-# Add handlers to logger
-logger.addHandler(file_handler)
-logger.addHandler(console_handler)
+logger.addHandler(LogFileHandler('logs/email.log', logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s')))
 
 # Load environment variables
 load_dotenv()
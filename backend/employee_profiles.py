@@ -96,7 +96,7 @@ class PayrollEntry(BaseModel):
 
 # Employee profiles endpoint
 @employee_profiles_router.get("/", response_model=List[EmployeeProfile])
-async def get_employee_profiles(
+def get_employee_profiles(
     db: Session = Depends(get_db),
     current_user: dict = Depends(get_current_user)
 ):
@@ -156,7 +156,7 @@ async def get_employee_profiles(
         raise HTTPException(status_code=500, detail=str(e))
 
 @employee_profiles_router.get("/{employee_id}", response_model=EmployeeProfile)
-async def get_employee_profile(
+def get_employee_profile(
     employee_id: str,
     db: Session = Depends(get_db),
     current_user: dict = Depends(get_current_user)
@@ -220,7 +220,7 @@ async def get_employee_profile(
         raise HTTPException(status_code=500, detail=str(e))
 
 @employee_profiles_router.get("/my-profile", response_model=EmployeeProfile)
-async def get_my_profile(
+def get_my_profile(
     db: Session = Depends(get_db),
     current_user: dict = Depends(get_current_user)
 ):
@@ -278,7 +278,7 @@ async def get_my_profile(
         raise HTTPException(status_code=500, detail=str(e))
 
 @employee_profiles_router.put("/{employee_id}", response_model=EmployeeProfile)
-async def update_employee_profile(
+def update_employee_profile(
     employee_id: str,
     employee_data: EmployeeProfile,
     db: Session = Depends(get_db),
@@ -375,7 +375,7 @@ async def update_employee_profile(
         raise HTTPException(status_code=500, detail=str(e))
 
 @employee_profiles_router.delete("/{employee_id}")
-async def delete_employee_profile(
+def delete_employee_profile(
     employee_id: str,
     db: Session = Depends(get_db),
     current_user: dict = Depends(get_current_user)
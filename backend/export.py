@@ -4,7 +4,6 @@ from sqlalchemy.orm import Session
 from database import get_db
 from models import Factuur
 import io
-from openpyxl import Workbook
 
 router = APIRouter(
     prefix="/export",
@@ -13,10 +12,12 @@ router = APIRouter(
 
 
 @router.get("/facturen")
-async def export_facturen(db: Session = Depends(get_db)):
+def export_facturen(db: Session = Depends(get_db)):
     """
     Exporteer alle facturen naar een Excel-bestand.
     """
+    from openpyxl import Workbook
+
     # Get all invoices from database
     facturen = db.query(Factuur).all()
     
@@ -5,47 +5,24 @@ from typing import List, Optional
 from datetime import date, datetime
 import os
 import io
-from reportlab.pdfgen import canvas
-from reportlab.lib.pagesizes import A4
-from reportlab.lib import colors
-from reportlab.platypus import Table, TableStyle
 from auth import require_roles, get_current_user
 from io import BytesIO
 from sqlalchemy.orm import Session, joinedload
 from email_config import EMAIL_CONFIG, send_invoice_email
+from fast_json import FastJSONResponse
+from fieldsets import FieldSet, fields_query
+from logging_config import LogFileHandler
 from database import get_db
 from models import Factuur, Opdrachtgever, Shift
-from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer
-from reportlab.lib.styles import getSampleStyleSheet
 import logging
-import sys
 from sqlalchemy import and_, or_
 
-# Create logs directory if it doesn't exist
 log_dir = os.path.join(os.path.dirname(__file__), 'logs')
-os.makedirs(log_dir, exist_ok=True)
 
-# Configure logging with both file and console handlers
+# Invoice audit log in logs/invoice.log; console output goes through the root logger (logging_config).
+# The level comes from LOG_LEVEL / LOG_LEVELS (e.g. LOG_LEVELS=facturatie=DEBUG)
 logger = logging.getLogger(__name__)
-logger.setLevel(logging.DEBUG)
-
-# Create file handler for invoice logs
-invoice_log_file = os.path.join(log_dir, 'invoice.log')
-file_handler = logging.FileHandler(invoice_log_file)
-file_handler.setLevel(logging.DEBUG)
-
-# Create console handler
-console_handler = logging.StreamHandler(sys.stdout)
-console_handler.setLevel(logging.INFO)
-
-# Create formatters and add them to handlers
-log_format = logging.Formatter('%(asctime)s - %(levelname)s - %(message)s')
-file_handler.setFormatter(log_format)
-console_handler.setFormatter(log_format)
-
-# Add handlers to logger
-logger.addHandler(file_handler)
-logger.addHandler(console_handler)
+logger.addHandler(LogFileHandler(os.path.join(log_dir, 'invoice.log'), logging.Formatter('%(asctime)s - %(levelname)s - %(message)s')))
 
 # Create router for facturen
 router = APIRouter(
@@ -53,12 +30,9 @@ router = APIRouter(
     tags=["facturen"]
 )
 
+# Created by the first upload
 UPLOAD_FOLDER = "uploaded_facturen"
 
-# Ensure the upload folder exists
-if not os.path.exists(UPLOAD_FOLDER):
-    os.makedirs(UPLOAD_FOLDER)
-
 class FactuurBase(BaseModel):
     model_config = ConfigDict(from_attributes=True)
     
@@ -87,42 +61,48 @@ class FactuurBase(BaseModel):
     subtotal: Optional[float] = None
     breakdown: Optional[dict] = None
 
+def _or_empty(value):
+    return value or ""
+
+def _or_today(value):
+    return value or date.today()
+
+# Invoice list fields and the columns they are read from (see fieldsets.py)
+FACTUUR_FIELDS = FieldSet({
+    "id": ((Factuur.id,), None),
+    "opdrachtgever_id": ((Factuur.opdrachtgever_id,), None),
+    "opdrachtgever_naam": ((Factuur.opdrachtgever_naam,), _or_empty),
+    "factuurnummer": ((Factuur.factuurnummer,), _or_empty),
+    "locatie": ((Factuur.locatie,), _or_empty),
+    "factuurdatum": ((Factuur.factuurdatum,), _or_today),
+    "shift_date": ((Factuur.shift_date,), _or_today),
+    "shift_date_end": ((Factuur.shift_date_end,), _or_today),
+    "bedrag": ((Factuur.bedrag,), lambda bedrag: bedrag or 0.0),
+    "status": ((Factuur.status,), lambda status: status or "open"),
+    "factuur_text": ((Factuur.factuur_text,), _or_empty),
+    "kvk_nummer": ((Factuur.kvk_nummer,), _or_empty),
+    "adres": ((Factuur.adres,), _or_empty),
+    "postcode": ((Factuur.postcode,), _or_empty),
+    "stad": ((Factuur.stad,), _or_empty),
+    "telefoon": ((Factuur.telefoon,), _or_empty),
+    "email": ((Factuur.email,), _or_empty)
+})
+
 @router.get("/")
-async def get_facturen(
+def get_facturen(
+    fields: Optional[str] = fields_query(),
     current_user: dict = Depends(require_roles(["boekhouding", "admin", "planner"])),
     db: Session = Depends(get_db)
 ):
-    """Get all invoices."""
+    """Get all invoices. With fields=... only those fields, and only their columns are read."""
+    names = FACTUUR_FIELDS.parse(fields)
     try:
-        logger.info("Fetching all invoices")
-        facturen = db.query(Factuur).all()
-        logger.info(f"Successfully fetched {len(facturen)} invoices")
-        
-        # Transform the data into a list of dictionaries
-        facturen_list = []
-        for factuur in facturen:
-            factuur_dict = {
-                "id": factuur.id,
-                "opdrachtgever_id": factuur.opdrachtgever_id,
-                "opdrachtgever_naam": factuur.opdrachtgever_naam or "",
-                "factuurnummer": factuur.factuurnummer or "",
-                "locatie": factuur.locatie or "",
-                "factuurdatum": factuur.factuurdatum or date.today(),
-                "shift_date": factuur.shift_date or date.today(),
-                "shift_date_end": factuur.shift_date_end or date.today(),
-                "bedrag": factuur.bedrag or 0.0,
-                "status": factuur.status or "open",
-                "factuur_text": factuur.factuur_text or "",
-                "kvk_nummer": factuur.kvk_nummer or "",
-                "adres": factuur.adres or "",
-                "postcode": factuur.postcode or "",
-                "stad": factuur.stad or "",
-                "telefoon": factuur.telefoon or "",
-                "email": factuur.email or ""
-            }
-            facturen_list.append(factuur_dict)
-        
-        return facturen_list
+        # Only the requested columns, straight into dicts and orjson (see fast_json.py)
+        rows = db.query(*FACTUUR_FIELDS.columns(names, extra=(Factuur.id,))).all()
+        logger.debug("Fetched %s invoices", len(rows))
+
+        to_dict = FACTUUR_FIELDS.serializer(names, extra=(Factuur.id,))
+        return FastJSONResponse([to_dict(row) for row in rows])
     except Exception as e:
         logger.error(f"Error fetching invoices: {str(e)}", exc_info=True)
         raise HTTPException(
@@ -131,7 +111,7 @@ async def get_facturen(
         )
 
 @router.get("/{invoice_id}")
-async def get_factuur(
+def get_factuur(
     invoice_id: int,
     current_user: dict = Depends(require_roles(["boekhouding", "admin", "planner"])),
     db: Session = Depends(get_db)
@@ -182,7 +162,7 @@ async def get_factuur(
         )
 
 @router.post("/", response_model=FactuurBase, status_code=201)
-async def create_factuur(
+def create_factuur(
     factuur: FactuurBase,
     current_user: dict = Depends(require_roles(["boekhouding", "admin", "planner"])),
     db: Session = Depends(get_db)
@@ -278,7 +258,7 @@ async def create_factuur(
         raise HTTPException(status_code=500, detail=f"Error creating invoice: {str(e)}")
 
 @router.put("/{factuur_id}", response_model=FactuurBase)
-async def update_factuur(
+def update_factuur(
     factuur_id: int,
     factuur: FactuurBase,
     current_user: dict = Depends(require_roles(["boekhouding", "admin", "planner"])),
@@ -308,7 +288,7 @@ async def update_factuur(
         raise HTTPException(status_code=500, detail="Error updating invoice")
 
 @router.delete("/{factuur_id}")
-async def delete_factuur(
+def delete_factuur(
     factuur_id: int,
     current_user: dict = Depends(require_roles(["admin", "boekhouding"])),
     db: Session = Depends(get_db)
@@ -397,6 +377,7 @@ async def upload_factuur(file: UploadFile = File(...), current_user: dict = Depe
     Admins en Boekhouding kunnen facturen uploaden.
     De bestandsnaam moet het klantnummer of personeelsnummer bevatten.
     """
+    os.makedirs(UPLOAD_FOLDER, exist_ok=True)
     file_path = os.path.join(UPLOAD_FOLDER, file.filename)
     with open(file_path, "wb") as buffer:
         buffer.write(file.file.read())
@@ -408,7 +389,7 @@ async def list_uploaded_facturen(current_user: dict = Depends(require_roles(["ad
     """
     Geeft een lijst van alle geüploade facturen terug.
     """
-    files = os.listdir(UPLOAD_FOLDER)
+    files = os.listdir(UPLOAD_FOLDER) if os.path.isdir(UPLOAD_FOLDER) else []
     return {"facturen": files}
 
 @router.get("/download/{filename}")
@@ -429,11 +410,17 @@ async def download_factuur(filename: str, current_user: dict = Depends(get_curre
     return FileResponse(file_path, media_type='application/pdf', filename=filename)
 
 @router.get("/pdf-export/facturen")
-async def export_invoices_pdf(
+def export_invoices_pdf(
     current_user: dict = Depends(require_roles(["boekhouding", "admin", "planner"])),
     db: Session = Depends(get_db)
 ):
     """Export all invoices as PDF."""
+    # reportlab is only loaded by the endpoints that render PDFs
+    from reportlab.lib.pagesizes import A4
+    from reportlab.lib import colors
+    from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Table, TableStyle
+    from reportlab.lib.styles import getSampleStyleSheet
+
     try:
         # Create a buffer to store the PDF
         buffer = io.BytesIO()
@@ -490,7 +477,7 @@ async def export_invoices_pdf(
         raise HTTPException(status_code=500, detail=str(e))
 
 @router.get("/{factuur_id}/download")
-async def download_factuur(
+def download_factuur(
     factuur_id: int,
     current_user: dict = Depends(get_current_user),
     db: Session = Depends(get_db)
@@ -516,6 +503,8 @@ async def download_factuur(
         raise HTTPException(status_code=500, detail=str(e))
 
 def generate_pdf(factuur: FactuurBase) -> bytes:
+    from reportlab.pdfgen import canvas
+
     try:
         buffer = BytesIO()
         p = canvas.Canvas(buffer)
@@ -670,7 +659,7 @@ def generate_pdf(factuur: FactuurBase) -> bytes:
 
 @router.delete("/facturen/nummer/{factuurnummer}", include_in_schema=True)
 @router.delete("/api/facturen/nummer/{factuurnummer}", include_in_schema=True)
-async def delete_factuur_by_nummer(
+def delete_factuur_by_nummer(
     factuurnummer: str,
     current_user: dict = Depends(require_roles(["boekhouding", "admin"])),
     db: Session = Depends(get_db)
@@ -696,7 +685,7 @@ async def delete_factuur_by_nummer(
         raise HTTPException(status_code=500, detail=f"Error deleting invoice: {str(e)}")
 
 @router.get("/nummer/{factuurnummer}", response_model=FactuurBase)
-async def get_factuur_by_nummer(
+def get_factuur_by_nummer(
     factuurnummer: str,
     current_user: dict = Depends(require_roles(["boekhouding", "admin", "planner"])),
     db: Session = Depends(get_db)
@@ -716,7 +705,7 @@ async def get_factuur_by_nummer(
         raise HTTPException(status_code=500, detail="Error fetching invoice")
 
 @router.post("/{factuur_id}/send")
-async def send_factuur(
+def send_factuur(
     factuur_id: int,
     current_user: dict = Depends(require_roles(["boekhouding", "admin"])),
     db: Session = Depends(get_db)
@@ -724,9 +713,8 @@ async def send_factuur(
     """Send an invoice via email."""
     # Create a unique log file for this invoice send attempt
     log_file = os.path.join(log_dir, f'invoice_send_{factuur_id}_{datetime.now().strftime("%Y%m%d_%H%M%S")}.log')
-    file_handler = logging.FileHandler(log_file)
+    file_handler = LogFileHandler(log_file, logging.Formatter('%(asctime)s - %(levelname)s - %(message)s'))
     file_handler.setLevel(logging.DEBUG)
-    file_handler.setFormatter(logging.Formatter('%(asctime)s - %(levelname)s - %(message)s'))
     logger.addHandler(file_handler)
 
     try:
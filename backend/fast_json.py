@@ -0,0 +1,29 @@
+"""
+Fast path for large list responses.
+
+List endpoints project the columns they need straight from the query into plain
+dicts and return them as FastJSONResponse. A Response returned by an endpoint is
+sent as-is, so FastAPI skips response_model validation and jsonable_encoder;
+the response_model on the route stays for the OpenAPI schema and documents the
+shape the dicts must keep.
+
+orjson serialises date/datetime/time natively (ISO 8601), Decimal via _default.
+See benchmarks/list_serialization.py for the per-row cost of both paths.
+"""
+from decimal import Decimal
+from typing import Any
+from fastapi.responses import JSONResponse
+import orjson
+
+
+def _default(value: Any):
+    if isinstance(value, Decimal):
+        return float(value)
+    raise TypeError(f"Type is not JSON serializable: {type(value).__name__}")
+
+
+class FastJSONResponse(JSONResponse):
+    media_type = "application/json"
+
+    def render(self, content: Any) -> bytes:
+        return orjson.dumps(content, default=_default, option=orjson.OPT_NON_STR_KEYS)
@@ -1,43 +1,115 @@
-from fastapi import APIRouter, HTTPException, Depends
+from fastapi import APIRouter, HTTPException, Depends, Query
 from pydantic import BaseModel
-from typing import List
-from auth import get_current_user
+from typing import Awaitable, Callable, Dict, List, Optional, Set
+from sqlalchemy import select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+from auth import TokenUser, get_token_user
+from database import get_async_db
+from models import Favoriet, Medewerker, Opdrachtgever, Dienstaanvraag, Location, Shift
 
 router = APIRouter(
     prefix="/favorieten",
     tags=["favorieten"]
 )
 
+FAVORITES_PAGE_SIZE = 50
+FAVORITES_MAX_PAGE_SIZE = 200
+
 class Favorite(BaseModel):
     id: int = 0  # Wordt automatisch ingesteld bij creatie
     type: str  # Bijvoorbeeld "medewerker" of "locatie"
     target_id: int  # Het ID van de medewerker of locatie
-    name: str  # Een beschrijvende naam
+    name: str = ""  # Een beschrijvende naam; wordt bij het ophalen uit het doel gelezen
+
+
+# Per item_type: ids -> {id: name}, one query for all favorites of that type
+async def _medewerker_names(db: AsyncSession, ids: Set[int]) -> Dict[int, str]:
+    rows = await db.execute(select(Medewerker.id, Medewerker.naam).where(Medewerker.id.in_(ids)))
+    return {id: naam or "" for id, naam in rows}
+
+async def _opdrachtgever_names(db: AsyncSession, ids: Set[int]) -> Dict[int, str]:
+    rows = await db.execute(select(Opdrachtgever.id, Opdrachtgever.naam).where(Opdrachtgever.id.in_(ids)))
+    return {id: naam or "" for id, naam in rows}
+
+async def _locatie_names(db: AsyncSession, ids: Set[int]) -> Dict[int, str]:
+    rows = await db.execute(select(Location.id, Location.naam).where(Location.id.in_(ids)))
+    return {id: naam or "" for id, naam in rows}
+
+async def _dienstaanvraag_names(db: AsyncSession, ids: Set[int]) -> Dict[int, str]:
+    rows = await db.execute(
+        select(Dienstaanvraag.id, Dienstaanvraag.employee_id, Shift.titel, Shift.locatie, Shift.datum)
+        .outerjoin(Shift, Shift.id == Dienstaanvraag.shift_id)
+        .where(Dienstaanvraag.id.in_(ids))
+    )
+    names = {}
+    for id, employee_id, titel, locatie, datum in rows:
+        dienst = " ".join(part for part in (titel or locatie, datum.strftime("%d-%m-%Y") if datum else None) if part)
+        names[id] = f"{employee_id}: {dienst}" if dienst else f"Dienstaanvraag {id}"
+    return names
+
+RESOLVERS: Dict[str, Callable[[AsyncSession, Set[int]], Awaitable[Dict[int, str]]]] = {
+    "medewerker": _medewerker_names,
+    "opdrachtgever": _opdrachtgever_names,
+    "dienstaanvraag": _dienstaanvraag_names,
+    "locatie": _locatie_names,
+}
 
-# Simuleer een in-memory database met favorieten
-fake_favorites_db = []
-next_favorite_id = 1
+async def _to_favorites(db: AsyncSession, favorieten: List[Favoriet]) -> List[dict]:
+    """Favorites with the current name of their target; one query per item_type present."""
+    ids_by_type: Dict[str, Set[int]] = {}
+    for favoriet in favorieten:
+        ids_by_type.setdefault(favoriet.item_type, set()).add(favoriet.item_id)
+    names = {item_type: await RESOLVERS[item_type](db, ids) for item_type, ids in ids_by_type.items() if item_type in RESOLVERS}
+    return [
+        {
+            "id": favoriet.id,
+            "type": favoriet.item_type,
+            "target_id": favoriet.item_id,
+            # Deleted targets stay in the list, recognisably
+            "name": names.get(favoriet.item_type, {}).get(favoriet.item_id, "(verwijderd)")
+        }
+        for favoriet in favorieten
+    ]
 
 @router.get("/", response_model=List[Favorite])
-async def get_favorites(current_user: dict = Depends(get_current_user)):
-    """Haal alle favorieten op voor de ingelogde gebruiker."""
-    return fake_favorites_db
+async def get_favorites(
+    before_id: Optional[int] = Query(None, description="Alleen favorieten van voor deze favoriet (volgende pagina)"),
+    limit: int = Query(FAVORITES_PAGE_SIZE, ge=1, le=FAVORITES_MAX_PAGE_SIZE),
+    current_user: TokenUser = Depends(get_token_user),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """
+    Haal de favorieten van de ingelogde gebruiker op, nieuwste eerst, per pagina van `limit`.
+    Geef het ID van de laatste favoriet als before_id mee voor de volgende pagina.
+    """
+    query = select(Favoriet).where(Favoriet.user_id == current_user.id).order_by(Favoriet.id.desc()).limit(limit)
+    if before_id is not None:
+        query = query.where(Favoriet.id < before_id)
+    favorieten = (await db.execute(query)).scalars().all()
+    return await _to_favorites(db, favorieten)
 
 @router.post("/", response_model=Favorite, status_code=201)
-async def add_favorite(favorite: Favorite, current_user: dict = Depends(get_current_user)):
+async def add_favorite(favorite: Favorite, current_user: TokenUser = Depends(get_token_user), db: AsyncSession = Depends(get_async_db)):
     """Voeg een nieuwe favoriet toe."""
-    global next_favorite_id
-    favorite_dict = favorite.dict()
-    favorite_dict["id"] = next_favorite_id
-    next_favorite_id += 1
-    fake_favorites_db.append(favorite_dict)
-    return favorite_dict
+    if favorite.type not in RESOLVERS:
+        raise HTTPException(status_code=400, detail=f"Onbekend type: {favorite.type}. Beschikbaar: {', '.join(RESOLVERS)}")
+    favoriet = Favoriet(user_id=current_user.id, item_type=favorite.type, item_id=favorite.target_id)
+    db.add(favoriet)
+    try:
+        await db.commit()
+    except IntegrityError:
+        await db.rollback()
+        raise HTTPException(status_code=409, detail="Dit item staat al in je favorieten")
+    return (await _to_favorites(db, [favoriet]))[0]
 
 @router.delete("/{favorite_id}", response_model=Favorite)
-async def delete_favorite(favorite_id: int, current_user: dict = Depends(get_current_user)):
+async def delete_favorite(favorite_id: int, current_user: TokenUser = Depends(get_token_user), db: AsyncSession = Depends(get_async_db)):
     """Verwijder een favoriet op basis van het ID."""
-    for idx, fav in enumerate(fake_favorites_db):
-        if fav["id"] == favorite_id:
-            removed = fake_favorites_db.pop(idx)
-            return removed
-    raise HTTPException(status_code=404, detail="Favoriet niet gevonden")
+    favoriet = await db.get(Favoriet, favorite_id)
+    if favoriet is None or favoriet.user_id != current_user.id:
+        raise HTTPException(status_code=404, detail="Favoriet niet gevonden")
+    removed = (await _to_favorites(db, [favoriet]))[0]
+    await db.delete(favoriet)
+    await db.commit()
+    return removed
@@ -0,0 +1,70 @@
+"""
+Sparse fieldsets for list endpoints.
+
+`?fields=id,naam` limits every item of a list response to those keys. Each
+endpoint describes its fields as a FieldSet: per response key the columns it
+needs and an optional function that turns those column values into the
+response value. The endpoint selects only the columns of the requested fields,
+so payload size and database I/O both follow what the client asks for. Without
+`fields` the full response is returned.
+
+Rows are read by position: attribute access on a SQLAlchemy Row costs about a
+microsecond per column, indexing a fraction of that.
+"""
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+from fastapi import HTTPException, Query
+
+
+def fields_query():
+    return Query(None, description="Kommagescheiden lijst van velden, bijvoorbeeld fields=id,naam")
+
+
+class FieldSet:
+    def __init__(self, fields: Dict[str, Tuple[Sequence[Any], Optional[Callable[..., Any]]]]):
+        """
+        fields: response key -> (columns, convert), in response order. convert receives the
+        column values as arguments; None means "the value of the single column as-is".
+        """
+        self.fields = fields
+
+    def parse(self, fields: Optional[str]) -> List[str]:
+        """Requested keys in response order; all keys when `fields` is empty. 400 on unknown keys."""
+        if not fields:
+            return list(self.fields)
+        requested = {name.strip() for name in fields.split(",") if name.strip()}
+        unknown = requested - set(self.fields)
+        if unknown:
+            raise HTTPException(
+                status_code=400,
+                detail=f"Onbekende velden: {', '.join(sorted(unknown))}. Beschikbaar: {', '.join(self.fields)}"
+            )
+        return [name for name in self.fields if name in requested]
+
+    def columns(self, names: Sequence[str], extra: Sequence[Any] = ()) -> List[Any]:
+        """Columns to select for the given keys, each once; `extra` columns go first."""
+        columns: List[Any] = []
+        seen = set()
+        for column in tuple(extra) + tuple(column for name in names for column in self.fields[name][0]):
+            if id(column) not in seen:
+                seen.add(id(column))
+                columns.append(column)
+        return columns
+
+    def serializer(self, names: Sequence[str], extra: Sequence[Any] = ()) -> Callable[[Any], dict]:
+        """Row -> dict for a query that selects exactly self.columns(names, extra)."""
+        positions = {id(column): index for index, column in enumerate(self.columns(names, extra))}
+        plain, converted = [], []
+        for name in names:
+            columns, convert = self.fields[name]
+            indexes = tuple(positions[id(column)] for column in columns)
+            if convert is None:
+                plain.append((name, indexes[0]))
+            else:
+                converted.append((name, indexes, convert))
+
+        def to_dict(row) -> dict:
+            item = {name: row[index] for name, index in plain}
+            for name, indexes, convert in converted:
+                item[name] = convert(*[row[index] for index in indexes])
+            return item
+        return to_dict
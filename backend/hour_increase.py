@@ -35,7 +35,7 @@ class HourIncreaseResponse(BaseModel):
         orm_mode = True
 
 @router.post("/request", response_model=HourIncreaseResponse)
-async def request_hour_increase(
+def request_hour_increase(
     request: HourIncreaseRequest,
     current_user: User = Depends(require_roles(["employee"])),
     db: Session = Depends(get_db)
@@ -95,7 +95,7 @@ async def request_hour_increase(
         raise HTTPException(status_code=500, detail=str(e))
 
 @router.get("/requests", response_model=List[HourIncreaseResponse])
-async def get_hour_increase_requests(
+def get_hour_increase_requests(
     current_user: User = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
@@ -142,7 +142,7 @@ async def get_hour_increase_requests(
         )
 
 @router.post("/{request_id}/approve", response_model=HourIncreaseResponse)
-async def approve_hour_increase(
+def approve_hour_increase(
     request_id: int,
     current_user: User = Depends(require_roles(["admin", "planner"])),
     db: Session = Depends(get_db)
@@ -240,7 +240,7 @@ async def approve_hour_increase(
         raise HTTPException(status_code=500, detail=str(e))
 
 @router.post("/{request_id}/reject", response_model=HourIncreaseResponse)
-async def reject_hour_increase(
+def reject_hour_increase(
     request_id: int,
     current_user: User = Depends(require_roles(["admin", "planner"])),
     db: Session = Depends(get_db)
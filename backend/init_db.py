@@ -1,38 +1,85 @@
 from database import engine, SessionLocal
-from models import Base, User, Role
+from models import Base, User, Role, SchemaVersion
 from passlib.context import CryptContext
 from add_locations import add_locations
 from add_clients import add_clients
-from sqlalchemy import text
+from sqlalchemy import inspect, text
+from sqlalchemy.exc import SQLAlchemyError
+from datetime import datetime
+from typing import Set
 import logging
+import os
 
-# Set up logging
-logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 # Create password context
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 
-def init_db():
+ALEMBIC_INI = os.path.join(os.path.dirname(os.path.abspath(__file__)), "alembic.ini")
+
+# Schema changes to existing databases live in migrations/versions only (alembic upgrade head).
+# init_db creates the tables of a fresh database, seeds it, and records in schema_version the
+# migration heads that work was done for; the next boot skips it while both stay current.
+
+def migration_scripts():
+    from alembic.config import Config
+    from alembic.script import ScriptDirectory
+
+    config = Config(ALEMBIC_INI)
+    config.set_main_option("script_location", os.path.join(os.path.dirname(ALEMBIC_INI), "migrations"))
+    return ScriptDirectory.from_config(config)
+
+def schema_version(script) -> str:
+    """The heads of migrations/versions, the schema this code expects."""
+    return ",".join(sorted(script.get_heads()))
+
+def applied_heads(connection) -> Set[str]:
+    from alembic.runtime.migration import MigrationContext
+
+    return set(MigrationContext.configure(connection).get_current_heads())
+
+def schema_is_current(script) -> bool:
+    """Two small reads; False when the schema_version table does not exist yet."""
+    try:
+        with engine.connect() as connection:
+            version = connection.execute(
+                text("SELECT version FROM schema_version WHERE id = 1")
+            ).scalar()
+            applied = applied_heads(connection)
+    except SQLAlchemyError:
+        return False
+    return version == schema_version(script) and applied == set(script.get_heads())
+
+def mark_schema_current(version: str):
+    db = SessionLocal()
     try:
+        db.merge(SchemaVersion(id=1, version=version, applied_at=datetime.utcnow()))
+        db.commit()
+    finally:
+        db.close()
+
+def init_db(force: bool = False) -> bool:
+    """
+    Create tables, stamp a fresh database at the migration heads and seed roles, admin user,
+    clients and locations. Skipped when schema_version and alembic_version both match the
+    migration heads (unless force=True). Returns True when the schema work actually ran.
+
+    The version is only stored when everything succeeded, including the database being at
+    the migration heads, so a failed step is retried on the next boot.
+    """
+    script = migration_scripts()
+    version = schema_version(script)
+    if not force and schema_is_current(script):
+        logger.info(f"Schema version {version} is current, skipping database initialization")
+        return False
+
+    try:
+        fresh = not inspect(engine).get_table_names()
         logger.info("Creating tables if they don't exist...")
         # Log all tables that will be created
         for table in Base.metadata.tables:
             logger.info(f"Checking table: {table}")
         Base.metadata.create_all(bind=engine)
-        
-        # Add provincie column if it doesn't exist
-        with engine.connect() as connection:
-            try:
-                # First check if the column exists
-                result = connection.execute(text("SHOW COLUMNS FROM locations LIKE 'provincie'"))
-                if not result.fetchone():
-                    connection.execute(text("ALTER TABLE locations ADD COLUMN provincie VARCHAR(100)"))
-                    logger.info("Added provincie column to locations table")
-                else:
-                    logger.info("Provincie column already exists in locations table")
-            except Exception as e:
-                logger.warning(f"Error checking/adding provincie column: {str(e)}")
 
         # Check if year_client column exists in facturen table
         with engine.connect() as connection:
@@ -68,6 +115,20 @@ def init_db():
             except Exception as e:
                 logger.error(f"Error adding year_client column: {str(e)}")
                 raise
+
+        with engine.begin() as connection:
+            if fresh:
+                # create_all has just built the schema of the migration heads
+                from alembic.runtime.migration import MigrationContext
+                MigrationContext.configure(connection).stamp(script, "heads")
+                logger.info(f"Stamped new database at migration {version}")
+            applied = applied_heads(connection)
+        schema_complete = applied == set(script.get_heads())
+        if not schema_complete:
+            logger.warning(
+                f"Database is at migration {','.join(sorted(applied)) or 'none'}, the code expects {version}: "
+                "run 'alembic upgrade head'"
+            )
         
         db = SessionLocal()
         try:
@@ -140,7 +201,12 @@ def init_db():
             add_locations()
             logger.info("Locations initialized successfully!")
 
-            logger.info("Database initialized successfully!")
+            if schema_complete:
+                mark_schema_current(version)
+                logger.info(f"Database initialized successfully at schema version {version}!")
+            else:
+                logger.warning("Database initialized, schema version not stored until the migrations have run")
+            return True
         except Exception as e:
             logger.error(f"Error during database initialization: {str(e)}")
             logger.error(f"Error type: {type(e)}")
@@ -156,4 +222,4 @@ def init_db():
         raise
 
 if __name__ == "__main__":
-    init_db() 
\ No newline at end of file
+    init_db(force=True) 
\ No newline at end of file
@@ -3,10 +3,11 @@ from typing import List, Dict, Optional, Any
 from dataclasses import dataclass
 from decimal import Decimal, ROUND_HALF_UP
 from database import SessionLocal
-from models import Shift, Opdrachtgever, Location, Factuur, LocationRate
+from models import Shift, Opdrachtgever, Location, Factuur, LocationRate, InvoiceDirtyPeriod
 from facturatie import generate_invoice_number
+from job_telemetry import tracked_job, job_stats
+from logging_config import LogFileHandler, SampledDebug, configure_logging
 import logging
-import sys
 import os
 from reportlab.lib.pagesizes import A4
 from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Table, TableStyle
@@ -14,44 +15,18 @@ from reportlab.lib.styles import getSampleStyleSheet
 from reportlab.lib import colors
 import io
 import time
-from apscheduler.schedulers.background import BackgroundScheduler
-from apscheduler.triggers.cron import CronTrigger
 from sqlalchemy.orm import Session
 from sqlalchemy import and_, or_, text
 
-# Create logs directory in the backend directory
 log_dir = os.path.join(os.path.dirname(__file__), 'logs')
-os.makedirs(log_dir, exist_ok=True)
 
-# Configure logging
+# File log in logs/weekly_invoice_update.log; console output goes through the root logger
 logger = logging.getLogger(__name__)
-logger.setLevel(logging.DEBUG)
-
-# Create handlers
-file_handler = logging.FileHandler(os.path.join(log_dir, 'weekly_invoice_update.log'))
-console_handler = logging.StreamHandler(sys.stdout)
-
-# Create formatters and add it to handlers
-log_format = logging.Formatter('%(asctime)s - %(levelname)s - %(message)s')
-file_handler.setFormatter(log_format)
-console_handler.setFormatter(log_format)
-
-# Add handlers to the logger
-logger.addHandler(file_handler)
-logger.addHandler(console_handler)
+logger.addHandler(LogFileHandler(os.path.join(log_dir, 'weekly_invoice_update.log'), logging.Formatter('%(asctime)s - %(levelname)s - %(message)s')))
 
 # Scheduler Configuration
 SCHEDULE_INTERVAL = None  # Remove interval scheduling
 
-# Initialize scheduler with more detailed logging
-scheduler = BackgroundScheduler(
-    timezone='Europe/Amsterdam',
-    job_defaults={
-        'coalesce': True,
-        'max_instances': 1
-    }
-)
-
 @dataclass
 class LocationData:
     id: int
@@ -332,12 +307,12 @@ def generate_weekly_invoice_for_client(
         total_hours = Decimal('0')
         total_amount = Decimal('0')
         shift_details = []
+        row_debug = SampledDebug(logger)
         
         for shift in shifts:
             # Get rate for this location
             rate_config = location_rates.get(shift.location_id, RateConfig(rate=20.0))
-            logger.debug(f"Inside generate_weekly_invoice_for_client: Type of rate_config for shift {shift.id}: {type(rate_config)}")
-            logger.debug(f"Inside generate_weekly_invoice_for_client: rate_config content for shift {shift.id}: {rate_config.__dict__ if hasattr(rate_config, '__dict__') else str(rate_config)}")
+            row_debug("Shift %s at location %s: rate %s", shift.id, shift.location_id, rate_config.rate)
             
             # Calculate shift hours
             start_time = datetime.strptime(shift.start_tijd, "%H:%M").time()
@@ -472,8 +447,10 @@ def get_previous_week_dates():
     end_date = start_date + timedelta(days=6)
     return start_date, end_date
 
+@tracked_job("generate_weekly_invoices")
 def generate_weekly_invoices():
     """Generate weekly invoices for all clients."""
+    stats = job_stats()
     try:
         logger.info("Starting weekly invoice generation...")
         
@@ -486,8 +463,9 @@ def generate_weekly_invoices():
             logger.info(f"Total clients in database: {len(all_clients)}")
             
             # Log client details
+            client_debug = SampledDebug(logger)
             for client in all_clients:
-                logger.info(f"Client ID: {client.id}, Name: {client.naam}, Status: {client.status}")
+                client_debug("Client %s (%s), status %s", client.id, client.naam, client.status)
             
             # Get all clients (including those with None status)
             clients = db.query(Opdrachtgever).filter(
@@ -508,9 +486,10 @@ def generate_weekly_invoices():
             rates = db.query(LocationRate).all()
             logger.info(f"Found {len(rates)} location rates")
             
+            rate_debug = SampledDebug(logger)
             for rate in rates:
                 location_rates[rate.location_id] = get_location_rate(db, rate.location_id)
-                logger.info(f"Location {rate.location_id} rate: {location_rates[rate.location_id].rate}")
+                rate_debug("Location %s rate: %s", rate.location_id, location_rates[rate.location_id].rate)
             
             # Calculate date range for last week
             end_date = date.today()
@@ -519,6 +498,7 @@ def generate_weekly_invoices():
             logger.info(f"Checking shifts between {start_date} and {end_date}")
             
             invoices_generated = 0
+            shift_debug = SampledDebug(logger)
             
             # Generate invoices for each client
             for client in clients:
@@ -538,10 +518,11 @@ def generate_weekly_invoices():
                 ).all()
                 
                 logger.info(f"Found {len(shifts)} total shifts for client {client.id}")
+                stats.rows_scanned += len(shifts)
                 
                 # Log shift details
                 for shift in shifts:
-                    logger.info(f"Shift ID: {shift.id}, Date: {shift.datum}, Status: {shift.status}, Location: {shift.location_id}")
+                    shift_debug("Shift %s on %s, status %s, location %s", shift.id, shift.datum, shift.status, shift.location_id)
                 
                 invoice = generate_weekly_invoice_for_client(
                     db,
@@ -552,6 +533,7 @@ def generate_weekly_invoices():
                 )
                 if invoice:
                     invoices_generated += 1
+                    stats.invoices_created += 1
                     logger.info(f"Generated invoice {invoice.id} for client {client.id}")
                 else:
                     logger.info(f"No invoice generated for client {client.id}")
@@ -563,9 +545,12 @@ def generate_weekly_invoices():
             
     except Exception as e:
         logger.error(f"Error in generate_weekly_invoices: {str(e)}", exc_info=True)
+        stats.record_error(e)
 
+@tracked_job("check_new_shifts")
 def check_new_shifts():
     """Check for new shifts and update invoices if needed."""
+    stats = job_stats()
     db = SessionLocal()
     try:
         # Get all clients (including those with None status)
@@ -580,6 +565,7 @@ def check_new_shifts():
         # Calculate date range for last week
         end_date = date.today()
         start_date = end_date - timedelta(days=7)
+        shift_debug = SampledDebug(logger)
         
         for client in clients:
             logger.info(f"Checking shifts for client {client.id} ({client.naam})")
@@ -613,10 +599,11 @@ def check_new_shifts():
             ).all()
             
             logger.info(f"Found {len(new_shifts)} new shifts for client {client.id}")
+            stats.rows_scanned += len(new_shifts)
             
             # Log shift details
             for shift in new_shifts:
-                logger.info(f"New shift ID: {shift.id}, Date: {shift.datum}, Status: {shift.status}, Location: {shift.location_id}")
+                shift_debug("New shift %s on %s, status %s, location %s", shift.id, shift.datum, shift.status, shift.location_id)
             
             if new_shifts:
                 # Generate or update invoice
@@ -628,6 +615,7 @@ def check_new_shifts():
                     location_rates=location_rates
                 )
                 if invoice:
+                    stats.invoices_created += 1
                     logger.info(f"Generated invoice {invoice.id} for client {client.id}")
                 else:
                     logger.info(f"No invoice generated for client {client.id}")
@@ -635,60 +623,69 @@ def check_new_shifts():
         logger.info("Checked for new shifts and updated invoices")
     except Exception as e:
         logger.error(f"Error checking new shifts: {str(e)}", exc_info=True)
+        stats.record_error(e)
     finally:
         db.close()
 
-def main():
+@tracked_job("process_dirty_invoice_periods")
+def process_dirty_invoice_periods():
+    """
+    Factureer de (opdrachtgever, week)-combinaties die door de shift lifecycle job zijn gemarkeerd.
+    Alleen afgelopen weken worden verwerkt; de markering wordt verwijderd zodra de factuur is gemaakt.
+    """
+    stats = job_stats()
+    db = SessionLocal()
     try:
-        logger.info("Starting invoice generation scheduler...")
-        
-        # Add the weekly invoice generation job with cron trigger for Monday at 9:00 AM
-        scheduler.add_job(
-            generate_weekly_invoices,
-            trigger=CronTrigger(
-                day_of_week='mon',
-                hour=9,
-                minute=0
-            ),
-            id='weekly_invoice_generation',
-            replace_existing=True
-        )
+        current_week_start = date.today() - timedelta(days=date.today().weekday())
+        periods = db.query(InvoiceDirtyPeriod).filter(
+            InvoiceDirtyPeriod.period_start < current_week_start
+        ).order_by(InvoiceDirtyPeriod.opdrachtgever_id, InvoiceDirtyPeriod.period_start).all()
+        stats.rows_scanned += len(periods)
+        if not periods:
+            return
+
+        logger.info(f"Processing {len(periods)} dirty invoice periods")
+        location_rates_per_client: Dict[int, Dict[int, RateConfig]] = {}
+        for period in periods:
+            client_id = period.opdrachtgever_id
+            if client_id not in location_rates_per_client:
+                location_ids = [
+                    loc_id for (loc_id,) in
+                    db.query(Location.id).filter(Location.opdrachtgever_id == client_id).all()
+                ]
+                location_rates_per_client[client_id] = {
+                    loc_id: get_location_rate(db, loc_id) for loc_id in location_ids
+                }
+            location_rates = location_rates_per_client[client_id]
+            if location_rates:
+                invoice = generate_weekly_invoice_for_client(
+                    db=db,
+                    client_id=client_id,
+                    start_date=period.period_start,
+                    end_date=period.period_start + timedelta(days=6),
+                    location_rates=location_rates
+                )
+                if invoice:
+                    stats.invoices_created += 1
+            db.delete(period)
+            db.commit()
+            stats.rows_written += 1
+    except Exception as e:
+        logger.error(f"Error processing dirty invoice periods: {str(e)}", exc_info=True)
+        stats.record_error(e)
+        db.rollback()
+    finally:
+        db.close()
 
-        # Start the scheduler
-        scheduler.start()
-        logger.info("Scheduler started successfully - Running every Monday at 9:00 AM")
-        
-        # Print detailed scheduler status
-        logger.info("Scheduler Status:")
-        logger.info(f"Running: {scheduler.running}")
-        logger.info(f"Number of jobs: {len(scheduler.get_jobs())}")
-        for job in scheduler.get_jobs():
-            logger.info(f"Job ID: {job.id}")
-            logger.info(f"Next run time: {job.next_run_time}")
-            logger.info(f"Trigger: {job.trigger}")
-        
-        # Keep the script running
-        while True:
-            time.sleep(1)
-            
-    except (KeyboardInterrupt, SystemExit):
-        logger.info("Received shutdown signal")
-        scheduler.shutdown()
-        logger.info("Scheduler shutdown complete")
+def main():
+    """One-off run of both invoice jobs; the schedule itself lives in worker.py."""
+    try:
+        generate_weekly_invoices()
+        process_dirty_invoice_periods()
     except Exception as e:
-        logger.error(f"Error in scheduler: {str(e)}", exc_info=True)
-        scheduler.shutdown()
-        logger.info("Scheduler shutdown due to error")
+        logger.error(f"Error in invoice generation: {str(e)}", exc_info=True)
 
 if __name__ == "__main__":
-    # Ensure the log directory exists
-    log_dir = os.path.join(os.path.dirname(__file__), 'logs')
-    os.makedirs(log_dir, exist_ok=True)
-    
-    # Configure logging with more detailed format
-    log_format = logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s')
-    file_handler.setFormatter(log_format)
-    console_handler.setFormatter(log_format)
-    
+    configure_logging()
     logger.info("Starting invoice generation system...")
     main() 
\ No newline at end of file
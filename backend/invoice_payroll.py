@@ -1,18 +1,13 @@
 from datetime import datetime, time, date, timedelta
 from typing import List, Dict, Any, Optional
 from sqlalchemy.orm import Session
-from models import Factuur, Verloning, Shift, Medewerker, Opdrachtgever, Tarief, Location
-import holidays
+from models import Factuur, Verloning, Shift, Medewerker, Opdrachtgever, Location
+from tarief_cache import tarief_snapshot
+from functools import lru_cache
 import json
-from reportlab.lib.pagesizes import A4
-from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Table, TableStyle
-from reportlab.lib.styles import getSampleStyleSheet
-from reportlab.lib import colors
 import io
 import logging
 
-# Configure logging
-logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 # Constants for time ranges and bonus percentages
@@ -34,6 +29,12 @@ NEW_YEARS_EVE_BONUS = 1.00  # +100%
 # VAT percentage
 VAT_PERCENTAGE = 0.21
 
+@lru_cache(maxsize=8)
+def _dutch_holidays(year: int):
+    # holidays is a large package; load it on first use and build each year's calendar once
+    import holidays
+    return holidays.Netherlands(years=[year])
+
 def calculate_shift_hours(start_time: time, end_time: time) -> Dict[str, float]:
     """Calculate the hours worked in different time periods."""
     def time_to_minutes(t: time) -> int:
@@ -79,7 +80,7 @@ def calculate_shift_payment(shift: Shift, base_rate: float, shift_date: date) ->
     
     # Check for special conditions
     is_weekend = shift_date.weekday() in [5, 6]  # Saturday or Sunday
-    is_holiday = shift_date in holidays.Netherlands(years=[shift_date.year])
+    is_holiday = shift_date in _dutch_holidays(shift_date.year)
     is_new_years_eve = (shift_date.month == 12 and shift_date.day == 31 and 
                        start_time >= NEW_YEARS_EVE_START)
     
@@ -238,18 +239,15 @@ def generate_payroll(db: Session, medewerker_id: int, period: str) -> Verloning:
     # Calculate total payment and breakdown
     total_payment = 0.0
     breakdown = []
+    # Rates come from the cached tarieven table, not a query per shift
+    tarieven = tarief_snapshot(db)
     
     for shift in shifts:
         # Get base rate for the shift
-        base_rate = db.query(Tarief).filter(
-            Tarief.locatie == shift.locatie,
-            Tarief.pas_type == shift.required_profile
-        ).first()
+        base_rate = tarieven.rate(shift.locatie, shift.required_profile)
         
-        if not base_rate:
+        if base_rate is None:
             base_rate = 20.0  # Default rate
-        else:
-            base_rate = base_rate.bedrag
         
         # Calculate payment for shift
         payment = calculate_shift_payment(shift, base_rate, shift.datum)
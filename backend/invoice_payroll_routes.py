@@ -24,8 +24,6 @@ router = APIRouter(
 UPLOADS_DIR = Path("uploads/loonstroken")
 UPLOADS_DIR.mkdir(parents=True, exist_ok=True)
 
-# Configure logging
-logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 # Invoice endpoints
@@ -158,7 +156,7 @@ def update_invoice(
     return {"message": "Invoice updated successfully"}
 
 @router.delete("/facturen/{invoice_id}")
-async def delete_invoice(
+def delete_invoice(
     invoice_id: int,
     db: Session = Depends(get_db),
     current_user: dict = Depends(require_roles(["admin", "boekhouding"]))
@@ -183,7 +181,7 @@ async def delete_invoice(
         raise HTTPException(status_code=500, detail="Error deleting invoice")
 
 @router.delete("/facturen/by-factuurnummer/{factuurnummer}")
-async def delete_invoice_by_factuurnummer(
+def delete_invoice_by_factuurnummer(
     factuurnummer: str,
     db: Session = Depends(get_db),
     current_user: dict = Depends(require_roles(["admin", "boekhouding"]))
@@ -333,7 +331,7 @@ def export_invoice_pdf(invoice_id: int, db: Session = Depends(get_db)):
     )
 
 @router.post("/verloning/upload")
-async def upload_payroll_file(
+def upload_payroll_file(
     employee_id: int,
     period: str,
     file: UploadFile = File(...),
@@ -474,7 +472,7 @@ def export_payroll_pdf(payroll_id: int, db: Session = Depends(get_db)):
     )
 
 @router.get("/generate")
-async def generate_invoice_endpoint(
+def generate_invoice_endpoint(
     opdrachtgever_id: int,
     start_date: date,
     end_date: date,
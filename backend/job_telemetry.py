@@ -0,0 +1,238 @@
+"""
+Telemetry for scheduled jobs.
+
+Wrap a job with @tracked_job("name") and every run is stored in job_runs with
+its duration and counters. Inside the job, job_stats() returns the counters of
+the current run:
+
+    stats = job_stats()
+    stats.rows_scanned += len(shifts)
+    stats.invoices_created += 1
+
+Outside a tracked run (e.g. when a job function is called from an endpoint)
+job_stats() returns a throwaway object, so jobs never have to check.
+
+Frequent polling jobs use @tracked_job("name", skip_idle=True): runs that
+wrote nothing and hit no errors are then not stored. The worker deletes runs
+older than JOB_RUN_RETENTION_DAYS (default 30) once a day (prune_job_runs).
+
+GET /admin/jobs summarises recent runs per job with duration percentiles.
+"""
+from contextvars import ContextVar
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from functools import wraps
+from typing import Dict, List, Optional
+from fastapi import APIRouter, Depends, Query
+from pydantic import BaseModel
+from sqlalchemy import and_, case, func
+from sqlalchemy.orm import Session
+from auth import require_roles
+from database import get_db, SessionLocal
+from models import JobRun, User
+import logging
+import math
+import os
+import time
+
+logger = logging.getLogger(__name__)
+
+JOB_RUN_RETENTION_DAYS = int(os.getenv("JOB_RUN_RETENTION_DAYS", "30"))
+
+router = APIRouter(
+    prefix="/admin/jobs",
+    tags=["admin"]
+)
+
+@dataclass
+class JobStats:
+    rows_scanned: int = 0
+    rows_written: int = 0
+    invoices_created: int = 0
+    error_count: int = 0
+    error_message: Optional[str] = None
+
+    def record_error(self, error: Exception) -> None:
+        """For jobs that catch per-item errors and carry on."""
+        self.error_count += 1
+        if self.error_message is None:
+            self.error_message = str(error)[:2000]
+
+    @property
+    def idle(self) -> bool:
+        """Nothing written, nothing created, no errors: the run only looked."""
+        return not (self.rows_written or self.invoices_created or self.error_count)
+
+_current_stats: ContextVar[Optional[JobStats]] = ContextVar("job_stats", default=None)
+
+def job_stats() -> JobStats:
+    stats = _current_stats.get()
+    return stats if stats is not None else JobStats()
+
+def _store_run(job_name: str, started_at: datetime, duration_ms: int, stats: JobStats) -> None:
+    # Own session: the job may have rolled back or closed its session by now
+    db = SessionLocal()
+    try:
+        db.add(JobRun(
+            job_name=job_name,
+            started_at=started_at,
+            finished_at=started_at + timedelta(milliseconds=duration_ms),
+            duration_ms=duration_ms,
+            status="failed" if stats.error_count else "success",
+            rows_scanned=stats.rows_scanned,
+            rows_written=stats.rows_written,
+            invoices_created=stats.invoices_created,
+            error_count=stats.error_count,
+            error_message=stats.error_message
+        ))
+        db.commit()
+    except Exception as e:
+        # Telemetry must never break the job itself
+        logger.warning(f"Could not store telemetry for job {job_name}: {str(e)}")
+        db.rollback()
+    finally:
+        db.close()
+
+def tracked_job(job_name: str, skip_idle: bool = False):
+    """Record start/end, duration and counters of every call to the decorated job (with
+    skip_idle, only of the calls that did something)."""
+    def decorator(func):
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            stats = JobStats()
+            token = _current_stats.set(stats)
+            started_at = datetime.utcnow()
+            start = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            except Exception as e:
+                stats.record_error(e)
+                raise
+            finally:
+                _current_stats.reset(token)
+                duration_ms = int((time.perf_counter() - start) * 1000)
+                if not (skip_idle and stats.idle):
+                    _store_run(job_name, started_at, duration_ms, stats)
+        return wrapper
+    return decorator
+
+
+def prune_job_runs() -> int:
+    """Delete runs older than JOB_RUN_RETENTION_DAYS: per job one range delete on (job_name, started_at)."""
+    cutoff = datetime.utcnow() - timedelta(days=JOB_RUN_RETENTION_DAYS)
+    db = SessionLocal()
+    try:
+        deleted = 0
+        for (job_name,) in db.query(JobRun.job_name).distinct().all():
+            deleted += db.query(JobRun).filter(
+                JobRun.job_name == job_name,
+                JobRun.started_at < cutoff
+            ).delete(synchronize_session=False)
+        db.commit()
+        logger.info(f"Pruned {deleted} job runs older than {JOB_RUN_RETENTION_DAYS} days")
+        return deleted
+    except Exception as e:
+        logger.error(f"Pruning job runs failed: {str(e)}")
+        db.rollback()
+        return 0
+    finally:
+        db.close()
+
+
+class JobRunResponse(BaseModel):
+    id: int
+    job_name: str
+    started_at: datetime
+    finished_at: datetime
+    duration_ms: int
+    status: str
+    rows_scanned: int
+    rows_written: int
+    invoices_created: int
+    error_count: int
+    error_message: Optional[str] = None
+
+    class Config:
+        orm_mode = True
+
+class JobSummary(BaseModel):
+    job_name: str
+    runs: int
+    failures: int
+    last_run: datetime
+    last_status: str
+    p50_ms: int
+    p90_ms: int
+    p99_ms: int
+    max_ms: int
+    avg_rows_scanned: float
+    avg_rows_written: float
+    invoices_created: int
+
+def _percentile(sorted_values: List[int], pct: float) -> int:
+    """Nearest-rank percentile of an already sorted list."""
+    rank = math.ceil(pct / 100 * len(sorted_values))
+    return sorted_values[max(rank, 1) - 1]
+
+@router.get("", response_model=List[JobSummary])
+def get_job_summaries(
+    days: int = Query(7, ge=1, le=90),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(require_roles(["admin"]))
+):
+    """Per job: aantal runs, fouten en duur-percentielen over de afgelopen `days` dagen.
+
+    Tellingen en gemiddelden rekent de database uit; alleen de duur komt per run mee, voor de percentielen.
+    """
+    since = datetime.utcnow() - timedelta(days=days)
+    totals = db.query(
+        JobRun.job_name,
+        func.count(JobRun.id).label("runs"),
+        func.sum(case((JobRun.status == "failed", 1), else_=0)).label("failures"),
+        func.max(JobRun.started_at).label("last_run"),
+        func.avg(func.coalesce(JobRun.rows_scanned, 0)).label("avg_rows_scanned"),
+        func.avg(func.coalesce(JobRun.rows_written, 0)).label("avg_rows_written"),
+        func.sum(func.coalesce(JobRun.invoices_created, 0)).label("invoices_created")
+    ).filter(JobRun.started_at >= since).group_by(JobRun.job_name).subquery()
+    rows = db.query(totals, JobRun.status).join(
+        JobRun, and_(JobRun.job_name == totals.c.job_name, JobRun.started_at == totals.c.last_run)
+    ).order_by(totals.c.job_name).all()
+
+    durations: Dict[str, List[int]] = {}
+    for job_name, duration_ms in db.query(JobRun.job_name, JobRun.duration_ms).filter(
+        JobRun.started_at >= since
+    ).order_by(JobRun.job_name, JobRun.duration_ms):
+        durations.setdefault(job_name, []).append(duration_ms)
+
+    summaries = {}
+    for row in rows:
+        if row.job_name in summaries:
+            continue  # Two runs started in the same instant; either status will do
+        job_durations = durations[row.job_name]
+        summaries[row.job_name] = JobSummary(
+            job_name=row.job_name,
+            runs=row.runs,
+            failures=row.failures or 0,
+            last_run=row.last_run,
+            last_status=row.status,
+            p50_ms=_percentile(job_durations, 50),
+            p90_ms=_percentile(job_durations, 90),
+            p99_ms=_percentile(job_durations, 99),
+            max_ms=job_durations[-1],
+            avg_rows_scanned=round(float(row.avg_rows_scanned or 0), 1),
+            avg_rows_written=round(float(row.avg_rows_written or 0), 1),
+            invoices_created=row.invoices_created or 0
+        )
+    return list(summaries.values())
+
+@router.get("/{job_name}/runs", response_model=List[JobRunResponse])
+def get_job_runs(
+    job_name: str,
+    limit: int = Query(50, ge=1, le=500),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(require_roles(["admin"]))
+):
+    """De meest recente runs van één job, nieuwste eerst."""
+    return db.query(JobRun).filter(JobRun.job_name == job_name).order_by(
+        JobRun.started_at.desc()
+    ).limit(limit).all()
@@ -0,0 +1,123 @@
+"""
+Leader election for the job worker.
+
+Only the replica that holds the lock runs the scheduler, so every periodic job
+fires exactly once no matter how many workers are deployed.
+
+- MySQL: GET_LOCK on a dedicated connection. The lock lives as long as that
+  connection, so a crashed leader releases it automatically.
+- Other databases (SQLite in development): a lease row in scheduler_leases that
+  the leader renews; a standby takes over once the lease has expired.
+"""
+from datetime import datetime, timedelta
+from typing import Optional
+from sqlalchemy import text
+from sqlalchemy.engine import Connection, Engine
+from sqlalchemy.exc import IntegrityError, SQLAlchemyError
+from models import SchedulerLease
+import logging
+import os
+import socket
+
+logger = logging.getLogger(__name__)
+
+LEASE_SECONDS = 60
+
+
+class LeaderLock:
+    """Try to become (and stay) the leader for `name`; call renew() well within LEASE_SECONDS."""
+
+    def __init__(self, engine: Engine, name: str = "planner_job_worker", lease_seconds: int = LEASE_SECONDS):
+        self.engine = engine
+        self.name = name
+        self.lease_seconds = lease_seconds
+        self.holder = f"{socket.gethostname()}:{os.getpid()}"
+        self.use_get_lock = engine.dialect.name == "mysql"
+        self._connection: Optional[Connection] = None
+
+    def try_acquire(self) -> bool:
+        try:
+            if self.use_get_lock:
+                return self._get_lock()
+            return self._take_lease()
+        except SQLAlchemyError as e:
+            logger.warning("Leader election for %s failed: %s", self.name, e)
+            self._drop_connection()
+            return False
+
+    def renew(self) -> bool:
+        """True while this process is still the leader."""
+        try:
+            if self.use_get_lock:
+                if self._connection is None:
+                    return False
+                owner = self._connection.execute(
+                    text("SELECT IS_USED_LOCK(:name) = CONNECTION_ID()"), {"name": self.name}
+                ).scalar()
+                return bool(owner)
+            return self._take_lease()
+        except SQLAlchemyError as e:
+            logger.warning("Could not renew leadership for %s: %s", self.name, e)
+            self._drop_connection()
+            return False
+
+    def release(self) -> None:
+        try:
+            if self.use_get_lock:
+                if self._connection is not None:
+                    self._connection.execute(text("SELECT RELEASE_LOCK(:name)"), {"name": self.name})
+            else:
+                with self.engine.begin() as conn:
+                    conn.execute(
+                        SchedulerLease.__table__.update()
+                        .where(SchedulerLease.name == self.name, SchedulerLease.holder == self.holder)
+                        .values(expires_at=datetime.utcnow())
+                    )
+        except SQLAlchemyError as e:
+            logger.warning("Could not release leadership for %s: %s", self.name, e)
+        finally:
+            self._drop_connection()
+
+    def _get_lock(self) -> bool:
+        if self._connection is None:
+            # Autocommit so the connection never sits in an open transaction while it holds the lock
+            self._connection = self.engine.connect().execution_options(isolation_level="AUTOCOMMIT")
+        acquired = self._connection.execute(
+            text("SELECT GET_LOCK(:name, 0)"), {"name": self.name}
+        ).scalar()
+        if acquired != 1:
+            self._drop_connection()
+            return False
+        return True
+
+    def _take_lease(self) -> bool:
+        """Claim or extend the lease with a conditional UPDATE; insert the row the first time."""
+        now = datetime.utcnow()
+        expires_at = now + timedelta(seconds=self.lease_seconds)
+        table = SchedulerLease.__table__
+        with self.engine.begin() as conn:
+            updated = conn.execute(
+                table.update()
+                .where(
+                    SchedulerLease.name == self.name,
+                    (SchedulerLease.holder == self.holder) | (SchedulerLease.expires_at < now)
+                )
+                .values(holder=self.holder, expires_at=expires_at)
+            ).rowcount
+        if updated == 1:
+            return True
+        try:
+            with self.engine.begin() as conn:
+                conn.execute(table.insert().values(name=self.name, holder=self.holder, expires_at=expires_at))
+            return True
+        except IntegrityError:
+            # Another process holds a live lease
+            return False
+
+    def _drop_connection(self) -> None:
+        if self._connection is not None:
+            try:
+                self._connection.close()
+            except SQLAlchemyError:
+                pass
+            self._connection = None
@@ -0,0 +1,129 @@
+from datetime import date
+from typing import Dict, Iterable, Optional, Tuple
+from sqlalchemy import and_, func, or_, select
+from sqlalchemy.orm import Session
+from models import EmployeeLocationExperience, Shift
+import logging
+
+logger = logging.getLogger(__name__)
+
+experience_table = EmployeeLocationExperience.__table__
+
+
+def _upsert(db: Session, rows):
+    """INSERT ... ON DUPLICATE KEY UPDATE (MySQL) / ON CONFLICT (SQLite) that adds counts and keeps the latest date."""
+    if db.get_bind().dialect.name == "mysql":
+        from sqlalchemy.dialects.mysql import insert
+        stmt = insert(experience_table).values(rows)
+        new = stmt.inserted
+        stmt = stmt.on_duplicate_key_update(
+            completed_count=experience_table.c.completed_count + new.completed_count,
+            last_completed_date=func.greatest(
+                func.coalesce(experience_table.c.last_completed_date, new.last_completed_date),
+                new.last_completed_date
+            )
+        )
+    else:
+        from sqlalchemy.dialects.sqlite import insert
+        stmt = insert(experience_table).values(rows)
+        new = stmt.excluded
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[experience_table.c.employee_id, experience_table.c.location_id],
+            set_={
+                "completed_count": experience_table.c.completed_count + new.completed_count,
+                "last_completed_date": func.max(
+                    func.coalesce(experience_table.c.last_completed_date, new.last_completed_date),
+                    new.last_completed_date
+                )
+            }
+        )
+    db.execute(stmt)
+
+
+def record_completed_shifts(db: Session, shifts: Iterable[Tuple[Optional[str], Optional[int], date]]) -> int:
+    """
+    Verwerk shifts die net op 'completed' zijn gezet in de ervaringstabel.
+    Verwacht (medewerker_id, location_id, datum) per shift; aggregeert per paar en schrijft
+    alles in één upsert. Commit wordt aan de aanroeper overgelaten.
+    """
+    totals: Dict[Tuple[str, int], Tuple[int, date]] = {}
+    for employee_id, location_id, datum in shifts:
+        if not employee_id or location_id is None:
+            continue
+        if isinstance(datum, str):
+            datum = date.fromisoformat(datum[:10])
+        count, last = totals.get((employee_id, location_id), (0, None))
+        totals[(employee_id, location_id)] = (count + 1, max(last, datum) if last else datum)
+
+    if not totals:
+        return 0
+
+    _upsert(db, [
+        {
+            "employee_id": employee_id,
+            "location_id": location_id,
+            "completed_count": count,
+            "last_completed_date": last
+        }
+        for (employee_id, location_id), (count, last) in totals.items()
+    ])
+    return len(totals)
+
+
+def _completed_source():
+    return select(
+        Shift.medewerker_id,
+        Shift.location_id,
+        func.count(Shift.id),
+        func.max(Shift.datum)
+    ).where(
+        Shift.status == "completed",
+        Shift.medewerker_id.isnot(None),
+        Shift.location_id.isnot(None)
+    ).group_by(Shift.medewerker_id, Shift.location_id)
+
+
+def recompute_experience(db: Session, pairs: Iterable[Tuple[Optional[str], Optional[int]]]) -> int:
+    """
+    Herbereken de ervaring van deze (medewerker_id, location_id)-paren uit shifts, voor als een
+    voltooide shift heropend, omgezet of verwijderd wordt: optellen kan dan niet meer. Schrijft de
+    openstaande wijzigingen eerst weg; commit wordt aan de aanroeper overgelaten.
+    """
+    pairs = {(employee_id, location_id) for employee_id, location_id in pairs if employee_id and location_id is not None}
+    if not pairs:
+        return 0
+    db.flush()
+    db.execute(experience_table.delete().where(or_(*[
+        and_(experience_table.c.employee_id == employee_id, experience_table.c.location_id == location_id)
+        for employee_id, location_id in pairs
+    ])))
+    result = db.execute(experience_table.insert().from_select(
+        ["employee_id", "location_id", "completed_count", "last_completed_date"],
+        _completed_source().where(or_(*[
+            and_(Shift.medewerker_id == employee_id, Shift.location_id == location_id)
+            for employee_id, location_id in pairs
+        ]))
+    ))
+    return result.rowcount
+
+
+def rebuild_experience(db: Session) -> int:
+    """Herbereken de hele tabel uit shifts (backfill of herstel na handmatige correcties)."""
+    db.execute(experience_table.delete())
+    result = db.execute(experience_table.insert().from_select(
+        ["employee_id", "location_id", "completed_count", "last_completed_date"],
+        _completed_source()
+    ))
+    logger.info("Rebuilt employee location experience: %s rows", result.rowcount)
+    return result.rowcount
+
+
+if __name__ == "__main__":
+    from database import SessionLocal
+
+    session = SessionLocal()
+    try:
+        rebuild_experience(session)
+        session.commit()
+    finally:
+        session.close()
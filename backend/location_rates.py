@@ -1,11 +1,12 @@
-from fastapi import APIRouter, HTTPException, Depends
-from sqlalchemy.orm import Session, joinedload
+from fastapi import APIRouter, HTTPException, Depends, Request
+from sqlalchemy.orm import Session
 from database import get_db
 from models import LocationRate, LocationRateCreate, LocationRatePydantic, Location
 from auth import require_roles, get_current_user
 from typing import List
 import logging
 from datetime import datetime
+import reference_cache
 
 logger = logging.getLogger(__name__)
 
@@ -15,50 +16,50 @@ router = APIRouter(
 )
 
 @router.get("", response_model=List[LocationRatePydantic])
-async def get_location_rates(
+def get_location_rates(
+    request: Request,
     db: Session = Depends(get_db),
     current_user: dict = Depends(require_roles(["admin"]))
 ):
     try:
-        # Query rates with location relationship
-        rates = db.query(LocationRate).options(joinedload(LocationRate.location)).all()
-        
-        if not rates:
-            return []
-        
-        # Convert to dict and handle the location relationship
-        result = []
-        for rate in rates:
-            try:
-                rate_dict = {
-                    "id": int(rate.id),
-                    "location_id": int(rate.location_id),
-                    "pass_type": str(rate.pass_type),
-                    "base_rate": float(rate.base_rate) if rate.base_rate is not None else 0.0,
-                    "evening_rate": float(rate.evening_rate) if rate.evening_rate is not None else 0.0,
-                    "night_rate": float(rate.night_rate) if rate.night_rate is not None else 0.0,
-                    "weekend_rate": float(rate.weekend_rate) if rate.weekend_rate is not None else 0.0,
-                    "holiday_rate": float(rate.holiday_rate) if rate.holiday_rate is not None else 0.0,
-                    "new_years_eve_rate": float(rate.new_years_eve_rate) if rate.new_years_eve_rate is not None else 0.0,
-                    "created_at": rate.created_at.isoformat() if rate.created_at else None,
-                    "updated_at": rate.updated_at.isoformat() if rate.updated_at else None,
-                    "location": {
-                        "id": int(rate.location.id),
-                        "naam": str(rate.location.naam)
-                    } if rate.location else None
-                }
-                result.append(rate_dict)
-            except Exception as e:
-                print(f"Error processing rate {rate.id}: {str(e)}")
-                continue
-        
-        return result
+        # Served from reference_cache; includes the location name, so location writes invalidate it too
+        return reference_cache.cached_response(request, ("location_rates", "locations"), lambda: _load_location_rates(db))
     except Exception as e:
-        print(f"Error in get_location_rates: {str(e)}")
+        logger.exception("Error in get_location_rates")
         raise HTTPException(status_code=500, detail=f"Failed to fetch location rates: {str(e)}")
 
+def _load_location_rates(db: Session) -> List[dict]:
+    # Columns straight into dicts, no ORM objects or per-row validation (see fast_json.py)
+    rows = db.query(
+        LocationRate.id, LocationRate.location_id, LocationRate.pass_type, LocationRate.base_rate,
+        LocationRate.evening_rate, LocationRate.night_rate, LocationRate.weekend_rate,
+        LocationRate.holiday_rate, LocationRate.new_years_eve_rate, LocationRate.created_at,
+        LocationRate.updated_at, Location.id.label("loc_id"), Location.naam.label("loc_naam")
+    ).outerjoin(Location, Location.id == LocationRate.location_id).all()
+
+    return [
+        {
+            "id": row.id,
+            "location_id": row.location_id,
+            "pass_type": row.pass_type,
+            "base_rate": row.base_rate or 0.0,
+            "evening_rate": row.evening_rate or 0.0,
+            "night_rate": row.night_rate or 0.0,
+            "weekend_rate": row.weekend_rate or 0.0,
+            "holiday_rate": row.holiday_rate or 0.0,
+            "new_years_eve_rate": row.new_years_eve_rate or 0.0,
+            "created_at": row.created_at.isoformat() if row.created_at else None,
+            "updated_at": row.updated_at.isoformat() if row.updated_at else None,
+            "location": {
+                "id": row.loc_id,
+                "naam": row.loc_naam
+            } if row.loc_id is not None else None
+        }
+        for row in rows
+    ]
+
 @router.post("", response_model=LocationRatePydantic)
-async def create_location_rate(
+def create_location_rate(
     rate: LocationRateCreate,
     db: Session = Depends(get_db),
     current_user = Depends(get_current_user)
@@ -72,8 +73,7 @@ async def create_location_rate(
         if 'admin' not in user_roles:
             raise HTTPException(status_code=403, detail="Access denied. Admin privileges required.")
         
-        # Log the incoming rate data
-        print(f"Received rate data: {rate.dict()}")
+        logger.debug("Creating location rate: %s", rate)
         
         # Validate location exists
         location = db.query(Location).filter(Location.id == rate.location_id).first()
@@ -117,10 +117,9 @@ async def create_location_rate(
                 updated_at=datetime.utcnow()
             )
             
-            print(f"Created db_rate object: {db_rate.__dict__}")
-            
             db.add(db_rate)
             db.commit()
+            reference_cache.bump("location_rates")
             db.refresh(db_rate)
             
             # Convert to dict and include location
@@ -151,24 +150,18 @@ async def create_location_rate(
             return rate_dict
             
         except Exception as db_error:
-            print(f"Database error: {str(db_error)}")
-            print(f"Error type: {type(db_error)}")
-            import traceback
-            print(f"Traceback: {traceback.format_exc()}")
+            logger.exception("Database error creating location rate")
             db.rollback()
             raise HTTPException(status_code=500, detail=f"Database error: {str(db_error)}")
             
     except HTTPException:
         raise
     except Exception as e:
-        print(f"Error creating location rate: {str(e)}")
-        print(f"Error type: {type(e)}")
-        import traceback
-        print(f"Traceback: {traceback.format_exc()}")
+        logger.exception("Error creating location rate")
         raise HTTPException(status_code=500, detail=f"Failed to create location rate: {str(e)}")
 
 @router.delete("/{rate_id}")
-async def delete_location_rate(
+def delete_location_rate(
     rate_id: int,
     db: Session = Depends(get_db),
     current_user = Depends(get_current_user)
@@ -183,9 +176,10 @@ async def delete_location_rate(
         
         db.delete(rate)
         db.commit()
+        reference_cache.bump("location_rates")
         return {"message": "Rate deleted successfully"}
     except HTTPException:
         raise
-    except Exception as e:
-        print(f"Error deleting location rate: {str(e)}")
+    except Exception:
+        logger.exception("Error deleting location rate")
         raise HTTPException(status_code=500, detail="Failed to delete location rate") 
\ No newline at end of file
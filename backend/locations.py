@@ -1,9 +1,10 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Request
 from sqlalchemy.orm import Session
 from typing import List, Optional
 from database import get_db
 from models import Location, Opdrachtgever
 from pydantic import BaseModel
+import reference_cache
 
 router = APIRouter()
 
@@ -33,13 +34,28 @@ def create_location(location: LocationCreate, db: Session = Depends(get_db)):
     db_location = Location(**location.dict())
     db.add(db_location)
     db.commit()
+    reference_cache.bump("locations")
     db.refresh(db_location)
     return db_location
 
+def _location_dicts(query) -> List[dict]:
+    return [
+        {"naam": row.naam, "adres": row.adres, "stad": row.stad, "postcode": row.postcode,
+         "opdrachtgever_id": row.opdrachtgever_id, "id": row.id}
+        for row in query
+    ]
+
+def _location_columns(db: Session):
+    return db.query(Location.id, Location.naam, Location.adres, Location.stad, Location.postcode,
+                    Location.opdrachtgever_id)
+
 @router.get("/locations/", response_model=List[LocationResponse])
-def get_locations(skip: int = 0, limit: int = 100, db: Session = Depends(get_db)):
-    locations = db.query(Location).offset(skip).limit(limit).all()
-    return locations
+def get_locations(request: Request, skip: int = 0, limit: int = 100, db: Session = Depends(get_db)):
+    return reference_cache.cached_response(
+        request, ("locations",),
+        lambda: _location_dicts(_location_columns(db).order_by(Location.id).offset(skip).limit(limit)),
+        key=(skip, limit)
+    )
 
 @router.get("/locations/{location_id}", response_model=LocationResponse)
 def get_location(location_id: int, db: Session = Depends(get_db)):
@@ -49,9 +65,12 @@ def get_location(location_id: int, db: Session = Depends(get_db)):
     return location
 
 @router.get("/locations/opdrachtgever/{opdrachtgever_id}", response_model=List[LocationResponse])
-def get_locations_by_opdrachtgever(opdrachtgever_id: int, db: Session = Depends(get_db)):
-    locations = db.query(Location).filter(Location.opdrachtgever_id == opdrachtgever_id).all()
-    return locations
+def get_locations_by_opdrachtgever(opdrachtgever_id: int, request: Request, db: Session = Depends(get_db)):
+    return reference_cache.cached_response(
+        request, ("locations",),
+        lambda: _location_dicts(_location_columns(db).filter(Location.opdrachtgever_id == opdrachtgever_id)),
+        key=("opdrachtgever", opdrachtgever_id)
+    )
 
 @router.put("/locations/{location_id}", response_model=LocationResponse)
 def update_location(location_id: int, location: LocationCreate, db: Session = Depends(get_db)):
@@ -63,6 +82,7 @@ def update_location(location_id: int, location: LocationCreate, db: Session = De
         setattr(db_location, key, value)
 
     db.commit()
+    reference_cache.bump("locations")
     db.refresh(db_location)
     return db_location
 
@@ -74,4 +94,5 @@ def delete_location(location_id: int, db: Session = Depends(get_db)):
 
     db.delete(db_location)
     db.commit()
+    reference_cache.bump("locations")
     return {"message": "Location deleted successfully"} 
\ No newline at end of file
@@ -0,0 +1,159 @@
+"""
+Logging setup for the API and the job worker.
+
+    LOG_LEVEL=INFO                                     root level
+    LOG_LEVELS=planning=DEBUG,sqlalchemy.engine=INFO   per-module levels
+    LOG_FORMAT=text|json                               json: one object per line
+    LOG_SAMPLE_EVERY=100                               see SampledDebug
+
+Every record carries the request_id of the HTTP request or websocket it was
+logged from (CorrelationIdMiddleware; X-Request-ID is honoured and echoed back),
+or "-" outside a request.
+
+Use lazy formatting (logger.debug("Shift %s", shift_id)) so disabled levels cost
+nothing. Per-row output in loops (the invoice jobs' client, rate and shift
+loops) goes through SampledDebug.
+"""
+from contextvars import ContextVar
+from datetime import datetime, timezone
+import json
+import logging
+import os
+import uuid
+
+request_id_var: ContextVar[str] = ContextVar("request_id", default="-")
+
+LOG_SAMPLE_EVERY = int(os.getenv("LOG_SAMPLE_EVERY", "100"))
+
+_TEXT_FORMAT = "%(asctime)s %(levelname)s [%(request_id)s] %(name)s: %(message)s"
+
+# Attributes every LogRecord has; anything else was passed through `extra=` and goes into the JSON
+_RECORD_ATTRIBUTES = set(vars(logging.LogRecord("", 0, "", 0, "", None, None))) | {"message", "asctime", "request_id"}
+
+
+class RequestIdFilter(logging.Filter):
+    def filter(self, record):
+        record.request_id = request_id_var.get()
+        return True
+
+
+class JsonFormatter(logging.Formatter):
+    def format(self, record):
+        entry = {
+            "ts": datetime.fromtimestamp(record.created, tz=timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "request_id": getattr(record, "request_id", "-"),
+            "message": record.getMessage(),
+        }
+        for key, value in record.__dict__.items():
+            if key not in _RECORD_ATTRIBUTES:
+                entry[key] = value
+        if record.exc_info:
+            entry["exc_info"] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str)
+
+
+def parse_module_levels(spec: str) -> dict:
+    """'planning=DEBUG, sqlalchemy.engine=INFO' -> {'planning': 'DEBUG', 'sqlalchemy.engine': 'INFO'}"""
+    levels = {}
+    for item in spec.split(","):
+        if "=" in item:
+            name, level = item.split("=", 1)
+            levels[name.strip()] = level.strip().upper()
+    return levels
+
+
+def configure_logging() -> None:
+    """Install one handler on the root logger. Safe to call more than once."""
+    root = logging.getLogger()
+    for handler in root.handlers:
+        if getattr(handler, "_planner_handler", False):
+            return
+
+    handler = logging.StreamHandler()
+    handler._planner_handler = True
+    handler.addFilter(RequestIdFilter())
+    if os.getenv("LOG_FORMAT", "text").lower() == "json":
+        handler.setFormatter(JsonFormatter())
+    else:
+        handler.setFormatter(logging.Formatter(_TEXT_FORMAT))
+
+    # Replace handlers a library or an earlier basicConfig() may have installed
+    for existing in list(root.handlers):
+        root.removeHandler(existing)
+    root.addHandler(handler)
+    root.setLevel(os.getenv("LOG_LEVEL", "INFO").upper())
+
+    for name, level in parse_module_levels(os.getenv("LOG_LEVELS", "")).items():
+        logging.getLogger(name).setLevel(level)
+
+
+class LogFileHandler(logging.FileHandler):
+    """File log that opens its file, and creates the directory, on the first record instead of at import."""
+
+    def __init__(self, filename: str, formatter: logging.Formatter = None):
+        super().__init__(filename, delay=True)
+        if formatter is not None:
+            self.setFormatter(formatter)
+
+    def _open(self):
+        os.makedirs(os.path.dirname(self.baseFilename), exist_ok=True)
+        return super()._open()
+
+
+class SampledDebug:
+    """
+    Debug output for hot loops: create one per loop, call it per row. Only every
+    `every`-th call is formatted and emitted; with DEBUG off a call is one attribute check.
+    """
+
+    __slots__ = ("logger", "every", "enabled", "calls")
+
+    def __init__(self, logger: logging.Logger, every: int = LOG_SAMPLE_EVERY):
+        self.logger = logger
+        self.every = max(every, 1)
+        self.enabled = logger.isEnabledFor(logging.DEBUG)
+        self.calls = 0
+
+    def __call__(self, msg: str, *args) -> None:
+        if not self.enabled:
+            return
+        self.calls += 1
+        if (self.calls - 1) % self.every == 0:
+            self.logger.debug(msg + " (sampled 1/%s)", *args, self.every)
+
+
+class CorrelationIdMiddleware:
+    """Binds a request id to every log record of an HTTP request or websocket connection."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] not in ("http", "websocket"):
+            await self.app(scope, receive, send)
+            return
+
+        request_id = None
+        for name, value in scope["headers"]:
+            if name == b"x-request-id":
+                # Only short, printable ids from upstream proxies; anything else gets a fresh one
+                candidate = value.decode("latin-1")
+                if 0 < len(candidate) <= 64 and candidate.isprintable():
+                    request_id = candidate
+                break
+        if request_id is None:
+            request_id = uuid.uuid4().hex
+
+        token = request_id_var.set(request_id)
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                message["headers"] = list(message.get("headers", [])) + [(b"x-request-id", request_id.encode("latin-1"))]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper if scope["type"] == "http" else send)
+        finally:
+            request_id_var.reset(token)
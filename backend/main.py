@@ -1,3 +1,8 @@
+import time
+
+# Measured from before the router imports, reported once startup has finished
+_import_started = time.perf_counter()
+
 from fastapi import FastAPI
 from auth import router as auth_router
 from fastapi.middleware.cors import CORSMiddleware
@@ -10,6 +15,7 @@ from export import router as export_router
 from tijdlijn import router as tijdlijn_router
 from favorieten import router as favorieten_router
 from agenda import router as agenda_router
+from calendar_feed import router as calendar_feed_router
 from auto_approval import router as auto_approval_router
 from dienstaanvragen import router as dienstaanvragen_router
 from factuursjablonen import router as factuursjablonen_router
@@ -24,12 +30,24 @@ from notifications import router as notifications_router
 from database import engine, Base
 from init_db import init_db
 from hour_increase import router as hour_increase_router
+from job_telemetry import router as job_telemetry_router
+from metrics import RequestMetricsMiddleware, router as metrics_router
+from profiling import RequestProfilerMiddleware, router as profiling_router
+from logging_config import configure_logging, CorrelationIdMiddleware
+from compression import CompressionMiddleware
+from message_bus import bus
+import token_revocation
+from concurrent.futures import ThreadPoolExecutor
+import asyncio
 import logging
+import os
 
-# Configure logging
-logging.basicConfig(level=logging.INFO)
+# Root handler, LOG_LEVEL/LOG_LEVELS/LOG_FORMAT and request ids, see logging_config.py
+configure_logging()
 logger = logging.getLogger(__name__)
 
+IMPORT_SECONDS = time.perf_counter() - _import_started
+
 app = FastAPI(
     title="Medewerker Planning en Facturatie Systeem",
     description="API voor het beheren van planning, facturatie en verloning.",
@@ -46,16 +64,72 @@ app.add_middleware(
     expose_headers=["*"]
 )
 
+# gzip/brotli for responses over COMPRESSION_MIN_SIZE; inside the metrics middleware, so it records bytes on the wire
+app.add_middleware(CompressionMiddleware)
+
+# Admin-only X-Profile: 1 / ?profile=1 and PROFILE_SAMPLE_RATE background sampling, see profiling.py
+app.add_middleware(RequestProfilerMiddleware)
+
+# Per-route latency, response size and SQL statement counts, served on /metrics
+app.add_middleware(RequestMetricsMiddleware)
+
+# Outermost, so every log line of a request (including the slow-request log) carries its id
+app.add_middleware(CorrelationIdMiddleware)
+
+# Sync (def) routes and run_in_threadpool calls share the loop's default executor.
+# Keep it in line with the sync connection pool so blocking queries queue here, not in the pool.
+DB_THREADPOOL_SIZE = int(os.getenv("DB_THREADPOOL_SIZE", "30"))
+
+@app.on_event("startup")
+async def configure_threadpool():
+    asyncio.get_running_loop().set_default_executor(
+        ThreadPoolExecutor(max_workers=DB_THREADPOOL_SIZE, thread_name_prefix="db")
+    )
+    try:
+        # Newer Starlette runs sync routes through anyio's worker threads instead of the loop executor
+        from anyio import to_thread
+        to_thread.current_default_thread_limiter().total_tokens = DB_THREADPOOL_SIZE
+    except ImportError:
+        pass
+
 # Create database tables and initialize admin on startup
 @app.on_event("startup")
 async def startup_event():
     logger.info("Running database initialization...")
+    started = time.perf_counter()
     try:
-        init_db()
+        schema_initialized = init_db()
         logger.info("Database initialization completed!")
     except Exception as e:
         logger.error(f"Database initialization failed: {str(e)}")
         raise e
+    init_db_seconds = time.perf_counter() - started
+
+    app.state.startup_timings = {
+        "imports_ms": round(IMPORT_SECONDS * 1000),
+        "init_db_ms": round(init_db_seconds * 1000),
+        "schema_initialized": schema_initialized,
+        "total_ms": round((time.perf_counter() - _import_started) * 1000)
+    }
+    logger.info(f"Startup timings: {app.state.startup_timings}")
+
+# Websocket fan-out between workers (MESSAGE_BUS=memory|database|redis), see message_bus.py
+@app.on_event("startup")
+async def start_message_bus():
+    await bus.start()
+
+@app.on_event("shutdown")
+async def stop_message_bus():
+    await bus.stop()
+
+# In-memory revoked-token set behind require_roles, reloaded from token_revocations
+@app.on_event("startup")
+async def start_token_revocation():
+    await token_revocation.start()
+
+@app.on_event("shutdown")
+async def stop_token_revocation():
+    await token_revocation.stop()
 
 # Remove the middleware that's causing conflicts
 # @app.middleware("http")
@@ -83,6 +157,7 @@ app.include_router(export_router)
 app.include_router(tijdlijn_router)
 app.include_router(favorieten_router)
 app.include_router(agenda_router)
+app.include_router(calendar_feed_router)
 app.include_router(auto_approval_router)
 app.include_router(dienstaanvragen_router)
 app.include_router(factuursjablonen_router)
@@ -95,6 +170,9 @@ app.include_router(medewerkers_router)
 app.include_router(locations_router)
 app.include_router(notifications_router)
 app.include_router(hour_increase_router)
+app.include_router(job_telemetry_router)
+app.include_router(metrics_router)
+app.include_router(profiling_router)
 
 # ✅ Start de server correct
 if __name__ == "__main__":
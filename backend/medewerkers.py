@@ -1,11 +1,14 @@
-from fastapi import APIRouter, HTTPException, Depends
+from fastapi import APIRouter, HTTPException, Depends, Query
+from sqlalchemy import and_, func, or_
 from sqlalchemy.orm import Session, joinedload
 from database import get_db
-from models import Medewerker, User
+from models import Medewerker, User, Role, user_roles
 from pydantic import BaseModel
-from typing import Optional, List
+from typing import Dict, Optional, List
 from datetime import datetime
-from auth import get_current_user
+from auth import TokenUser, get_token_user
+from fast_json import FastJSONResponse
+from fieldsets import FieldSet, fields_query
 import logging
 import re
 
@@ -97,78 +100,130 @@ class EmployeeResponse(BaseModel):
     class Config:
         from_attributes = True
 
+EMPLOYEES_MAX_PAGE_SIZE = 500
+
+# Fixed per-hour allowances, the same for every employee
+EMPLOYEE_ALLOWANCES = {
+    "telefoonvergoeding_per_uur": 2.0,
+    "maaltijdvergoeding_per_uur": 1.5,
+    "de_minimis_bonus_per_uur": 0.5,
+    "wkr_toeslag_per_uur": 1.0,
+    "kilometervergoeding": 0.23,
+    "max_km": 60,
+    "hourly_allowance": 15.0,
+}
+
+def _constant(value):
+    return (), lambda: value
+
+# Employee list fields and the columns they are read from (see fieldsets.py). "roles" reads the
+# user id here; the role names are filled in afterwards with one query for the page.
+EMPLOYEE_FIELDS = FieldSet({
+    "id": ((Medewerker.id,), None),
+    "username": ((User.username,), None),
+    "email": ((Medewerker.email,), None),
+    "full_name": ((Medewerker.naam,), None),
+    "roles": ((User.id,), None),
+    "personeelsnummer": ((Medewerker.id,), None),
+    "uurloner": ((Medewerker.contract_type,), lambda contract_type: contract_type == "Uurloner"),
+    **{name: _constant(value) for name, value in EMPLOYEE_ALLOWANCES.items()},
+    **{
+        name: ((getattr(Medewerker, name),), None)
+        for name in (
+            "naam", "voornaam", "tussenvoegsel", "achternaam", "initialen", "telefoon", "adres",
+            "huisnummer", "huisnummer_toevoeging", "postcode", "stad", "geboortedatum", "geboorteplaats",
+            "geslacht", "burgerlijke_staat", "bsn", "nationaliteit", "in_dienst", "uit_dienst", "pas_type",
+            "pas_nummer", "pas_vervaldatum", "pas_foto", "contract_type", "contract_uren",
+            "contract_vervaldatum", "contract_bestand"
+        )
+    }
+})
+
+def _role_names_by_user(db: Session, user_ids: List[int]) -> Dict[int, List[str]]:
+    """Role names of these users in one query (what selectinload would do for the ORM objects)."""
+    roles: Dict[int, List[str]] = {}
+    if not user_ids:
+        return roles
+    for user_id, role_name in db.query(user_roles.c.user_id, Role.name).join(
+        Role, Role.id == user_roles.c.role_id
+    ).filter(user_roles.c.user_id.in_(user_ids)):
+        roles.setdefault(user_id, []).append(role_name)
+    return roles
+
+def _search_filter(q: str):
+    """Prefix match on name, surname, email and pass type; each is a range scan on its index."""
+    pattern = q.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_") + "%"
+    return or_(*[
+        column.like(pattern, escape="\\")
+        for column in (Medewerker.naam, Medewerker.achternaam, Medewerker.email, Medewerker.pas_type)
+    ])
+
+def _after_filter(db: Session, after_id: int):
+    """Keyset condition for the page after employee `after_id` in (naam, id) order."""
+    cursor = db.query(Medewerker.naam).filter(Medewerker.id == after_id).first()
+    if cursor is None:
+        raise HTTPException(status_code=404, detail="Medewerker niet gevonden")
+    if cursor.naam is None:
+        # NULL names sort first
+        return or_(Medewerker.naam.isnot(None), and_(Medewerker.naam.is_(None), Medewerker.id > after_id))
+    return or_(Medewerker.naam > cursor.naam, and_(Medewerker.naam == cursor.naam, Medewerker.id > after_id))
+
 @router.get("/", response_model=List[EmployeeResponse])
-async def get_medewerkers(
+def get_medewerkers(
+    fields: Optional[str] = fields_query(),
+    q: Optional[str] = Query(None, description="Zoek op (begin van) naam, achternaam, e-mail of pastype"),
+    after_id: Optional[int] = Query(None, description="Alleen medewerkers na deze medewerker (volgende pagina)"),
+    limit: Optional[int] = Query(None, ge=1, le=EMPLOYEES_MAX_PAGE_SIZE, description="Paginagrootte; zonder limit alle medewerkers"),
     db: Session = Depends(get_db),
-    current_user: dict = Depends(get_current_user)
+    current_user: TokenUser = Depends(get_token_user)
 ):
-    """Get all employees."""
+    """
+    Get employees ordered by name. With fields=... (e.g. fields=id,naam for a name picker) only
+    those fields are returned and only their columns are read.
+
+    Paged with limit and after_id (the id of the last employee of the previous page). A paged
+    or searched response carries the number of matching employees in X-Total-Count.
+    """
+    names = EMPLOYEE_FIELDS.parse(fields)
     try:
-        logger.debug("Fetching all employees")
-        # Get all medewerkers with their associated users
-        medewerkers = db.query(Medewerker).options(
-            joinedload(Medewerker.user)
-        ).all()
-        logger.debug(f"Found {len(medewerkers)} employees")
-        
-        # Convert to the expected format
-        result = []
-        for medewerker in medewerkers:
-            try:
-                if not medewerker.user:
-                    logger.warning(f"No user found for medewerker {medewerker.id}")
-                    continue
-                    
-                employee_data = {
-                    "id": medewerker.id,
-                    "username": medewerker.user.username,
-                    "email": medewerker.email,
-                    "full_name": medewerker.naam,
-                    "roles": [role.name for role in medewerker.user.roles],
-                    "personeelsnummer": medewerker.id,
-                    "uurloner": medewerker.contract_type == "Uurloner",
-                    "telefoonvergoeding_per_uur": 2.0,
-                    "maaltijdvergoeding_per_uur": 1.5,
-                    "de_minimis_bonus_per_uur": 0.5,
-                    "wkr_toeslag_per_uur": 1.0,
-                    "kilometervergoeding": 0.23,
-                    "max_km": 60,
-                    "hourly_allowance": 15.0,
-                    "naam": medewerker.naam,
-                    "voornaam": medewerker.voornaam,
-                    "tussenvoegsel": medewerker.tussenvoegsel,
-                    "achternaam": medewerker.achternaam,
-                    "initialen": medewerker.initialen,
-                    "telefoon": medewerker.telefoon,
-                    "adres": medewerker.adres,
-                    "huisnummer": medewerker.huisnummer,
-                    "huisnummer_toevoeging": medewerker.huisnummer_toevoeging,
-                    "postcode": medewerker.postcode,
-                    "stad": medewerker.stad,
-                    "geboortedatum": medewerker.geboortedatum,
-                    "geboorteplaats": medewerker.geboorteplaats,
-                    "geslacht": medewerker.geslacht,
-                    "burgerlijke_staat": medewerker.burgerlijke_staat,
-                    "bsn": medewerker.bsn,
-                    "nationaliteit": medewerker.nationaliteit,
-                    "in_dienst": medewerker.in_dienst,
-                    "uit_dienst": medewerker.uit_dienst,
-                    "pas_type": medewerker.pas_type,
-                    "pas_nummer": medewerker.pas_nummer,
-                    "pas_vervaldatum": medewerker.pas_vervaldatum,
-                    "pas_foto": medewerker.pas_foto,
-                    "contract_type": medewerker.contract_type,
-                    "contract_uren": medewerker.contract_uren,
-                    "contract_vervaldatum": medewerker.contract_vervaldatum,
-                    "contract_bestand": medewerker.contract_bestand
-                }
-                result.append(employee_data)
-                logger.debug(f"Employee: {medewerker.naam}, {medewerker.email}")
-            except Exception as e:
-                logger.error(f"Error processing medewerker {medewerker.id}: {str(e)}")
-                continue
-        
-        return result
+        logger.debug("Fetching employees (q=%r, after_id=%s, limit=%s)", q, after_id, limit)
+        # Employees without a user account are left out, as before
+        query = db.query(*EMPLOYEE_FIELDS.columns(names, extra=(Medewerker.id, User.id))).select_from(Medewerker).join(
+            User, User.username == Medewerker.user_id
+        )
+        search = _search_filter(q) if q else None
+        if search is not None:
+            query = query.filter(search)
+        if after_id is not None:
+            query = query.filter(_after_filter(db, after_id))
+        query = query.order_by(Medewerker.naam, Medewerker.id)
+        if limit is not None:
+            query = query.limit(limit)
+        rows = query.all()
+        logger.debug("Found %s employees", len(rows))
+
+        # EmployeeResponse-shaped dicts straight into orjson, without revalidating every row
+        # against the response model (see fast_json.py)
+        to_dict = EMPLOYEE_FIELDS.serializer(names, extra=(Medewerker.id, User.id))
+        result = [to_dict(row) for row in rows]
+        if "roles" in names:
+            # User.id is the second column, see extra above
+            roles = _role_names_by_user(db, [row[1] for row in rows])
+            for employee, row in zip(result, rows):
+                employee["roles"] = roles.get(row[1], [])
+
+        headers = {}
+        if limit is not None or search is not None:
+            # Index-only count over the same join and search, without the paging
+            count = db.query(func.count(Medewerker.id)).select_from(Medewerker).join(
+                User, User.username == Medewerker.user_id
+            )
+            if search is not None:
+                count = count.filter(search)
+            headers["X-Total-Count"] = str(count.scalar())
+        return FastJSONResponse(result, headers=headers)
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Error fetching employees: {str(e)}")
         logger.error(f"Error type: {type(e)}")
@@ -176,15 +231,15 @@ async def get_medewerkers(
         raise HTTPException(status_code=500, detail=str(e))
 
 @router.get("/{medewerker_id}", response_model=EmployeeResponse)
-async def get_medewerker(
+def get_medewerker(
     medewerker_id: int,
     db: Session = Depends(get_db),
-    current_user: dict = Depends(get_current_user)
+    current_user: TokenUser = Depends(get_token_user)
 ):
     """Get a specific employee by ID."""
     try:
         medewerker = db.query(Medewerker).options(
-            joinedload(Medewerker.user)
+            joinedload(Medewerker.user).selectinload(User.roles)
         ).filter(Medewerker.id == medewerker_id).first()
         
         if not medewerker:
@@ -201,13 +256,7 @@ async def get_medewerker(
             roles=[role.name for role in medewerker.user.roles],
             personeelsnummer=medewerker.id,
             uurloner=medewerker.contract_type == "Uurloner",
-            telefoonvergoeding_per_uur=2.0,
-            maaltijdvergoeding_per_uur=1.5,
-            de_minimis_bonus_per_uur=0.5,
-            wkr_toeslag_per_uur=1.0,
-            kilometervergoeding=0.23,
-            max_km=60,
-            hourly_allowance=15.0,
+            **EMPLOYEE_ALLOWANCES,
             naam=medewerker.naam,
             voornaam=medewerker.voornaam,
             tussenvoegsel=medewerker.tussenvoegsel,
@@ -241,11 +290,11 @@ async def get_medewerker(
         raise HTTPException(status_code=500, detail=str(e))
 
 @router.put("/{medewerker_id}", response_model=EmployeeResponse)
-async def update_medewerker(
+def update_medewerker(
     medewerker_id: int,
     medewerker_update: MedewerkerUpdate,
     db: Session = Depends(get_db),
-    current_user: dict = Depends(get_current_user)
+    current_user: TokenUser = Depends(get_token_user)
 ):
     """Update an employee profile."""
     try:
@@ -259,7 +308,7 @@ async def update_medewerker(
         
         # Get the employee with user relationship
         db_medewerker = db.query(Medewerker).options(
-            joinedload(Medewerker.user)
+            joinedload(Medewerker.user).selectinload(User.roles)
         ).filter(Medewerker.id == medewerker_id).first()
         
         if not db_medewerker:
@@ -378,13 +427,7 @@ async def update_medewerker(
             roles=[role.name for role in db_medewerker.user.roles],
             personeelsnummer=db_medewerker.id,
             uurloner=db_medewerker.contract_type == "Uurloner",
-            telefoonvergoeding_per_uur=2.0,
-            maaltijdvergoeding_per_uur=1.5,
-            de_minimis_bonus_per_uur=0.5,
-            wkr_toeslag_per_uur=1.0,
-            kilometervergoeding=0.23,
-            max_km=60,
-            hourly_allowance=15.0,
+            **EMPLOYEE_ALLOWANCES,
             naam=db_medewerker.naam,
             voornaam=db_medewerker.voornaam,
             tussenvoegsel=db_medewerker.tussenvoegsel,
@@ -422,10 +465,10 @@ async def update_medewerker(
         raise HTTPException(status_code=500, detail=str(e))
 
 @router.delete("/{medewerker_id}")
-async def delete_medewerker(
+def delete_medewerker(
     medewerker_id: int,
     db: Session = Depends(get_db),
-    current_user: dict = Depends(get_current_user)
+    current_user: TokenUser = Depends(get_token_user)
 ):
     """Delete an employee by ID."""
     try:
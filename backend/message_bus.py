@@ -0,0 +1,212 @@
+"""
+Pub/sub for websocket delivery across API workers.
+
+Websocket connections live in the worker process that accepted them. Code that
+wants to reach a user publishes on a channel; every worker subscribes to the
+channels it serves and delivers to its own connections. The backend is chosen
+with MESSAGE_BUS:
+
+    memory    (default) one process only; publish delivers directly
+    database  chat/notification rows in bus_messages, polled every
+              BUS_POLL_INTERVAL_MS (default 100) by every worker; needs no
+              extra infrastructure
+    redis     Redis pub/sub on REDIS_URL (default redis://localhost:6379/0);
+              lowest latency when running several workers or hosts
+
+Messages are JSON-serializable dicts. Delivery is at-most-once: a worker that
+is down while a message is published does not see it.
+"""
+from abc import ABC, abstractmethod
+from datetime import datetime, timedelta
+from typing import Awaitable, Callable, Dict, List
+from sqlalchemy import delete, func, select
+from database import async_engine
+from models import BusMessage
+import asyncio
+import json
+import logging
+import os
+import time
+
+logger = logging.getLogger(__name__)
+
+Handler = Callable[[dict], Awaitable[None]]
+
+BUS_POLL_INTERVAL_MS = int(os.getenv("BUS_POLL_INTERVAL_MS", "100"))
+# How long rows stay in bus_messages, and how long a skipped auto-increment id is waited for
+BUS_RETENTION_SECONDS = int(os.getenv("BUS_RETENTION_SECONDS", "300"))
+BUS_GAP_TIMEOUT_SECONDS = float(os.getenv("BUS_GAP_TIMEOUT_SECONDS", "5"))
+REDIS_URL = os.getenv("REDIS_URL", "redis://localhost:6379/0")
+REDIS_CHANNEL_PREFIX = "planner:"
+
+
+class MessageBus(ABC):
+    # True when every subscriber lives in this process, so local state is the whole picture
+    local_only = False
+
+    def __init__(self):
+        self._handlers: Dict[str, List[Handler]] = {}
+
+    def subscribe(self, channel: str, handler: Handler) -> None:
+        """Register a handler in this process; call at import time, before start()."""
+        self._handlers.setdefault(channel, []).append(handler)
+
+    @abstractmethod
+    async def publish(self, channel: str, message: dict) -> None:
+        """Deliver to the subscribers of `channel` in every worker, this one included."""
+
+    async def start(self) -> None:
+        pass
+
+    async def stop(self) -> None:
+        pass
+
+    async def _dispatch(self, channel: str, message: dict) -> None:
+        for handler in self._handlers.get(channel, ()):
+            try:
+                await handler(message)
+            except Exception:
+                logger.exception("Error delivering %s message", channel)
+
+
+class InMemoryBus(MessageBus):
+    local_only = True
+
+    async def publish(self, channel: str, message: dict) -> None:
+        await self._dispatch(channel, message)
+
+
+class DatabaseBus(MessageBus):
+    """
+    Polls bus_messages for rows with a higher id than the last one seen. Ids that were
+    skipped (a publisher's transaction committing out of order) are looked up again for
+    BUS_GAP_TIMEOUT_SECONDS before they are given up on.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self._task = None
+        self._last_id = 0
+        self._pending_gaps: Dict[int, float] = {}
+        self._last_cleanup = 0.0
+
+    async def publish(self, channel: str, message: dict) -> None:
+        async with async_engine.begin() as connection:
+            await connection.execute(BusMessage.__table__.insert().values(
+                channel=channel, payload=json.dumps(message), created_at=datetime.utcnow()
+            ))
+
+    async def start(self) -> None:
+        async with async_engine.connect() as connection:
+            self._last_id = (await connection.execute(select(func.max(BusMessage.id)))).scalar() or 0
+        self._task = asyncio.create_task(self._poll_forever())
+        logger.info("Database message bus polling every %s ms from id %s", BUS_POLL_INTERVAL_MS, self._last_id)
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _poll_forever(self) -> None:
+        while True:
+            try:
+                received = await self._poll_once()
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.exception("Error polling the message bus")
+                received = 0
+            if not received:
+                await asyncio.sleep(BUS_POLL_INTERVAL_MS / 1000)
+
+    async def _poll_once(self) -> int:
+        now = time.monotonic()
+        async with async_engine.connect() as connection:
+            rows = (await connection.execute(
+                select(BusMessage.id, BusMessage.channel, BusMessage.payload)
+                .where(BusMessage.id > self._last_id).order_by(BusMessage.id).limit(500)
+            )).all()
+            if self._pending_gaps:
+                rows += (await connection.execute(
+                    select(BusMessage.id, BusMessage.channel, BusMessage.payload)
+                    .where(BusMessage.id.in_(list(self._pending_gaps)))
+                )).all()
+            if now - self._last_cleanup > 60:
+                self._last_cleanup = now
+                await connection.execute(delete(BusMessage).where(
+                    BusMessage.created_at < datetime.utcnow() - timedelta(seconds=BUS_RETENTION_SECONDS)
+                ))
+                await connection.commit()
+
+        for row in rows:
+            if row.id > self._last_id:
+                for missing in range(self._last_id + 1, row.id):
+                    self._pending_gaps[missing] = now
+                self._last_id = row.id
+            else:
+                self._pending_gaps.pop(row.id, None)
+            await self._dispatch(row.channel, json.loads(row.payload))
+
+        for missing, since in list(self._pending_gaps.items()):
+            if now - since > BUS_GAP_TIMEOUT_SECONDS:
+                del self._pending_gaps[missing]
+        return len(rows)
+
+
+class RedisBus(MessageBus):
+    def __init__(self):
+        super().__init__()
+        self._redis = None
+        self._task = None
+
+    async def publish(self, channel: str, message: dict) -> None:
+        await self._redis.publish(REDIS_CHANNEL_PREFIX + channel, json.dumps(message))
+
+    async def start(self) -> None:
+        import redis.asyncio as redis
+        self._redis = redis.from_url(REDIS_URL)
+        pubsub = self._redis.pubsub()
+        await pubsub.subscribe(*[REDIS_CHANNEL_PREFIX + channel for channel in self._handlers])
+        self._task = asyncio.create_task(self._listen(pubsub))
+        logger.info("Redis message bus subscribed to %s", ", ".join(self._handlers))
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        if self._redis is not None:
+            await self._redis.close()
+
+    async def _listen(self, pubsub) -> None:
+        while True:
+            try:
+                async for item in pubsub.listen():
+                    if item["type"] != "message":
+                        continue
+                    channel = item["channel"].decode()[len(REDIS_CHANNEL_PREFIX):]
+                    await self._dispatch(channel, json.loads(item["data"]))
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.exception("Redis message bus connection lost, resubscribing")
+                await asyncio.sleep(1)
+                await pubsub.subscribe(*[REDIS_CHANNEL_PREFIX + channel for channel in self._handlers])
+
+
+def create_bus() -> MessageBus:
+    backend = os.getenv("MESSAGE_BUS", "memory").lower()
+    if backend == "database":
+        return DatabaseBus()
+    if backend == "redis":
+        return RedisBus()
+    return InMemoryBus()
+
+bus = create_bus()
@@ -0,0 +1,226 @@
+"""
+Per-route request metrics.
+
+RequestMetricsMiddleware times every HTTP request and counts the SQL statements
+it runs (SQLAlchemy before/after_cursor_execute on the sync and async engine).
+Results are aggregated per route template, so /planning/12 and /planning/13 share
+one series, and exposed in the Prometheus text format on GET /metrics:
+
+- http_request_duration_seconds  histogram  {method, route, status}
+- http_response_size_bytes       sum/count  {method, route}
+- http_request_db_statements     histogram  {method, route}
+- http_request_db_seconds        sum/count  {method, route}
+
+followed by the websocket hubs' connections, queue depth and dropped messages
+(see websocket_hub.py).
+
+Requests slower than SLOW_REQUEST_MS are logged with their slowest and most
+repeated statements; a statement repeated for every row is an N+1 query.
+"""
+from contextvars import ContextVar
+from collections import Counter
+from threading import Lock
+from typing import Dict, List, Optional, Tuple
+from fastapi import APIRouter
+from fastapi.responses import PlainTextResponse
+from sqlalchemy import event
+from database import engine, async_engine
+import websocket_hub
+import logging
+import os
+import time
+
+logger = logging.getLogger(__name__)
+
+router = APIRouter(tags=["metrics"])
+
+SLOW_REQUEST_MS = int(os.getenv("SLOW_REQUEST_MS", "1000"))
+# Statements kept per request for the slow-request log; counting continues past the cap
+MAX_RECORDED_STATEMENTS = 200
+
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+STATEMENT_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100, 200, 500)
+
+
+class RequestStats:
+    __slots__ = ("statement_count", "statement_seconds", "statements")
+
+    def __init__(self):
+        self.statement_count = 0
+        self.statement_seconds = 0.0
+        self.statements: List[Tuple[str, float]] = []
+
+_request_stats: ContextVar[Optional[RequestStats]] = ContextVar("request_stats", default=None)
+
+def current_request_stats() -> Optional[RequestStats]:
+    return _request_stats.get()
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if _request_stats.get() is not None:
+        conn.info.setdefault("query_start_time", []).append(time.perf_counter())
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    stats = _request_stats.get()
+    if stats is None:
+        return
+    starts = conn.info.get("query_start_time")
+    if not starts:
+        return
+    elapsed = time.perf_counter() - starts.pop()
+    stats.statement_count += 1
+    stats.statement_seconds += elapsed
+    if len(stats.statements) < MAX_RECORDED_STATEMENTS:
+        stats.statements.append((statement, elapsed))
+
+for _engine in (engine, async_engine.sync_engine):
+    event.listen(_engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(_engine, "after_cursor_execute", _after_cursor_execute)
+
+
+class _Histogram:
+    __slots__ = ("buckets", "counts", "total", "count")
+
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.total = 0.0
+        self.count = 0
+
+    def observe(self, value: float) -> None:
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[i] += 1
+        self.total += value
+        self.count += 1
+
+class _Sum:
+    __slots__ = ("total", "count")
+
+    def __init__(self):
+        self.total = 0.0
+        self.count = 0
+
+    def observe(self, value: float) -> None:
+        self.total += value
+        self.count += 1
+
+_lock = Lock()
+_durations: Dict[Tuple[str, str, str], _Histogram] = {}
+_response_sizes: Dict[Tuple[str, str], _Sum] = {}
+_statement_counts: Dict[Tuple[str, str], _Histogram] = {}
+_statement_seconds: Dict[Tuple[str, str], _Sum] = {}
+
+def _record(method: str, route: str, status: int, duration: float, size: int, stats: RequestStats) -> None:
+    key = (method, route)
+    with _lock:
+        _durations.setdefault((method, route, str(status)), _Histogram(DURATION_BUCKETS)).observe(duration)
+        _response_sizes.setdefault(key, _Sum()).observe(size)
+        _statement_counts.setdefault(key, _Histogram(STATEMENT_BUCKETS)).observe(stats.statement_count)
+        _statement_seconds.setdefault(key, _Sum()).observe(stats.statement_seconds)
+
+
+def _log_slow_request(method: str, route: str, path: str, duration: float, stats: RequestStats) -> None:
+    repeated = Counter(statement for statement, _ in stats.statements).most_common(3)
+    slowest = sorted(stats.statements, key=lambda s: s[1], reverse=True)[:5]
+    lines = [
+        f"Slow request {method} {path} (route {route}): {duration * 1000:.0f} ms, "
+        f"{stats.statement_count} SQL statements in {stats.statement_seconds * 1000:.0f} ms"
+    ]
+    for statement, elapsed in slowest:
+        lines.append(f"  {elapsed * 1000:.1f} ms: {' '.join(statement.split())[:500]}")
+    for statement, count in repeated:
+        if count > 1:
+            lines.append(f"  repeated {count}x: {' '.join(statement.split())[:500]}")
+    logger.warning("\n".join(lines))
+
+
+class RequestMetricsMiddleware:
+    """Plain ASGI middleware, so streaming responses and websockets pass through untouched."""
+
+    def __init__(self, app):
+        self.app = app
+        self._route_paths: Dict[object, str] = {}
+
+    def _route_template(self, scope) -> str:
+        route = scope.get("route")
+        if route is not None:
+            return route.path
+        endpoint = scope.get("endpoint")
+        if endpoint is None:
+            # 404s and the like: one series instead of one per requested URL
+            return "unmatched"
+        if not self._route_paths:
+            for app_route in scope["app"].routes:
+                if hasattr(app_route, "endpoint"):
+                    self._route_paths[app_route.endpoint] = app_route.path
+        return self._route_paths.get(endpoint, "unmatched")
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        stats = RequestStats()
+        token = _request_stats.set(stats)
+        status_code = 500
+        size = 0
+
+        async def send_wrapper(message):
+            nonlocal status_code, size
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            elif message["type"] == "http.response.body":
+                size += len(message.get("body", b""))
+            await send(message)
+
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            duration = time.perf_counter() - started
+            _request_stats.reset(token)
+            method = scope["method"]
+            route = self._route_template(scope)
+            _record(method, route, status_code, duration, size, stats)
+            if duration * 1000 >= SLOW_REQUEST_MS:
+                _log_slow_request(method, route, scope["path"], duration, stats)
+
+
+def _labels(**labels) -> str:
+    return ",".join(f'{name}="{value}"' for name, value in labels.items())
+
+def _histogram_lines(name: str, series: Dict[tuple, _Histogram], label_names: Tuple[str, ...]) -> List[str]:
+    lines = [f"# TYPE {name} histogram"]
+    for key, histogram in sorted(series.items()):
+        labels = _labels(**dict(zip(label_names, key)))
+        for bound, count in zip(histogram.buckets, histogram.counts):
+            lines.append(f'{name}_bucket{{{labels},le="{bound}"}} {count}')
+        lines.append(f'{name}_bucket{{{labels},le="+Inf"}} {histogram.count}')
+        lines.append(f"{name}_sum{{{labels}}} {histogram.total}")
+        lines.append(f"{name}_count{{{labels}}} {histogram.count}")
+    return lines
+
+def _summary_lines(name: str, series: Dict[tuple, _Sum], label_names: Tuple[str, ...]) -> List[str]:
+    lines = [f"# TYPE {name} summary"]
+    for key, summary in sorted(series.items()):
+        labels = _labels(**dict(zip(label_names, key)))
+        lines.append(f"{name}_sum{{{labels}}} {summary.total}")
+        lines.append(f"{name}_count{{{labels}}} {summary.count}")
+    return lines
+
+def render_metrics() -> str:
+    with _lock:
+        lines = (
+            _histogram_lines("http_request_duration_seconds", _durations, ("method", "route", "status"))
+            + _summary_lines("http_response_size_bytes", _response_sizes, ("method", "route"))
+            + _histogram_lines("http_request_db_statements", _statement_counts, ("method", "route"))
+            + _summary_lines("http_request_db_seconds", _statement_seconds, ("method", "route"))
+        )
+    lines += websocket_hub.render_lines()
+    return "\n".join(lines) + "\n"
+
+@router.get("/metrics", response_class=PlainTextResponse, include_in_schema=False)
+def get_metrics():
+    """Prometheus text exposition format."""
+    return PlainTextResponse(render_metrics(), media_type="text/plain; version=0.0.4")
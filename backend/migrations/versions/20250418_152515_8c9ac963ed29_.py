@@ -1,7 +1,7 @@
 """empty message
 
 Revision ID: 8c9ac963ed29
-Revises: a6b6d12ccdfb, add_invoice_columns
+Revises: a6b6d12ccdfb
 Create Date: 2025-04-18 15:25:15.525210+00:00
 
 """
@@ -11,7 +11,9 @@ import sqlalchemy as sa
 
 # revision identifiers, used by Alembic.
 revision = '8c9ac963ed29'
-down_revision = ('a6b6d12ccdfb', 'add_invoice_columns')
+# The add_invoice_columns side of this merge was never committed; without it the
+# revision map cannot be built at all
+down_revision = 'a6b6d12ccdfb'
 branch_labels = None
 depends_on = None
 
@@ -0,0 +1,40 @@
+"""add tarieven unique index
+
+Revision ID: a2b3c4d5e6f7
+Revises: f1a2b3c4d5e6
+Create Date: 2025-07-15 09:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = 'a2b3c4d5e6f7'
+down_revision = 'f1a2b3c4d5e6'
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    # Duplicate rates are billing data: which one is right is for an operator to decide, not this
+    # migration. GROUP BY puts NULLs together, so duplicate client-wide rates are listed as well.
+    duplicates = op.get_bind().execute(sa.text("""
+        SELECT opdrachtgever_id, locatie, pas_type, GROUP_CONCAT(id ORDER BY id) AS ids
+        FROM tarieven
+        GROUP BY opdrachtgever_id, locatie, pas_type
+        HAVING COUNT(*) > 1
+    """)).fetchall()
+    if duplicates:
+        raise RuntimeError(
+            "tarieven has more than one rate for the same opdrachtgever, locatie and pas_type; "
+            "delete or change all but one of each and run the upgrade again:\n" + "\n".join(
+                f"  opdrachtgever_id={row.opdrachtgever_id} locatie={row.locatie!r} "
+                f"pas_type={row.pas_type!r}: ids {row.ids}"
+                for row in duplicates
+            )
+        )
+    # NULLs count as distinct in a unique index, so it does not stop a second client-wide rate
+    # (locatie NULL); tarieven._check_unique does.
+    op.create_index('ux_tarieven_client_location_pass', 'tarieven', ['opdrachtgever_id', 'locatie', 'pas_type'], unique=True)
+
+def downgrade():
+    op.drop_index('ux_tarieven_client_location_pass', table_name='tarieven')
@@ -0,0 +1,21 @@
+"""index notities per type, newest first
+
+Revision ID: a8b9c0d1e2f3
+Revises: f7a8b9c0d1e2
+Create Date: 2025-07-21 09:00:00.000000
+
+"""
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = 'a8b9c0d1e2f3'
+down_revision = 'f7a8b9c0d1e2'
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    # GET /tijdlijn/?associated_type=... without an id: ix_notities_associated cannot serve ORDER BY id
+    op.create_index('ix_notities_type', 'notities', ['associated_type', 'id'], unique=False)
+
+def downgrade():
+    op.drop_index('ix_notities_type', table_name='notities')
@@ -0,0 +1,22 @@
+"""add shift datum index
+
+Revision ID: b1c2d3e4f5a6
+Revises: add_chat_messages
+Create Date: 2025-07-01 09:00:00.000000
+
+"""
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = 'b1c2d3e4f5a6'
+down_revision = 'add_chat_messages'
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    # Index the shift date so the agenda can use a range scan instead of a full table scan;
+    # datum leads, so it serves date-only ranges as well
+    op.create_index('ix_shifts_datum_status', 'shifts', ['datum', 'status'], unique=False)
+
+def downgrade():
+    op.drop_index('ix_shifts_datum_status', table_name='shifts')
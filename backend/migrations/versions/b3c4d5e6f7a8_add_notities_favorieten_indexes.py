@@ -0,0 +1,38 @@
+"""link notities to clients and employees, index notities and favorieten per user
+
+Revision ID: b3c4d5e6f7a8
+Revises: a2b3c4d5e6f7
+Create Date: 2025-07-16 09:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = 'b3c4d5e6f7a8'
+down_revision = 'a2b3c4d5e6f7'
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    op.add_column('notities', sa.Column('associated_type', sa.String(50), nullable=True))
+    op.add_column('notities', sa.Column('associated_id', sa.Integer(), nullable=True))
+    op.create_index('ix_notities_associated', 'notities', ['associated_type', 'associated_id', 'id'], unique=False)
+    op.create_index('ix_notities_user', 'notities', ['user_id', 'id'], unique=False)
+
+    # Keep the oldest of any duplicate favorites
+    op.execute("""
+        DELETE f1 FROM favorieten f1
+        JOIN favorieten f2 ON f1.user_id = f2.user_id AND f1.item_type = f2.item_type
+            AND f1.item_id = f2.item_id AND f1.id > f2.id
+    """)
+    op.create_index('ix_favorieten_user', 'favorieten', ['user_id', 'id'], unique=False)
+    op.create_index('ux_favorieten_user_item', 'favorieten', ['user_id', 'item_type', 'item_id'], unique=True)
+
+def downgrade():
+    op.drop_index('ux_favorieten_user_item', table_name='favorieten')
+    op.drop_index('ix_favorieten_user', table_name='favorieten')
+    op.drop_index('ix_notities_user', table_name='notities')
+    op.drop_index('ix_notities_associated', table_name='notities')
+    op.drop_column('notities', 'associated_id')
+    op.drop_column('notities', 'associated_type')
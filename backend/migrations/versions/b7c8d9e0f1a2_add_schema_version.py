@@ -0,0 +1,28 @@
+"""add schema version
+
+Revision ID: b7c8d9e0f1a2
+Revises: a6b7c8d9e0f1
+Create Date: 2025-07-09 09:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = 'b7c8d9e0f1a2'
+down_revision = 'a6b7c8d9e0f1'
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    # Filled by init_db once the schema work for this version has run
+    op.create_table(
+        'schema_version',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('version', sa.String(50), nullable=False),
+        sa.Column('applied_at', sa.DateTime(), nullable=True),
+        sa.PrimaryKeyConstraint('id')
+    )
+
+def downgrade():
+    op.drop_table('schema_version')
@@ -0,0 +1,25 @@
+"""add updated_at to shifts
+
+Revision ID: c2d3e4f5a6b7
+Revises: b1c2d3e4f5a6
+Create Date: 2025-07-02 09:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = 'c2d3e4f5a6b7'
+down_revision = 'b1c2d3e4f5a6'
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    # Change version used for the per-employee calendar feed ETag
+    op.add_column('shifts', sa.Column('updated_at', sa.DateTime(), nullable=True,
+                                      server_default=sa.text('CURRENT_TIMESTAMP')))
+    op.create_index('ix_shifts_medewerker_updated', 'shifts', ['medewerker_id', 'updated_at'], unique=False)
+
+def downgrade():
+    op.drop_index('ix_shifts_medewerker_updated', table_name='shifts')
+    op.drop_column('shifts', 'updated_at')
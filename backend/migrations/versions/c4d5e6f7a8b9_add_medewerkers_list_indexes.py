@@ -0,0 +1,24 @@
+"""index medewerkers for the name-ordered list and search
+
+Revision ID: c4d5e6f7a8b9
+Revises: b3c4d5e6f7a8
+Create Date: 2025-07-17 09:00:00.000000
+
+"""
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = 'c4d5e6f7a8b9'
+down_revision = 'b3c4d5e6f7a8'
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    op.create_index('ix_medewerkers_naam_id', 'medewerkers', ['naam', 'id'], unique=False)
+    op.create_index('ix_medewerkers_achternaam', 'medewerkers', ['achternaam'], unique=False)
+    op.create_index('ix_medewerkers_pas_type', 'medewerkers', ['pas_type'], unique=False)
+
+def downgrade():
+    op.drop_index('ix_medewerkers_pas_type', table_name='medewerkers')
+    op.drop_index('ix_medewerkers_achternaam', table_name='medewerkers')
+    op.drop_index('ix_medewerkers_naam_id', table_name='medewerkers')
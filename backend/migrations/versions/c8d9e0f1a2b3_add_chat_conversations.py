@@ -0,0 +1,58 @@
+"""add chat history index and conversation summaries
+
+Revision ID: c8d9e0f1a2b3
+Revises: b7c8d9e0f1a2
+Create Date: 2025-07-11 09:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = 'c8d9e0f1a2b3'
+down_revision = 'b7c8d9e0f1a2'
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    op.create_index('ix_chat_messages_pair_timestamp', 'chat_messages', ['sender_id', 'receiver_id', 'timestamp'], unique=False)
+
+    op.create_table(
+        'chat_conversations',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('user_a_id', sa.Integer(), nullable=False),
+        sa.Column('user_b_id', sa.Integer(), nullable=False),
+        sa.Column('last_message_id', sa.Integer(), nullable=False),
+        sa.Column('last_sender_id', sa.Integer(), nullable=False),
+        sa.Column('last_content', sa.String(1000), nullable=False),
+        sa.Column('last_message_at', sa.DateTime(), nullable=False),
+        sa.ForeignKeyConstraint(['user_a_id'], ['users.id'], ),
+        sa.ForeignKeyConstraint(['user_b_id'], ['users.id'], ),
+        sa.ForeignKeyConstraint(['last_message_id'], ['chat_messages.id'], ),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_chat_conversations_id'), 'chat_conversations', ['id'], unique=False)
+    op.create_index('ux_chat_conversations_pair', 'chat_conversations', ['user_a_id', 'user_b_id'], unique=True)
+    op.create_index('ix_chat_conversations_user_a_last', 'chat_conversations', ['user_a_id', 'last_message_at'], unique=False)
+    op.create_index('ix_chat_conversations_user_b_last', 'chat_conversations', ['user_b_id', 'last_message_at'], unique=False)
+
+    # One row per existing pair, pointing at its newest message
+    op.execute("""
+        INSERT INTO chat_conversations (user_a_id, user_b_id, last_message_id, last_sender_id, last_content, last_message_at)
+        SELECT LEAST(m.sender_id, m.receiver_id), GREATEST(m.sender_id, m.receiver_id),
+               m.id, m.sender_id, m.content, COALESCE(m.timestamp, CURRENT_TIMESTAMP)
+        FROM chat_messages m
+        JOIN (
+            SELECT MAX(id) AS id
+            FROM chat_messages
+            GROUP BY LEAST(sender_id, receiver_id), GREATEST(sender_id, receiver_id)
+        ) newest ON newest.id = m.id
+    """)
+
+def downgrade():
+    op.drop_index('ix_chat_conversations_user_b_last', table_name='chat_conversations')
+    op.drop_index('ix_chat_conversations_user_a_last', table_name='chat_conversations')
+    op.drop_index('ux_chat_conversations_pair', table_name='chat_conversations')
+    op.drop_index(op.f('ix_chat_conversations_id'), table_name='chat_conversations')
+    op.drop_table('chat_conversations')
+    op.drop_index('ix_chat_messages_pair_timestamp', table_name='chat_messages')
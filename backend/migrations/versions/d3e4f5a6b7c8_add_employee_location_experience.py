@@ -0,0 +1,42 @@
+"""add employee location experience summary
+
+Revision ID: d3e4f5a6b7c8
+Revises: c2d3e4f5a6b7
+Create Date: 2025-07-03 09:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = 'd3e4f5a6b7c8'
+down_revision = 'c2d3e4f5a6b7'
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    # Completed shifts per employee x location, maintained when shifts complete
+    op.create_table(
+        'employee_location_experience',
+        sa.Column('employee_id', sa.String(50), nullable=False),
+        sa.Column('location_id', sa.Integer(), nullable=False),
+        sa.Column('completed_count', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('last_completed_date', sa.Date(), nullable=True),
+        sa.ForeignKeyConstraint(['employee_id'], ['users.username'], ),
+        sa.ForeignKeyConstraint(['location_id'], ['locations.id'], ),
+        sa.PrimaryKeyConstraint('employee_id', 'location_id')
+    )
+    op.create_index('ix_auto_approvals_employee_location', 'auto_approvals', ['employee_id', 'location'], unique=False)
+
+    # Backfill from the shifts that are already completed
+    op.execute("""
+        INSERT INTO employee_location_experience (employee_id, location_id, completed_count, last_completed_date)
+        SELECT medewerker_id, location_id, COUNT(*), MAX(datum)
+        FROM shifts
+        WHERE status = 'completed' AND medewerker_id IS NOT NULL AND location_id IS NOT NULL
+        GROUP BY medewerker_id, location_id
+    """)
+
+def downgrade():
+    op.drop_index('ix_auto_approvals_employee_location', table_name='auto_approvals')
+    op.drop_table('employee_location_experience')
@@ -0,0 +1,25 @@
+"""add claim window columns to dienstaanvragen
+
+Revision ID: d5e6f7a8b9c0
+Revises: c4d5e6f7a8b9
+Create Date: 2025-07-18 09:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = 'd5e6f7a8b9c0'
+down_revision = 'c4d5e6f7a8b9'
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    op.add_column('dienstaanvragen', sa.Column('requested_at', sa.DateTime(), nullable=True))
+    op.add_column('dienstaanvragen', sa.Column('claim_priority', sa.Integer(), nullable=True))
+    op.create_index('ix_dienstaanvragen_claim_window', 'dienstaanvragen', ['claim_priority', 'shift_id'], unique=False)
+
+def downgrade():
+    op.drop_index('ix_dienstaanvragen_claim_window', table_name='dienstaanvragen')
+    op.drop_column('dienstaanvragen', 'claim_priority')
+    op.drop_column('dienstaanvragen', 'requested_at')
@@ -0,0 +1,37 @@
+"""add chat unread counters
+
+Revision ID: d9e0f1a2b3c4
+Revises: c8d9e0f1a2b3
+Create Date: 2025-07-12 09:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = 'd9e0f1a2b3c4'
+down_revision = 'c8d9e0f1a2b3'
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    op.create_table(
+        'chat_unread_counters',
+        sa.Column('receiver_id', sa.Integer(), nullable=False),
+        sa.Column('sender_id', sa.Integer(), nullable=False),
+        sa.Column('unread_count', sa.Integer(), nullable=False),
+        sa.ForeignKeyConstraint(['receiver_id'], ['users.id'], ),
+        sa.ForeignKeyConstraint(['sender_id'], ['users.id'], ),
+        sa.PrimaryKeyConstraint('receiver_id', 'sender_id')
+    )
+
+    op.execute("""
+        INSERT INTO chat_unread_counters (receiver_id, sender_id, unread_count)
+        SELECT receiver_id, sender_id, COUNT(*)
+        FROM chat_messages
+        WHERE `read` = 0
+        GROUP BY receiver_id, sender_id
+    """)
+
+def downgrade():
+    op.drop_table('chat_unread_counters')
@@ -0,0 +1,30 @@
+"""add bus messages
+
+Revision ID: e0f1a2b3c4d5
+Revises: d9e0f1a2b3c4
+Create Date: 2025-07-13 09:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = 'e0f1a2b3c4d5'
+down_revision = 'd9e0f1a2b3c4'
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    op.create_table(
+        'bus_messages',
+        sa.Column('id', sa.Integer(), autoincrement=True, nullable=False),
+        sa.Column('channel', sa.String(50), nullable=False),
+        sa.Column('payload', sa.Text(), nullable=False),
+        sa.Column('created_at', sa.DateTime(), nullable=False),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_bus_messages_created_at'), 'bus_messages', ['created_at'], unique=False)
+
+def downgrade():
+    op.drop_index(op.f('ix_bus_messages_created_at'), table_name='bus_messages')
+    op.drop_table('bus_messages')
@@ -0,0 +1,48 @@
+"""add shift lifecycle audit and invoice dirty periods
+
+Revision ID: e4f5a6b7c8d9
+Revises: d3e4f5a6b7c8
+Create Date: 2025-07-04 09:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = 'e4f5a6b7c8d9'
+down_revision = 'd3e4f5a6b7c8'
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    op.create_table(
+        'shift_lifecycle_audit',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('executed_at', sa.DateTime(), nullable=True),
+        sa.Column('from_statuses', sa.String(100), nullable=False),
+        sa.Column('to_status', sa.String(50), nullable=False),
+        sa.Column('cutoff', sa.DateTime(), nullable=False),
+        sa.Column('shift_count', sa.Integer(), nullable=False),
+        sa.Column('shift_ids', sa.JSON(), nullable=True),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_shift_lifecycle_audit_id'), 'shift_lifecycle_audit', ['id'], unique=False)
+    op.create_index(op.f('ix_shift_lifecycle_audit_executed_at'), 'shift_lifecycle_audit', ['executed_at'], unique=False)
+
+    op.create_table(
+        'invoice_dirty_periods',
+        sa.Column('opdrachtgever_id', sa.Integer(), nullable=False),
+        sa.Column('period_start', sa.Date(), nullable=False),
+        sa.Column('marked_at', sa.DateTime(), nullable=True),
+        sa.ForeignKeyConstraint(['opdrachtgever_id'], ['opdrachtgevers.id'], ),
+        sa.PrimaryKeyConstraint('opdrachtgever_id', 'period_start')
+    )
+
+    op.create_index('ix_shifts_status_datum', 'shifts', ['status', 'datum'], unique=False)
+
+def downgrade():
+    op.drop_index('ix_shifts_status_datum', table_name='shifts')
+    op.drop_table('invoice_dirty_periods')
+    op.drop_index(op.f('ix_shift_lifecycle_audit_executed_at'), table_name='shift_lifecycle_audit')
+    op.drop_index(op.f('ix_shift_lifecycle_audit_id'), table_name='shift_lifecycle_audit')
+    op.drop_table('shift_lifecycle_audit')
@@ -0,0 +1,30 @@
+"""store token revocation times with microseconds
+
+Revision ID: e6f7a8b9c0d1
+Revises: d5e6f7a8b9c0
+Create Date: 2025-07-19 09:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import mysql
+
+# revision identifiers, used by Alembic.
+revision = 'e6f7a8b9c0d1'
+down_revision = 'd5e6f7a8b9c0'
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    # Tokens carry a fractional iat; a plain MySQL DATETIME rounds revoked_at to whole seconds.
+    # Other databases keep the fraction already.
+    if op.get_bind().dialect.name != 'mysql':
+        return
+    op.alter_column('token_revocations', 'revoked_at', type_=mysql.DATETIME(fsp=6),
+                    existing_type=sa.DateTime(), existing_nullable=False)
+
+def downgrade():
+    if op.get_bind().dialect.name != 'mysql':
+        return
+    op.alter_column('token_revocations', 'revoked_at', type_=sa.DateTime(),
+                    existing_type=mysql.DATETIME(fsp=6), existing_nullable=False)
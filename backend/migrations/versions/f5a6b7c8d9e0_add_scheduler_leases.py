@@ -0,0 +1,28 @@
+"""add scheduler leases
+
+Revision ID: f5a6b7c8d9e0
+Revises: e4f5a6b7c8d9
+Create Date: 2025-07-07 09:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = 'f5a6b7c8d9e0'
+down_revision = 'e4f5a6b7c8d9'
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    # apscheduler_jobs is created by the worker's SQLAlchemyJobStore on first start
+    op.create_table(
+        'scheduler_leases',
+        sa.Column('name', sa.String(100), nullable=False),
+        sa.Column('holder', sa.String(255), nullable=False),
+        sa.Column('expires_at', sa.DateTime(), nullable=False),
+        sa.PrimaryKeyConstraint('name')
+    )
+
+def downgrade():
+    op.drop_table('scheduler_leases')
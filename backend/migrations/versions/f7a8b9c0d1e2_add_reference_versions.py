@@ -0,0 +1,26 @@
+"""add reference versions
+
+Revision ID: f7a8b9c0d1e2
+Revises: e6f7a8b9c0d1
+Create Date: 2025-07-20 09:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = 'f7a8b9c0d1e2'
+down_revision = 'e6f7a8b9c0d1'
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    op.create_table(
+        'reference_versions',
+        sa.Column('dataset', sa.String(50), nullable=False),
+        sa.Column('version', sa.Integer(), nullable=False),
+        sa.PrimaryKeyConstraint('dataset')
+    )
+
+def downgrade():
+    op.drop_table('reference_versions')
@@ -1,4 +1,5 @@
 from sqlalchemy import Boolean, Column, ForeignKey, Integer, String, DateTime, Date, Float, Text, JSON, Table, Index, text
+from sqlalchemy.dialects import mysql
 from sqlalchemy.orm import relationship
 from database import Base, engine
 from datetime import datetime
@@ -81,6 +82,14 @@ class Medewerker(Base):
     verloningen = relationship("Verloning", back_populates="medewerker")
     user = relationship("User", back_populates="medewerker_profile")
 
+    __table_args__ = (
+        # Employee list in name order, paged on (naam, id)
+        Index('ix_medewerkers_naam_id', 'naam', 'id'),
+        # Prefix search on surname and pass type (naam uses the index above, email its unique one)
+        Index('ix_medewerkers_achternaam', 'achternaam'),
+        Index('ix_medewerkers_pas_type', 'pas_type'),
+    )
+
 class LocationRate(Base):
     __tablename__ = "location_rates"
 
@@ -143,10 +152,18 @@ class Dienstaanvraag(Base):
     aanvraag_date = Column(Date)
     status = Column(String(50))
     notes = Column(Text, nullable=True)
+    requested_at = Column(DateTime, nullable=True)
+    # Set while an auto-approvable request waits in the claim window of its shift (see shift_claims.py)
+    claim_priority = Column(Integer, nullable=True)
     shift = relationship("Shift", back_populates="dienstaanvragen")
     employee = relationship("User")
     opdrachtgever = relationship("Opdrachtgever", back_populates="diensten")
 
+    __table_args__ = (
+        # Held claims per shift; only rows inside a claim window have a priority
+        Index('ix_dienstaanvragen_claim_window', 'claim_priority', 'shift_id'),
+    )
+
 class Shift(Base):
     __tablename__ = "shifts"
 
@@ -165,12 +182,22 @@ class Shift(Base):
     required_profile = Column(String(100), nullable=True)
     factuur_id = Column(Integer, ForeignKey("facturen.id"), nullable=True)
     reiskilometers = Column(Float, nullable=True)  # Add reiskilometers field
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)  # Change version for calendar ETags
     hour_increase_requests = relationship("ShiftHourIncreaseRequest", back_populates="shift")
 
     medewerker = relationship("User", back_populates="shifts")
     dienstaanvragen = relationship("Dienstaanvraag", back_populates="shift")
     location = relationship("Location", back_populates="shifts")
 
+    __table_args__ = (
+        # Date-range scans for the agenda/calendar views, grouped by status; also the date-only index
+        Index('ix_shifts_datum_status', 'datum', 'status'),
+        # Lifecycle job: "status IN (...) AND datum <= today" as a tight range
+        Index('ix_shifts_status_datum', 'status', 'datum'),
+        # Per-employee change version lookup for the ICS feed
+        Index('ix_shifts_medewerker_updated', 'medewerker_id', 'updated_at'),
+    )
+
 def update_database_schema():
     """Update the database schema to include new columns."""
     Base.metadata.create_all(bind=engine)
@@ -233,6 +260,12 @@ class Tarief(Base):
     bedrag = Column(Float)
     opdrachtgever = relationship("Opdrachtgever", back_populates="tarieven")
 
+    __table_args__ = (
+        # One rate per client, location and pass; locatie NULL is the client-wide rate. The index
+        # treats NULLs as distinct, so duplicate client-wide rates are only refused by tarieven._check_unique
+        Index('ux_tarieven_client_location_pass', 'opdrachtgever_id', 'locatie', 'pas_type', unique=True),
+    )
+
 class Verloning(Base):
     __tablename__ = "verloningen"
 
@@ -269,6 +302,16 @@ class Notitie(Base):
     inhoud = Column(Text)
     timestamp = Column(DateTime, default=datetime.utcnow)
     user_id = Column(Integer, ForeignKey("users.id"))
+    associated_type = Column(String(50), nullable=True)  # 'opdrachtgever' or 'medewerker'
+    associated_id = Column(Integer, nullable=True)
+
+    __table_args__ = (
+        # Timeline of one client or employee, of all clients or employees, and a user's own
+        # notes, newest first by id
+        Index('ix_notities_associated', 'associated_type', 'associated_id', 'id'),
+        Index('ix_notities_type', 'associated_type', 'id'),
+        Index('ix_notities_user', 'user_id', 'id'),
+    )
 
 class Favoriet(Base):
     __tablename__ = "favorieten"
@@ -279,6 +322,11 @@ class Favoriet(Base):
     item_id = Column(Integer)
     timestamp = Column(DateTime, default=datetime.utcnow)
 
+    __table_args__ = (
+        Index('ix_favorieten_user', 'user_id', 'id'),
+        Index('ux_favorieten_user_item', 'user_id', 'item_type', 'item_id', unique=True),
+    )
+
 class Factuursjabloon(Base):
     __tablename__ = "factuursjablonen"
 
@@ -299,6 +347,82 @@ class AutoApproval(Base):
 
     employee = relationship("User")
 
+    __table_args__ = (
+        Index('ix_auto_approvals_employee_location', 'employee_id', 'location'),
+    )
+
+class EmployeeLocationExperience(Base):
+    """Maintained summary of completed shifts per employee and location (used by auto-approval)."""
+    __tablename__ = "employee_location_experience"
+
+    employee_id = Column(String(50), ForeignKey("users.username"), primary_key=True)
+    location_id = Column(Integer, ForeignKey("locations.id"), primary_key=True)
+    completed_count = Column(Integer, nullable=False, default=0)
+    last_completed_date = Column(Date, nullable=True)
+
+class ShiftLifecycleAudit(Base):
+    """One row per batch of automatic shift status transitions."""
+    __tablename__ = "shift_lifecycle_audit"
+
+    id = Column(Integer, primary_key=True, index=True)
+    executed_at = Column(DateTime, default=datetime.utcnow, index=True)
+    from_statuses = Column(String(100), nullable=False)
+    to_status = Column(String(50), nullable=False)
+    cutoff = Column(DateTime, nullable=False)  # Shifts ending at or before this moment were transitioned
+    shift_count = Column(Integer, nullable=False)
+    shift_ids = Column(JSON)
+
+class InvoiceDirtyPeriod(Base):
+    """Client/week combinations with newly completed shifts that still need (re)invoicing."""
+    __tablename__ = "invoice_dirty_periods"
+
+    opdrachtgever_id = Column(Integer, ForeignKey("opdrachtgevers.id"), primary_key=True)
+    period_start = Column(Date, primary_key=True)  # Monday of the week
+    marked_at = Column(DateTime, default=datetime.utcnow)
+
+class SchedulerLease(Base):
+    """Leader lease for the job worker on databases without GET_LOCK (see leader_election.py)."""
+    __tablename__ = "scheduler_leases"
+
+    name = Column(String(100), primary_key=True)
+    holder = Column(String(255), nullable=False)
+    expires_at = Column(DateTime, nullable=False)
+
+class ReferenceVersion(Base):
+    """Write counter of a reference dataset, bumped in the writing transaction (see tarief_cache.py)."""
+    __tablename__ = "reference_versions"
+
+    dataset = Column(String(50), primary_key=True)
+    version = Column(Integer, nullable=False)
+
+class JobRun(Base):
+    """Telemetry for one execution of a scheduled job (see job_telemetry.py)."""
+    __tablename__ = "job_runs"
+
+    id = Column(Integer, primary_key=True, index=True)
+    job_name = Column(String(100), nullable=False)
+    started_at = Column(DateTime, nullable=False)
+    finished_at = Column(DateTime, nullable=False)
+    duration_ms = Column(Integer, nullable=False)
+    status = Column(String(20), nullable=False)  # success / failed
+    rows_scanned = Column(Integer, default=0)
+    rows_written = Column(Integer, default=0)
+    invoices_created = Column(Integer, default=0)
+    error_count = Column(Integer, default=0)
+    error_message = Column(Text, nullable=True)
+
+    __table_args__ = (
+        Index('ix_job_runs_job_name_started_at', 'job_name', 'started_at'),
+    )
+
+class SchemaVersion(Base):
+    """Single row with the schema version the database was last initialised for (see init_db.py)."""
+    __tablename__ = "schema_version"
+
+    id = Column(Integer, primary_key=True)
+    version = Column(String(50), nullable=False)
+    applied_at = Column(DateTime, default=datetime.utcnow)
+
 class AutoApprovalGlobalConfig(Base):
     __tablename__ = "auto_approval_global_config"
 
@@ -375,6 +499,58 @@ class ChatMessage(Base):
     receiver = relationship("User", foreign_keys=[receiver_id], backref="received_messages")
     shift = relationship("Shift", backref="chat_messages") 
 
+    __table_args__ = (
+        # Both directions of a conversation, newest first; also serves the read-marking UPDATE
+        Index('ix_chat_messages_pair_timestamp', 'sender_id', 'receiver_id', 'timestamp'),
+    )
+
+class ChatConversation(Base):
+    """
+    Last message per pair of users, for the conversation list (see notifications.py).
+    The pair is stored ordered: user_a_id < user_b_id.
+    """
+    __tablename__ = "chat_conversations"
+
+    id = Column(Integer, primary_key=True, index=True)
+    user_a_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    user_b_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    last_message_id = Column(Integer, ForeignKey("chat_messages.id"), nullable=False)
+    last_sender_id = Column(Integer, nullable=False)
+    last_content = Column(String(1000), nullable=False)
+    last_message_at = Column(DateTime, nullable=False)
+
+    __table_args__ = (
+        Index('ux_chat_conversations_pair', 'user_a_id', 'user_b_id', unique=True),
+        Index('ix_chat_conversations_user_a_last', 'user_a_id', 'last_message_at'),
+        Index('ix_chat_conversations_user_b_last', 'user_b_id', 'last_message_at'),
+    )
+
+class BusMessage(Base):
+    """Short-lived pub/sub message for MESSAGE_BUS=database (see message_bus.py)."""
+    __tablename__ = "bus_messages"
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    channel = Column(String(50), nullable=False)
+    payload = Column(Text, nullable=False)
+    created_at = Column(DateTime, nullable=False, default=datetime.utcnow, index=True)
+
+class TokenRevocation(Base):
+    """Tokens of this user issued up to revoked_at are invalid (see token_revocation.py)."""
+    __tablename__ = "token_revocations"
+
+    # No foreign key: revocations must outlive deleted users
+    user_id = Column(Integer, primary_key=True, autoincrement=False)
+    # Microseconds: compared against the fractional iat of tokens issued in the same second
+    revoked_at = Column(DateTime().with_variant(mysql.DATETIME(fsp=6), "mysql"), nullable=False, index=True)
+
+class ChatUnreadCounter(Base):
+    """Unread chat messages per (receiver, sender), kept up to date on send and read (see notifications.py)."""
+    __tablename__ = "chat_unread_counters"
+
+    receiver_id = Column(Integer, ForeignKey("users.id"), primary_key=True)
+    sender_id = Column(Integer, ForeignKey("users.id"), primary_key=True)
+    unread_count = Column(Integer, nullable=False, default=0)
+
 class ShiftHourIncreaseRequest(Base):
     __tablename__ = "shift_hour_increase_requests"
 
@@ -1,17 +1,25 @@
 from fastapi import APIRouter, WebSocket, WebSocketDisconnect, Depends, HTTPException, Body, Query
+from fastapi.encoders import jsonable_encoder
 from typing import List, Dict, Optional
 from datetime import datetime
 from pydantic import BaseModel
 from auth import get_current_user, require_roles
-from database import get_db
-from sqlalchemy.orm import Session
-from models import ChatMessage, User
-from sqlalchemy import and_, or_
+from database import get_async_db, AsyncSessionLocal
+from sqlalchemy.ext.asyncio import AsyncSession
+from models import ChatMessage, ChatConversation, ChatUnreadCounter, User
+from sqlalchemy import and_, case, or_, select, update
+from sqlalchemy.exc import IntegrityError
 import json
 import jwt
 from jose import JWTError
 from config import SECRET_KEY, ALGORITHM
+from message_bus import bus
+import token_revocation
+from websocket_hub import WebSocketHub
 from urllib.parse import unquote
+import logging
+
+logger = logging.getLogger(__name__)
 
 router = APIRouter(
     prefix="/notifications",
@@ -35,36 +43,131 @@ class ChatMessageResponse(BaseModel):
     class Config:
         from_attributes = True
 
+class UnreadCountsResponse(BaseModel):
+    total: int
+    conversations: Dict[int, int]  # sender_id -> unread messages from that sender
+
+class ConversationResponse(BaseModel):
+    user_id: int
+    name: str
+    last_message_id: int
+    last_sender_id: int
+    last_content: str
+    last_message_at: datetime
+
+CHAT_HISTORY_PAGE_SIZE = 50
+CHAT_HISTORY_MAX_PAGE_SIZE = 200
+
+async def _record_last_message(db: AsyncSession, message: ChatMessage) -> None:
+    """Point the pair's chat_conversations row at `message` (flushed, same transaction)."""
+    user_a_id, user_b_id = sorted((message.sender_id, message.receiver_id))
+    pair = and_(ChatConversation.user_a_id == user_a_id, ChatConversation.user_b_id == user_b_id)
+    values = {
+        "last_message_id": message.id,
+        "last_sender_id": message.sender_id,
+        "last_content": message.content,
+        "last_message_at": message.timestamp
+    }
+    newer = update(ChatConversation).where(pair, ChatConversation.last_message_id < message.id).values(**values)
+    if (await db.execute(newer)).rowcount:
+        return
+    if (await db.execute(select(ChatConversation.id).where(pair))).first() is not None:
+        # A newer message of this pair got there first
+        return
+    try:
+        async with db.begin_nested():
+            db.add(ChatConversation(user_a_id=user_a_id, user_b_id=user_b_id, **values))
+    except IntegrityError:
+        # First message of the pair raced with another one; the row exists now
+        await db.execute(newer)
+
+async def _increment_unread(db: AsyncSession, receiver_id: int, sender_id: int) -> None:
+    key = and_(ChatUnreadCounter.receiver_id == receiver_id, ChatUnreadCounter.sender_id == sender_id)
+    increment = update(ChatUnreadCounter).where(key).values(unread_count=ChatUnreadCounter.unread_count + 1)
+    if (await db.execute(increment)).rowcount:
+        return
+    try:
+        async with db.begin_nested():
+            db.add(ChatUnreadCounter(receiver_id=receiver_id, sender_id=sender_id, unread_count=1))
+    except IntegrityError:
+        await db.execute(increment)
+
+async def _unread_counts(db: AsyncSession, receiver_id: int) -> Dict[int, int]:
+    """Unread messages per sender; a primary-key range on chat_unread_counters."""
+    rows = (await db.execute(
+        select(ChatUnreadCounter.sender_id, ChatUnreadCounter.unread_count).where(
+            ChatUnreadCounter.receiver_id == receiver_id,
+            ChatUnreadCounter.unread_count > 0
+        )
+    )).all()
+    return dict(rows)
+
+async def _store_message(db: AsyncSession, sender_id: int, receiver_id: int, content: str, shift_id: Optional[int]) -> ChatMessage:
+    db_message = ChatMessage(
+        sender_id=sender_id,
+        receiver_id=receiver_id,
+        content=content,
+        shift_id=shift_id
+    )
+    db.add(db_message)
+    await db.flush()
+    await _record_last_message(db, db_message)
+    await _increment_unread(db, receiver_id, sender_id)
+    await db.commit()
+    return db_message
+
+CHAT_CHANNEL = "chat"
+NOTIFICATION_CHANNEL = "notifications"
+
 class ChatManager:
     """
-    Manages active WebSocket connections and chat messages.
+    Manages the WebSocket connections of this worker. Messages go out through the message
+    bus, so they reach the receiver whichever worker it is connected to (see message_bus.py),
+    and are written per connection by the hub (see websocket_hub.py).
     """
 
     def __init__(self):
+        self.hub = WebSocketHub("chat", heartbeat={"type": "ping"})
         self.active_connections: Dict[str, WebSocket] = {}
         self.user_connections: Dict[str, List[str]] = {}
 
     async def connect(self, websocket: WebSocket, user_id: str):
-        await websocket.accept()
+        await self.hub.accept(websocket)
         self.active_connections[user_id] = websocket
         if user_id not in self.user_connections:
             self.user_connections[user_id] = []
 
-    def disconnect(self, user_id: str):
-        if user_id in self.active_connections:
+    def disconnect(self, user_id: str, websocket: WebSocket):
+        self.hub.disconnect(websocket)
+        # A reconnect may already have replaced this connection
+        if self.active_connections.get(user_id) is websocket:
             del self.active_connections[user_id]
-        if user_id in self.user_connections:
-            del self.user_connections[user_id]
+            self.user_connections.pop(user_id, None)
 
     async def send_personal_message(self, message: dict, receiver_id: str):
-        if receiver_id in self.active_connections:
-            await self.active_connections[receiver_id].send_json(message)
+        await bus.publish(CHAT_CHANNEL, {"receiver_id": str(receiver_id), "message": message})
 
-    async def broadcast(self, message: str):
-        for connection in self.active_connections.values():
-            await connection.send_text(message)
+    async def deliver(self, envelope: dict):
+        """Bus handler: send to the receiver if it is connected to this worker."""
+        websocket = self.active_connections.get(envelope["receiver_id"])
+        if websocket is not None:
+            self.hub.send(websocket, envelope["message"])
 
 chat_manager = ChatManager()
+bus.subscribe(CHAT_CHANNEL, chat_manager.deliver)
+
+async def _push_unread_counts(db: AsyncSession, user_id: int) -> None:
+    """Send the user's unread counters over their chat websocket, so clients need not poll."""
+    if bus.local_only and str(user_id) not in chat_manager.active_connections:
+        return
+    counts = await _unread_counts(db, user_id)
+    try:
+        await chat_manager.send_personal_message(
+            {"type": "unread", "total": sum(counts.values()), "conversations": counts},
+            str(user_id)
+        )
+    except Exception:
+        logger.debug("Could not push unread counts to user %s", user_id, exc_info=True)
 
 @router.websocket("/ws/chat/{user_id}")
 async def chat_websocket(
@@ -78,12 +181,9 @@ async def chat_websocket(
     Each user gets their own WebSocket connection for private messaging.
     """
     try:
-        print(f"WebSocket connection attempt for user {user_id}")
-        print(f"Token provided: {'Yes' if token else 'No'}")
-        print(f"Full token: {token}")
+        logger.debug("WebSocket connection attempt for user %s", user_id)
 
         if not token:
-            print("No token provided")
             await websocket.close(code=4000, reason="No authentication token provided")
             return
 
@@ -91,140 +191,115 @@ async def chat_websocket(
         try:
             # Decode the token
             try:
-                print(f"Attempting to decode token: {token[:20]}...")
-                print(f"Using SECRET_KEY: {SECRET_KEY}")
-                print(f"Using ALGORITHM: {ALGORITHM}")
-                
                 payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-                print(f"Token payload: {payload}")
                 
                 username: str = payload.get("sub")
                 if username is None:
-                    print("No username in token payload")
                     await websocket.close(code=4001, reason="Invalid token payload")
                     return
-                
-                print(f"Username from token: {username}")
+                # A refresh token lives for days; it is not a login
+                if payload.get("type", "access") != "access":
+                    await websocket.close(code=4001, reason="Invalid token type")
+                    return
+                if token_revocation.is_revoked(payload.get("uid"), payload.get("iat")):
+                    await websocket.close(code=4001, reason="Token revoked")
+                    return
+
+                # Only the lookup holds a session; each message below gets its own, so an open
+                # socket does not keep a pooled connection checked out
+                async with AsyncSessionLocal() as db:
+                    user = (await db.execute(select(User).where(User.username == username))).scalars().first()
 
-                # Get the user from the database
-                db = next(get_db())
-                user = db.query(User).filter(User.username == username).first()
-                
                 if not user:
-                    print(f"No user found for username: {username}")
                     await websocket.close(code=4001, reason="User not found")
                     return
 
                 # Get the user ID and ensure it's a string
                 current_user_id = str(user.id)
-                print(f"Current user ID: {current_user_id}")
-                print(f"Requested user ID: {user_id}")
-                
+                # The sender of everything sent on this socket
+                sender_name = user.full_name or "Unknown"
+
                 # Compare the user IDs
                 if current_user_id != user_id:
-                    print(f"User ID mismatch: {current_user_id} != {user_id}")
+                    logger.warning("WebSocket user id mismatch: token is for %s, path is %s", current_user_id, user_id)
                     await websocket.close(code=4003, reason="Not authorized")
                     return
-                
-                print("Authentication successful, accepting WebSocket connection")
+
+                logger.info("Chat websocket connected for user %s", current_user_id)
                 await chat_manager.connect(websocket, current_user_id)
-                
+
                 try:
                     while True:
                         data = await websocket.receive_json()
-                        print(f"Received message: {data}")
-                        
+
+                        if data.get("type") == "ping":
+                            chat_manager.hub.send(websocket, {"type": "pong"})
+
                         # Handle incoming chat messages
-                        if data.get("type") == "message":
+                        elif data.get("type") == "message":
                             message = data.get("content")
                             receiver_id = data.get("receiver_id")
                             shift_id = data.get("shift_id")
-                            
-                            # Store message in database
-                            db_message = ChatMessage(
-                                sender_id=int(current_user_id),
-                                receiver_id=int(receiver_id),
-                                content=message,
-                                shift_id=shift_id
-                            )
-                            db.add(db_message)
-                            db.commit()
-                            db.refresh(db_message)
-                            
-                            # Get sender's name
-                            sender = db.query(User).filter(User.id == current_user_id).first()
-                            sender_name = sender.full_name if sender else "Unknown"
-                            
-                            # Prepare message response
-                            message_response = {
-                                "type": "message",
-                                "id": db_message.id,
-                                "sender_id": current_user_id,
-                                "receiver_id": receiver_id,
-                                "content": message,
-                                "timestamp": db_message.timestamp.isoformat(),
-                                "shift_id": shift_id,
-                                "sender_name": sender_name
-                            }
-                            
-                            print(f"Sending message response: {message_response}")
-                            
-                            # Send to receiver if online
-                            await chat_manager.send_personal_message(message_response, str(receiver_id))
-                            # Send back to sender for confirmation
-                            await chat_manager.send_personal_message(message_response, current_user_id)
-                            
+
+                            async with AsyncSessionLocal() as db:
+                                # Store message in database
+                                db_message = await _store_message(db, int(current_user_id), int(receiver_id), message, shift_id)
+
+                                # Prepare message response
+                                message_response = {
+                                    "type": "message",
+                                    "id": db_message.id,
+                                    "sender_id": current_user_id,
+                                    "receiver_id": receiver_id,
+                                    "content": message,
+                                    "timestamp": db_message.timestamp.isoformat(),
+                                    "shift_id": shift_id,
+                                    "sender_name": sender_name
+                                }
+
+                                # Send to receiver if online
+                                await chat_manager.send_personal_message(message_response, str(receiver_id))
+                                # Send back to sender for confirmation
+                                await chat_manager.send_personal_message(message_response, current_user_id)
+                                await _push_unread_counts(db, int(receiver_id))
+
                 except WebSocketDisconnect:
-                    print(f"WebSocket disconnected for user {current_user_id}")
-                    chat_manager.disconnect(current_user_id)
-                except Exception as e:
-                    print(f"Error in WebSocket connection: {str(e)}")
+                    logger.info("Chat websocket disconnected for user %s", current_user_id)
+                except Exception:
+                    logger.exception("Error in chat websocket for user %s", current_user_id)
                     await websocket.close(code=1011, reason="Internal server error")
-                    
+                finally:
+                    chat_manager.disconnect(current_user_id, websocket)
+
             except JWTError as e:
-                print(f"JWT decode error: {str(e)}")
-                print(f"Error type: {type(e)}")
-                print(f"Error details: {e.__dict__}")
+                logger.info("Chat websocket rejected, invalid token: %s", e)
                 await websocket.close(code=4001, reason="Invalid token")
                 return
                 
         except Exception as e:
-            print(f"Authentication error: {str(e)}")
-            print(f"Error type: {type(e)}")
-            print(f"Error details: {e.__dict__}")
+            logger.info("Chat websocket authentication failed: %r", e)
             await websocket.close(code=4001, reason="Invalid authentication token")
             return
             
-    except Exception as e:
-        print(f"Error in WebSocket authentication: {str(e)}")
-        print(f"Error type: {type(e)}")
-        print(f"Error details: {e.__dict__}")
+    except Exception:
+        logger.exception("Error in chat websocket authentication")
         await websocket.close(code=4000, reason="Authentication failed")
 
 @router.post("/chat/send", response_model=ChatMessageResponse)
 async def send_chat_message(
     message: ChatMessageCreate,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     Send a chat message to another user.
     The message will be stored in the database and sent via WebSocket if the receiver is online.
     """
     # Create and store the message
-    db_message = ChatMessage(
-        sender_id=current_user.id,
-        receiver_id=message.receiver_id,
-        content=message.content,
-        shift_id=message.shift_id
-    )
-    db.add(db_message)
-    db.commit()
-    db.refresh(db_message)
+    db_message = await _store_message(db, current_user.id, int(message.receiver_id), message.content, message.shift_id)
     
-    # Get sender's name
-    sender = db.query(User).filter(User.id == current_user.id).first()
-    sender_name = sender.full_name if sender else "Unknown"
+    # The sender is the authenticated user
+    sender_name = current_user.full_name or "Unknown"
     
     # Prepare message response
     message_response = ChatMessageResponse(
@@ -237,101 +312,182 @@ async def send_chat_message(
         sender_name=sender_name
     )
     
-    # Send via WebSocket if receiver is online
-    if message.receiver_id in chat_manager.active_connections:
-        await chat_manager.send_personal_message(
-            message_response.dict(),
-            message.receiver_id
-        )
+    # Send via WebSocket if receiver is online (on any worker)
+    await chat_manager.send_personal_message(
+        jsonable_encoder(message_response),
+        message.receiver_id
+    )
+    await _push_unread_counts(db, int(message.receiver_id))
     
     return message_response
 
 @router.get("/chat/history/{user_id}", response_model=List[ChatMessageResponse])
 async def get_chat_history(
     user_id: str,
+    before_id: Optional[int] = Query(None, description="Alleen berichten van voor dit bericht (oudere pagina)"),
+    limit: int = Query(CHAT_HISTORY_PAGE_SIZE, ge=1, le=CHAT_HISTORY_MAX_PAGE_SIZE),
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
-    Get chat history between the current user and another user.
+    Get chat history between the current user and another user, one page at a time.
+    Returns the newest `limit` messages (oldest first); pass the id of the first message
+    as before_id to fetch the page before it. Opening the conversation (no before_id)
+    marks the other user's messages as read.
     """
     try:
-        print(f"Current user: {current_user}")
-        print(f"Other user ID: {user_id}")
-        
         # Convert user_id to integer
         other_user_id_int = int(user_id)
-        
-        # Get messages between the current user and the other user
-        messages = db.query(ChatMessage).filter(
-            ((ChatMessage.sender_id == current_user.id) & (ChatMessage.receiver_id == other_user_id_int)) |
-            ((ChatMessage.sender_id == other_user_id_int) & (ChatMessage.receiver_id == current_user.id))
-        ).order_by(ChatMessage.timestamp.asc()).all()
-        
-        print(f"Found {len(messages)} messages")
-        
-        # Get sender names
-        sender_ids = {msg.sender_id for msg in messages}
-        print(f"Sender IDs: {sender_ids}")
-        
-        senders = {user.id: user.full_name for user in db.query(User).filter(User.id.in_(sender_ids)).all()}
-        print(f"Senders: {senders}")
-        
-        # Mark messages as read if current user is the receiver
-        for msg in messages:
-            if msg.receiver_id == current_user.id and not msg.read:
-                msg.read = True
-        db.commit()
-        
-        response = [
+        conversation = or_(
+            and_(ChatMessage.sender_id == current_user.id, ChatMessage.receiver_id == other_user_id_int),
+            and_(ChatMessage.sender_id == other_user_id_int, ChatMessage.receiver_id == current_user.id)
+        )
+
+        query = select(
+            ChatMessage.id, ChatMessage.sender_id, ChatMessage.receiver_id, ChatMessage.content,
+            ChatMessage.timestamp, ChatMessage.shift_id
+        ).where(conversation)
+        if before_id is not None:
+            # Keyset on (timestamp, id) over ix_chat_messages_pair_timestamp
+            cursor_timestamp = (await db.execute(
+                select(ChatMessage.timestamp).where(ChatMessage.id == before_id, conversation)
+            )).scalar()
+            if cursor_timestamp is None:
+                raise HTTPException(status_code=404, detail="Bericht niet gevonden")
+            query = query.where(or_(
+                ChatMessage.timestamp < cursor_timestamp,
+                and_(ChatMessage.timestamp == cursor_timestamp, ChatMessage.id < before_id)
+            ))
+        rows = (await db.execute(
+            query.order_by(ChatMessage.timestamp.desc(), ChatMessage.id.desc()).limit(limit)
+        )).all()
+        rows.reverse()
+
+        logger.debug("Chat history %s <-> %s: %s messages (before %s)", current_user.id, user_id, len(rows), before_id)
+
+        # Only two senders in a conversation
+        senders = {current_user.id: current_user.full_name}
+        if any(row.sender_id == other_user_id_int for row in rows):
+            senders[other_user_id_int] = (await db.execute(
+                select(User.full_name).where(User.id == other_user_id_int)
+            )).scalar()
+
+        if before_id is None:
+            # Mark messages as read in one statement instead of per message
+            marked = (await db.execute(
+                update(ChatMessage).where(
+                    ChatMessage.receiver_id == current_user.id,
+                    ChatMessage.sender_id == other_user_id_int,
+                    ChatMessage.read == False
+                ).values(read=True)
+            )).rowcount
+            if marked:
+                # Subtract, not reset: a message stored after the UPDATE above is still unread
+                await db.execute(
+                    update(ChatUnreadCounter).where(
+                        ChatUnreadCounter.receiver_id == current_user.id,
+                        ChatUnreadCounter.sender_id == other_user_id_int
+                    ).values(unread_count=case(
+                        (ChatUnreadCounter.unread_count > marked, ChatUnreadCounter.unread_count - marked),
+                        else_=0
+                    ))
+                )
+                await db.commit()
+                # Other open tabs of this user
+                await _push_unread_counts(db, current_user.id)
+
+        return [
             ChatMessageResponse(
-                id=msg.id,
-                sender_id=msg.sender_id,
-                receiver_id=msg.receiver_id,
-                content=msg.content,
-                timestamp=msg.timestamp,
-                shift_id=msg.shift_id,
-                sender_name=senders.get(msg.sender_id, "Unknown")
+                id=row.id,
+                sender_id=row.sender_id,
+                receiver_id=row.receiver_id,
+                content=row.content,
+                timestamp=row.timestamp,
+                shift_id=row.shift_id,
+                sender_name=senders.get(row.sender_id) or "Unknown"
             )
-            for msg in messages
+            for row in rows
         ]
-        
-        print(f"Response: {response}")
-        return response
-        
+
+    except HTTPException:
+        raise
     except Exception as e:
-        print(f"Error in get_chat_history: {str(e)}")
-        print(f"Error type: {type(e)}")
-        import traceback
-        print("Traceback:")
-        print(traceback.format_exc())
+        logger.exception("Error in get_chat_history")
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.get("/chat/conversations", response_model=List[ConversationResponse])
+async def get_conversations(
+    limit: int = Query(50, ge=1, le=200),
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """
+    The current user's conversations with their last message, most recent first.
+    Served from chat_conversations, so the cost does not grow with the number of messages.
+    """
+    try:
+        conversations = (await db.execute(
+            select(ChatConversation).where(or_(
+                ChatConversation.user_a_id == current_user.id,
+                ChatConversation.user_b_id == current_user.id
+            )).order_by(ChatConversation.last_message_at.desc()).limit(limit)
+        )).scalars().all()
+
+        other_ids = {
+            c.user_b_id if c.user_a_id == current_user.id else c.user_a_id for c in conversations
+        }
+        names = dict((await db.execute(
+            select(User.id, User.full_name).where(User.id.in_(other_ids))
+        )).all()) if other_ids else {}
+
+        result = []
+        for conversation in conversations:
+            other_id = conversation.user_b_id if conversation.user_a_id == current_user.id else conversation.user_a_id
+            result.append(ConversationResponse(
+                user_id=other_id,
+                name=names.get(other_id) or "Unknown",
+                last_message_id=conversation.last_message_id,
+                last_sender_id=conversation.last_sender_id,
+                last_content=conversation.last_content,
+                last_message_at=conversation.last_message_at
+            ))
+        return result
+    except Exception as e:
+        logger.exception("Error in get_conversations")
         raise HTTPException(status_code=500, detail=str(e))
 
 class NotificationManager:
     """
-    Beheert actieve WebSocket-verbindingen en verstuurt notificaties.
+    Beheert de actieve WebSocket-verbindingen van deze worker en verstuurt notificaties.
+    Broadcasts lopen via de message bus, zodat ook verbindingen op andere workers ze krijgen.
     """
 
     def __init__(self):
-        self.active_connections: List[WebSocket] = []
+        self.hub = WebSocketHub("notifications")
+
+    @property
+    def active_connections(self) -> List[WebSocket]:
+        return list(self.hub.clients)
 
     async def connect(self, websocket: WebSocket):
-        await websocket.accept()
-        self.active_connections.append(websocket)
+        await self.hub.accept(websocket)
 
     def disconnect(self, websocket: WebSocket):
-        if websocket in self.active_connections:
-            self.active_connections.remove(websocket)
+        self.hub.disconnect(websocket)
 
     async def send_personal_notification(self, message: str, websocket: WebSocket):
-        await websocket.send_text(message)
+        self.hub.send(websocket, message)
 
     async def broadcast(self, message: str):
-        for connection in self.active_connections:
-            await connection.send_text(message)
+        await bus.publish(NOTIFICATION_CHANNEL, {"text": message})
+
+    async def deliver(self, envelope: dict):
+        """Bus handler: queue for every connection on this worker."""
+        self.hub.broadcast(envelope["text"])
 
 
 manager = NotificationManager()
+bus.subscribe(NOTIFICATION_CHANNEL, manager.deliver)
 
 
 @router.websocket("/ws")
@@ -347,6 +503,9 @@ async def notifications_websocket(websocket: WebSocket, current_user: dict = Dep
         while True:
             # In dit voorbeeld lezen we berichten die de client stuurt, maar de backend kan ook zelfstandig notificaties sturen.
             data = await websocket.receive_text()
+            if data == "ping":
+                manager.hub.send(websocket, "pong")
+                continue
             # Voor demonstratiedoeleinden broadcasten we het bericht met de gebruikersnaam erbij.
             await manager.broadcast(f"{current_user.get('username')}: {data}")
     except WebSocketDisconnect:
@@ -369,50 +528,70 @@ async def send_notification(message: str = Body(..., embed=True),
 @router.get("/unread-count", response_model=int)
 async def get_unread_count(
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     Get the number of unread messages for the current user.
+    Clients connected to the chat websocket receive changes as {"type": "unread"} messages instead.
     """
     try:
-        # Count messages where the current user is the receiver and the message is unread
-        unread_count = db.query(ChatMessage).filter(
-            and_(
-                ChatMessage.receiver_id == current_user.id,
-                ChatMessage.read == False
-            )
-        ).count()
-        
-        print(f"Unread count for user {current_user.id}: {unread_count}")
-        return unread_count
+        return sum((await _unread_counts(db, current_user.id)).values())
     except Exception as e:
-        print(f"Error in get_unread_count: {str(e)}")
+        logger.exception("Error in get_unread_count")
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.get("/unread-counts", response_model=UnreadCountsResponse)
+async def get_unread_counts(
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """Unread messages in total and per conversation (sender_id -> count)."""
+    try:
+        counts = await _unread_counts(db, current_user.id)
+        return UnreadCountsResponse(total=sum(counts.values()), conversations=counts)
+    except Exception as e:
+        logger.exception("Error in get_unread_counts")
         raise HTTPException(status_code=500, detail=str(e))
 
 @router.post("/mark-read/{message_id}")
 async def mark_message_as_read(
     message_id: int,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     Mark a message as read.
     """
     try:
-        message = db.query(ChatMessage).filter(
-            and_(
+        result = await db.execute(
+            update(ChatMessage).where(
                 ChatMessage.id == message_id,
-                ChatMessage.receiver_id == current_user.id
+                ChatMessage.receiver_id == current_user.id,
+                ChatMessage.read == False
+            ).values(read=True)
+        )
+        if result.rowcount:
+            sender_id = (await db.execute(select(ChatMessage.sender_id).where(ChatMessage.id == message_id))).scalar()
+            await db.execute(
+                update(ChatUnreadCounter).where(
+                    ChatUnreadCounter.receiver_id == current_user.id,
+                    ChatUnreadCounter.sender_id == sender_id,
+                    ChatUnreadCounter.unread_count > 0
+                ).values(unread_count=ChatUnreadCounter.unread_count - 1)
             )
-        ).first()
-        
-        if not message:
-            raise HTTPException(status_code=404, detail="Message not found")
-        
-        message.read = True
-        db.commit()
+            await db.commit()
+            await _push_unread_counts(db, current_user.id)
+        else:
+            # Already read, or not a message to this user
+            exists = (await db.execute(
+                select(ChatMessage.id).where(ChatMessage.id == message_id, ChatMessage.receiver_id == current_user.id)
+            )).first()
+            if not exists:
+                raise HTTPException(status_code=404, detail="Message not found")
         
         return {"status": "success"}
+    except HTTPException:
+        raise
     except Exception as e:
-        print(f"Error in mark_message_as_read: {str(e)}")
+        logger.exception("Error in mark_message_as_read")
         raise HTTPException(status_code=500, detail=str(e))
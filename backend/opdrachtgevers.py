@@ -1,10 +1,11 @@
-from fastapi import APIRouter, HTTPException, Depends
+from fastapi import APIRouter, HTTPException, Depends, Request
 from pydantic import BaseModel
 from typing import List, Optional
 from sqlalchemy.orm import Session
 from database import get_db
 from models import Opdrachtgever
-from auth import get_current_user
+from auth import TokenUser, get_token_user
+import reference_cache
 
 router = APIRouter(
     prefix="/opdrachtgevers",
@@ -31,17 +32,27 @@ class OpdrachtgeverResponse(OpdrachtgeverBase):
         orm_mode = True
 
 @router.get("/", response_model=List[OpdrachtgeverResponse])
-async def get_opdrachtgevers(
-    current_user: dict = Depends(get_current_user),
+def get_opdrachtgevers(
+    request: Request,
+    # Token claims only: a 304 from reference_cache must not cost a user query
+    current_user: TokenUser = Depends(get_token_user),
     db: Session = Depends(get_db)
 ):
     """Haal alle opdrachtgevers op."""
-    return db.query(Opdrachtgever).all()
+    def load():
+        rows = db.query(
+            Opdrachtgever.id, Opdrachtgever.naam, Opdrachtgever.bedrijfsnaam, Opdrachtgever.kvk_nummer,
+            Opdrachtgever.adres, Opdrachtgever.postcode, Opdrachtgever.stad, Opdrachtgever.telefoon,
+            Opdrachtgever.email
+        ).all()
+        return [dict(row._mapping) for row in rows]
+
+    return reference_cache.cached_response(request, ("opdrachtgevers",), load)
 
 @router.post("/", response_model=OpdrachtgeverResponse, status_code=201)
-async def create_opdrachtgever(
+def create_opdrachtgever(
     opdrachtgever: OpdrachtgeverCreate,
-    current_user: dict = Depends(get_current_user),
+    current_user: TokenUser = Depends(get_token_user),
     db: Session = Depends(get_db)
 ):
     """Maak een nieuwe opdrachtgever aan."""
@@ -53,13 +64,14 @@ async def create_opdrachtgever(
     db_opdrachtgever = Opdrachtgever(**opdrachtgever.dict())
     db.add(db_opdrachtgever)
     db.commit()
+    reference_cache.bump("opdrachtgevers")
     db.refresh(db_opdrachtgever)
     return db_opdrachtgever
 
 @router.get("/{opdrachtgever_id}", response_model=OpdrachtgeverResponse)
-async def get_opdrachtgever(
+def get_opdrachtgever(
     opdrachtgever_id: int,
-    current_user: dict = Depends(get_current_user),
+    current_user: TokenUser = Depends(get_token_user),
     db: Session = Depends(get_db)
 ):
     """Haal een specifieke opdrachtgever op."""
@@ -69,10 +81,10 @@ async def get_opdrachtgever(
     return opdrachtgever
 
 @router.put("/{opdrachtgever_id}", response_model=OpdrachtgeverResponse)
-async def update_opdrachtgever(
+def update_opdrachtgever(
     opdrachtgever_id: int,
     opdrachtgever_update: OpdrachtgeverBase,
-    current_user: dict = Depends(get_current_user),
+    current_user: TokenUser = Depends(get_token_user),
     db: Session = Depends(get_db)
 ):
     """Update een bestaande opdrachtgever."""
@@ -93,13 +105,14 @@ async def update_opdrachtgever(
         setattr(db_opdrachtgever, key, value)
 
     db.commit()
+    reference_cache.bump("opdrachtgevers")
     db.refresh(db_opdrachtgever)
     return db_opdrachtgever
 
 @router.delete("/{opdrachtgever_id}")
-async def delete_opdrachtgever(
+def delete_opdrachtgever(
     opdrachtgever_id: int,
-    current_user: dict = Depends(get_current_user),
+    current_user: TokenUser = Depends(get_token_user),
     db: Session = Depends(get_db)
 ):
     """Verwijder een opdrachtgever."""
@@ -109,4 +122,6 @@ async def delete_opdrachtgever(
 
     db.delete(db_opdrachtgever)
     db.commit()
+    # Its locations go with it (or lose their opdrachtgever_id)
+    reference_cache.bump("opdrachtgevers", "locations")
     return {"message": "Opdrachtgever verwijderd"}
@@ -1,9 +1,6 @@
 from fastapi import APIRouter, HTTPException, Depends
 from fastapi.responses import StreamingResponse
 from auth import require_roles
-from reportlab.lib.pagesizes import A4
-from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer
-from reportlab.lib.styles import getSampleStyleSheet
 from database import get_db
 from sqlalchemy.orm import Session
 from models import Factuur
@@ -18,11 +15,16 @@ router = APIRouter(
 )
 
 @router.get("/facturen")
-async def export_facturen_pdf(
+def export_facturen_pdf(
     current_user: dict = Depends(require_roles(["boekhouding", "admin", "planner"])),
     db: Session = Depends(get_db)
 ):
     """Export all invoices as PDF."""
+    # reportlab is only loaded by the endpoints that render PDFs
+    from reportlab.lib.pagesizes import A4
+    from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer
+    from reportlab.lib.styles import getSampleStyleSheet
+
     try:
         logger.info("Starting PDF export of invoices")
         facturen = db.query(Factuur).all()
@@ -2,13 +2,19 @@ from fastapi import APIRouter, HTTPException, Depends, Query
 from pydantic import BaseModel
 from typing import List, Optional
 from datetime import date, time, datetime, timedelta
-from sqlalchemy.orm import Session
-from sqlalchemy import or_
-from database import get_db
+from sqlalchemy import or_, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import selectinload
+from database import get_async_db
 from models import Shift as DBShift, User, Location, AutoApproval
 from auth import get_current_user, require_roles
 from auto_approval import check_auto_approval_eligibility
-import traceback
+from location_experience import record_completed_shifts, recompute_experience
+from fast_json import FastJSONResponse
+from fieldsets import FieldSet, fields_query
+import logging
+
+logger = logging.getLogger(__name__)
 
 router = APIRouter(
     prefix="/planning",
@@ -97,12 +103,60 @@ def times_overlap(start1: time, end1: time, start2: time, end2: time) -> bool:
     """
     return start1 < end2 and start2 < end1
 
+_LOC_ID = Location.id.label("loc_id")
+_LOC_NAAM = Location.naam.label("loc_naam")
+_LOC_ADRES = Location.adres.label("loc_adres")
+_LOC_STAD = Location.stad.label("loc_stad")
+_LOC_PROVINCIE = Location.provincie.label("loc_provincie")
+
+# List endpoints select only the columns of the requested fields and build the ShiftResponse-shaped
+# dicts directly, without ORM objects or per-row model validation (see fast_json.py and fieldsets.py).
+# Same keys and defaults as ShiftResponse would serialize.
+SHIFT_FIELDS = FieldSet({
+    "shift_date": ((DBShift.datum,), lambda datum: datum.isoformat()),
+    "start_time": ((DBShift.start_tijd,), None),
+    "end_time": ((DBShift.eind_tijd,), None),
+    "location_id": ((DBShift.location_id,), None),
+    "employee_id": ((DBShift.medewerker_id,), None),
+    "status": ((DBShift.status,), None),
+    "title": ((), lambda: None),
+    "stad": ((DBShift.stad,), lambda stad: stad or ""),
+    "provincie": ((DBShift.provincie,), lambda provincie: provincie or ""),
+    "adres": ((DBShift.adres,), lambda adres: adres or ""),
+    "required_profile": ((DBShift.required_profile,), None),
+    "reiskilometers": ((DBShift.reiskilometers,), None),
+    "id": ((DBShift.id,), None),
+    "location": ((DBShift.locatie,), None),
+    "location_details": (
+        (_LOC_ID, _LOC_NAAM, _LOC_ADRES, _LOC_STAD, _LOC_PROVINCIE),
+        lambda id, naam, adres, stad, provincie: {
+            "id": id,
+            "naam": naam,
+            "adres": adres,
+            "stad": stad,
+            "provincie": provincie
+        } if id is not None else None
+    ),
+    "assigned_by_admin": ((), lambda: None),
+    "titel": ((DBShift.titel,), lambda titel: titel or "")
+})
+
+def _shift_list_query(names: List[str]):
+    """Projection for the requested fields; the locations join only when location_details is asked for."""
+    # The id is always selected, so a fieldset of constant fields still makes a valid query
+    query = select(*SHIFT_FIELDS.columns(names, extra=(DBShift.id,))).select_from(DBShift)
+    if "location_details" in names:
+        query = query.outerjoin(Location, Location.id == DBShift.location_id)
+    return query
+
 @router.get("/", response_model=List[ShiftResponse])
 async def get_shifts(
+    fields: Optional[str] = fields_query(),
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
-    """Haal alle shifts op."""
+    """Haal alle shifts op. Met fields=... alleen die velden (zie fieldsets.py)."""
+    names = SHIFT_FIELDS.parse(fields)
     try:
         # Check if user has permission to view shifts
         if not current_user or not hasattr(current_user, 'roles'):
@@ -119,80 +173,12 @@ async def get_shifts(
                 detail="You don't have permission to view shifts"
             )
 
-        db_shifts = db.query(DBShift).all()
-        print(f"Found {len(db_shifts)} shifts in database")
-        
-        # Convert SQLAlchemy models to Pydantic models for response
-        shifts = []
-        for db_shift in db_shifts:
-            try:
-                print(f"Processing shift {db_shift.id}")
-                print(f"Shift data: {db_shift.__dict__}")
-                
-                # Get location details if available
-                location_details = None
-                if db_shift.location:
-                    location_details = {
-                        "id": db_shift.location.id,
-                        "naam": db_shift.location.naam,
-                        "adres": db_shift.location.adres,
-                        "stad": db_shift.location.stad,
-                        "provincie": db_shift.location.provincie
-                    }
-                
-                # Convert the shift date to ISO format string
-                shift_date = db_shift.datum
-                if isinstance(shift_date, date):
-                    shift_date = shift_date.isoformat()
-                
-                # Safely convert employee_id
-                employee_id = None
-                if db_shift.medewerker_id is not None:
-                    employee_id = str(db_shift.medewerker_id)
-                
-                # Safely convert other fields with defaults
-                titel = str(db_shift.titel) if db_shift.titel is not None else ""
-                stad = str(db_shift.stad) if db_shift.stad is not None else ""
-                provincie = str(db_shift.provincie) if db_shift.provincie is not None else ""
-                adres = str(db_shift.adres) if db_shift.adres is not None else ""
-                required_profile = str(db_shift.required_profile) if db_shift.required_profile is not None else None
-                location = str(db_shift.locatie) if db_shift.locatie is not None else None
-                
-                # Ensure all required fields are present
-                shift_data = {
-                    "shift_date": shift_date,
-                    "start_time": str(db_shift.start_tijd),
-                    "end_time": str(db_shift.eind_tijd),
-                    "location_id": db_shift.location_id,
-                    "status": db_shift.status,
-                    "id": db_shift.id,
-                    "employee_id": employee_id,
-                    "titel": titel,
-                    "stad": stad,
-                    "provincie": provincie,
-                    "adres": adres,
-                    "required_profile": required_profile,
-                    "location": location,
-                    "location_details": location_details
-                }
-                
-                print(f"Converted shift data: {shift_data}")
-                
-                shift = ShiftResponse(**shift_data)
-                shifts.append(shift)
-            except Exception as e:
-                print(f"Error converting shift {db_shift.id}: {str(e)}")
-                print(f"Error type: {type(e)}")
-                print(f"Error args: {e.args}")
-                print(f"Shift data: {db_shift.__dict__}")
-                continue  # Skip this shift instead of failing the entire request
-        
-        print(f"Successfully converted {len(shifts)} shifts")
-        return shifts
+        rows = (await db.execute(_shift_list_query(names))).all()
+        logger.debug("Found %s shifts in database", len(rows))
+        to_dict = SHIFT_FIELDS.serializer(names, extra=(DBShift.id,))
+        return FastJSONResponse([to_dict(row) for row in rows])
     except Exception as e:
-        print(f"Error in get_shifts: {str(e)}")
-        print(f"Error type: {type(e)}")
-        print(f"Error args: {e.args}")
+        logger.exception("Error in get_shifts")
         raise HTTPException(
             status_code=500,
             detail=f"Internal server error: {str(e)}"
@@ -201,13 +187,15 @@ async def get_shifts(
 @router.get("/my-shifts", response_model=List[ShiftResponse])
 async def get_my_shifts(
     current_user: dict = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Haal alle shifts op voor de ingelogde medewerker."""
     if "employee" not in current_user["roles"]:
         raise HTTPException(status_code=403, detail="Only employees can view their own shifts")
     
-    db_shifts = db.query(DBShift).filter(DBShift.medewerker_id == current_user["username"]).all()
+    db_shifts = (await db.execute(
+        select(DBShift).where(DBShift.medewerker_id == current_user["username"])
+    )).scalars().all()
     
     # Convert SQLAlchemy models to Pydantic models for response
     shifts = []
@@ -236,16 +224,16 @@ async def get_my_shifts(
 async def get_my_shift(
     shift_id: int,
     current_user: dict = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Haal een specifieke shift op voor de ingelogde medewerker."""
     if "employee" not in current_user["roles"]:
         raise HTTPException(status_code=403, detail="Only employees can view their own shifts")
     
-    db_shift = db.query(DBShift).filter(
+    db_shift = (await db.execute(select(DBShift).where(
         DBShift.id == shift_id,
         DBShift.employee_id == current_user["id"]
-    ).first()
+    ))).scalars().first()
     
     if not db_shift:
         raise HTTPException(status_code=404, detail="Shift not found or not assigned to you")
@@ -263,63 +251,49 @@ async def get_my_shift(
     return shift
 
 @router.post("/", response_model=ShiftResponse)
-async def create_shift(shift: ShiftCreate, db: Session = Depends(get_db), current_user: User = Depends(get_current_user)):
+async def create_shift(shift: ShiftCreate, db: AsyncSession = Depends(get_async_db), current_user: User = Depends(get_current_user)):
     try:
-        print(f"Creating shift with data: {shift.dict()}")
-        print(f"Employee ID from request: {shift.employee_id}")
+        logger.debug("Creating shift: %s", shift)
         
         # Check if location exists
-        location = db.query(Location).filter(Location.id == shift.location_id).first()
+        location = (await db.execute(select(Location).where(Location.id == shift.location_id))).scalars().first()
         if not location:
             raise HTTPException(status_code=404, detail="Location not found")
-        
-        print(f"Found location: {location.naam}")
 
         # If employee_id is provided, verify it exists and check auto-approval
         medewerker_id = None
         if shift.employee_id:
             try:
-                print(f"Looking up employee with ID/username: {shift.employee_id}")
                 # Try to find employee by both ID and username
-                employee = db.query(User).filter(
+                employee = (await db.execute(select(User).where(
                     (User.id == shift.employee_id) | (User.username == shift.employee_id)
-                ).first()
+                ))).scalars().first()
                 if not employee:
-                    print(f"No employee found with ID/username: {shift.employee_id}")
                     raise HTTPException(status_code=404, detail=f"Employee not found with ID/username: {shift.employee_id}")
                 
-                print(f"Found employee: {employee.username}, ID: {employee.id}")
                 medewerker_id = employee.username  # Use username for consistency
 
                 # Check if this employee has auto-approval for this location
-                print(f"Checking auto-approval for employee username {employee.username} at location {location.naam}")
-                auto_approval = db.query(AutoApproval).filter(
+                auto_approval = (await db.execute(select(AutoApproval.id).where(
                     AutoApproval.employee_id == employee.username,
                     AutoApproval.location == location.naam,
                     AutoApproval.auto_approve == True
-                ).first()
+                ))).first()
 
                 if auto_approval:
-                    print("Auto-approval found, setting status to approved")
+                    logger.debug("Auto-approval for %s at %s, shift approved", employee.username, location.naam)
                     shift.status = "approved"
-                else:
-                    print("No auto-approval found, status remains:", shift.status)
             except Exception as e:
-                print(f"Error processing employee: {str(e)}")
-                print(f"Error type: {type(e)}")
-                print(f"Error args: {e.args}")
+                logger.warning("Error processing employee %s: %r", shift.employee_id, e)
                 raise HTTPException(status_code=400, detail=f"Error processing employee: {str(e)}")
 
         # Format times to HH:MM format
         start_time = ':'.join(shift.start_time.split(':')[:2])  # Keep only hours and minutes
         end_time = ':'.join(shift.end_time.split(':')[:2])
 
-        print(f"Creating shift with status: {shift.status}")
-        print(f"Using medewerker_id: {medewerker_id}")
-
         # Create the shift in the database
         db_shift = DBShift(
-            datum=shift.shift_date,
+            datum=date.fromisoformat(shift.shift_date[:10]),  # Date column; SQLite rejects strings
             start_tijd=start_time,
             eind_tijd=end_time,
             location_id=shift.location_id,
@@ -334,13 +308,11 @@ async def create_shift(shift: ShiftCreate, db: Session = Depends(get_db), curren
             reiskilometers=float(shift.reiskilometers) if shift.reiskilometers is not None else None
         )
         
-        print(f"Created DBShift object: {db_shift.__dict__}")
-        
         db.add(db_shift)
-        db.commit()
-        db.refresh(db_shift)
+        await db.commit()
+        await db.refresh(db_shift)
 
-        print(f"Created shift with status: {db_shift.status}")
+        logger.info("Created shift %s with status %s", db_shift.id, db_shift.status)
 
         # Convert date to string if it's a date object
         shift_date = db_shift.datum
@@ -364,31 +336,26 @@ async def create_shift(shift: ShiftCreate, db: Session = Depends(get_db), curren
             location=db_shift.locatie,
             reiskilometers=db_shift.reiskilometers
         )
-        print(f"Returning response: {response.dict()}")
         return response
     except Exception as e:
-        db.rollback()
-        print(f"Error creating shift: {str(e)}")
-        print(f"Error type: {type(e)}")
-        print(f"Error args: {e.args}")
-        print(f"Error traceback: {traceback.format_exc()}")
+        await db.rollback()
+        logger.exception("Error creating shift")
         raise HTTPException(status_code=500, detail=str(e))
 
 @router.get("/available-shifts", response_model=List[ShiftResponse])
 async def get_available_shifts(
+    fields: Optional[str] = fields_query(),
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Get all available shifts that employees can request (unassigned or assigned to current user)."""
+    names = SHIFT_FIELDS.parse(fields)
     try:
-        print(f"Current user: {current_user}")
         if not hasattr(current_user, 'roles'):
-            print("Current user does not have roles attribute")
             raise HTTPException(
                 status_code=403, 
                 detail="User does not have required permissions"
             )
-        print(f"User roles: {current_user.roles}")
         user_roles = [role.name for role in current_user.roles] if hasattr(current_user.roles, '__iter__') else []
         if not any(role in user_roles for role in ["employee", "planner", "admin"]):
             raise HTTPException(
@@ -396,67 +363,17 @@ async def get_available_shifts(
                 detail="You don't have permission to view available shifts"
             )
         # Show shifts that are open or pending and either unassigned or assigned to the current user
-        db_shifts = db.query(DBShift).filter(
-            DBShift.status.in_(["open", "pending"]),
-            or_(DBShift.medewerker_id == None, DBShift.medewerker_id == current_user.username)
-        ).all()
-        print(f"Found {len(db_shifts)} available (unassigned or assigned to current user) shifts")
-        
-        # Convert SQLAlchemy models to Pydantic models for response
-        shifts = []
-        for db_shift in db_shifts:
-            try:
-                # Get location details if available
-                location_details = None
-                if db_shift.location:
-                    location_details = {
-                        "id": db_shift.location.id,
-                        "naam": db_shift.location.naam,
-                        "adres": db_shift.location.adres,
-                        "stad": db_shift.location.stad,
-                        "provincie": db_shift.location.provincie
-                    }
-                
-                # Convert the shift date to ISO format string
-                shift_date = db_shift.datum
-                if isinstance(shift_date, date):
-                    shift_date = shift_date.isoformat()
-                
-                # Create shift data with default values for missing fields
-                shift_data = {
-                    "id": db_shift.id,
-                    "shift_date": shift_date,
-                    "start_time": str(db_shift.start_tijd),
-                    "end_time": str(db_shift.eind_tijd),
-                    "location_id": db_shift.location_id,
-                    "status": db_shift.status,
-                    "employee_id": db_shift.medewerker_id,
-                    "titel": db_shift.titel or "",
-                    "stad": db_shift.stad or "",
-                    "provincie": db_shift.provincie or "",
-                    "adres": db_shift.adres or "",
-                    "required_profile": db_shift.required_profile,
-                    "location": db_shift.locatie,
-                    "location_details": location_details,
-                    "reiskilometers": getattr(db_shift, 'reiskilometers', None),
-                    "assigned_by_admin": getattr(db_shift, 'assigned_by_admin', None)
-                }
-                
-                print(f"Converting shift data: {shift_data}")
-                
-                shift = ShiftResponse(**shift_data)
-                shifts.append(shift)
-            except Exception as e:
-                print(f"Error converting shift {db_shift.id}: {str(e)}")
-                print(f"Shift data: {db_shift.__dict__}")
-                continue  # Skip this shift instead of failing the entire request
-        
-        print(f"Successfully converted {len(shifts)} shifts")
-        return shifts
+        rows = (await db.execute(
+            _shift_list_query(names).where(
+                DBShift.status.in_(["open", "pending"]),
+                or_(DBShift.medewerker_id == None, DBShift.medewerker_id == current_user.username)
+            )
+        )).all()
+        logger.debug("Found %s available shifts for %s", len(rows), current_user.username)
+        to_dict = SHIFT_FIELDS.serializer(names, extra=(DBShift.id,))
+        return FastJSONResponse([to_dict(row) for row in rows])
     except Exception as e:
-        print(f"Error in get_available_shifts: {str(e)}")
-        print(f"Error type: {type(e)}")
-        print(f"Error args: {e.args}")
+        logger.exception("Error in get_available_shifts")
         raise HTTPException(
             status_code=500,
             detail=f"Internal server error: {str(e)}"
@@ -466,10 +383,12 @@ async def get_available_shifts(
 async def get_shift(
     shift_id: int,
     current_user: dict = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Get a specific shift by ID."""
-    db_shift = db.query(DBShift).filter(DBShift.id == shift_id).first()
+    db_shift = (await db.execute(
+        select(DBShift).options(selectinload(DBShift.location)).where(DBShift.id == shift_id)
+    )).scalars().first()
     if not db_shift:
         raise HTTPException(status_code=404, detail="Shift not found")
     
@@ -521,21 +440,21 @@ async def update_shift(
     shift_id: int,
     shift_update: ShiftBase,
     current_user: dict = Depends(require_roles(["planner", "admin"])),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Update een bestaande shift."""
-    db_shift = db.query(DBShift).filter(DBShift.id == shift_id).first()
+    db_shift = (await db.execute(select(DBShift).where(DBShift.id == shift_id))).scalars().first()
     if not db_shift:
         raise HTTPException(status_code=404, detail="Shift niet gevonden")
 
     # Get location details
-    location = db.query(Location).filter(Location.id == shift_update.location_id).first()
+    location = (await db.execute(select(Location).where(Location.id == shift_update.location_id))).scalars().first()
     if not location:
         raise HTTPException(status_code=404, detail="Location not found")
 
     if shift_update.employee_id:
         # Check if employee exists
-        employee = db.query(User).filter(User.username == shift_update.employee_id).first()
+        employee = (await db.execute(select(User).where(User.username == shift_update.employee_id))).scalars().first()
         if not employee:
             raise HTTPException(status_code=404, detail="Medewerker niet gevonden")
         # Use the employee's username as the medewerker_id
@@ -545,8 +464,11 @@ async def update_shift(
     start_time = ':'.join(shift_update.start_time.split(':')[:2])  # Keep only hours and minutes
     end_time = ':'.join(shift_update.end_time.split(':')[:2])
 
+    was_completed = db_shift.status == "completed"
+    previous = (db_shift.medewerker_id, db_shift.location_id, db_shift.datum)
+
     # Update the SQLAlchemy model with the new values
-    db_shift.datum = shift_update.shift_date
+    db_shift.datum = date.fromisoformat(shift_update.shift_date[:10])
     db_shift.start_tijd = start_time
     db_shift.eind_tijd = end_time
     db_shift.location_id = shift_update.location_id
@@ -559,19 +481,25 @@ async def update_shift(
     db_shift.adres = shift_update.adres
     db_shift.required_profile = shift_update.required_profile
 
-    db.commit()
-    db.refresh(db_shift)
+    # Keep the auto-approval experience summary in step with completed shifts
+    current = (db_shift.medewerker_id, db_shift.location_id, db_shift.datum)
+    if was_completed and (db_shift.status != "completed" or current != previous):
+        # Reopened, reassigned, moved or redated: recount the old and the new pair
+        await db.run_sync(recompute_experience, [previous[:2], current[:2]])
+    elif not was_completed and db_shift.status == "completed":
+        await db.run_sync(record_completed_shifts, [(db_shift.medewerker_id, db_shift.location_id, db_shift.datum)])
+
+    await db.commit()
+    await db.refresh(db_shift)
     
-    # Get location details for response
-    location_details = None
-    if db_shift.location:
-        location_details = {
-            "id": db_shift.location.id,
-            "naam": db_shift.location.naam,
-            "adres": db_shift.location.adres,
-            "stad": db_shift.location.stad,
-            "provincie": db_shift.location.provincie
-        }
+    # Get location details for response (the shift now points at this location)
+    location_details = {
+        "id": location.id,
+        "naam": location.naam,
+        "adres": location.adres,
+        "stad": location.stad,
+        "provincie": location.provincie
+    }
     
     # Convert SQLAlchemy model to Pydantic model for response
     shift = ShiftResponse(
@@ -597,15 +525,24 @@ async def update_shift(
 async def delete_shift(
     shift_id: int,
     current_user: dict = Depends(require_roles(["admin"])),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Verwijder een shift."""
-    db_shift = db.query(DBShift).filter(DBShift.id == shift_id).first()
+    # Load the dependent collections up front: the delete unlinks them, and lazy loads are not possible here
+    db_shift = (await db.execute(
+        select(DBShift).options(
+            selectinload(DBShift.dienstaanvragen),
+            selectinload(DBShift.hour_increase_requests)
+        ).where(DBShift.id == shift_id)
+    )).scalars().first()
     if not db_shift:
         raise HTTPException(status_code=404, detail="Shift niet gevonden")
 
-    db.delete(db_shift)
-    db.commit()
+    await db.delete(db_shift)
+    if db_shift.status == "completed":
+        # A deleted completed shift no longer counts as experience
+        await db.run_sync(recompute_experience, [(db_shift.medewerker_id, db_shift.location_id)])
+    await db.commit()
     return {"message": "Shift verwijderd"}
 
 @router.post("/{shift_id}/approve", response_model=Shift)
@@ -683,16 +620,16 @@ async def dienst_detail(shift_id: int):
 @router.get("/my-shifts/", response_model=List[ShiftResponse])
 async def get_my_shifts(
     current_user: dict = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Get shifts for the current user."""
     # Get the employee profile for the current user
-    employee = db.query(User).filter(User.email == current_user.email).first()
+    employee = (await db.execute(select(User).where(User.email == current_user.email))).scalars().first()
     if not employee:
         return []
     
     # Get shifts for this employee
-    db_shifts = db.query(DBShift).filter(DBShift.employee_id == employee.id).all()
+    db_shifts = (await db.execute(select(DBShift).where(DBShift.employee_id == employee.id))).scalars().all()
     
     # Convert SQLAlchemy models to Pydantic models for response
     shifts = []
@@ -712,7 +649,7 @@ async def get_my_shifts(
 @router.post("/bulk", response_model=List[ShiftResponse])
 async def create_bulk_shifts(
     bulk_shift: BulkShiftCreate,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user: User = Depends(require_roles(["admin", "planner"]))
 ):
     """Create multiple shifts for selected days within a date range."""
@@ -722,7 +659,7 @@ async def create_bulk_shifts(
         end_date = datetime.strptime(bulk_shift.end_date, "%Y-%m-%d").date()
         
         # Get location details
-        location = db.query(Location).filter(Location.id == bulk_shift.location_id).first()
+        location = (await db.execute(select(Location).where(Location.id == bulk_shift.location_id))).scalars().first()
         if not location:
             raise HTTPException(status_code=404, detail="Location not found")
         
@@ -761,11 +698,8 @@ async def create_bulk_shifts(
             # Move to next day
             current_date += timedelta(days=1)
         
-        db.commit()
-        
-        # Refresh all created shifts to get their IDs
-        for shift in created_shifts:
-            db.refresh(shift)
+        # IDs are assigned by the flush in commit; with expire_on_commit=False no refresh round trips are needed
+        await db.commit()
         
         # Convert to response model
         response_shifts = []
@@ -790,9 +724,6 @@ async def create_bulk_shifts(
         return response_shifts
         
     except Exception as e:
-        db.rollback()
-        print(f"Error creating bulk shifts: {str(e)}")
-        print(f"Error type: {type(e)}")
-        print(f"Error args: {e.args}")
-        print(f"Error traceback: {traceback.format_exc()}")
+        await db.rollback()
+        logger.exception("Error creating bulk shifts")
         raise HTTPException(status_code=500, detail=str(e))
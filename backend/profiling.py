@@ -0,0 +1,262 @@
+"""
+Opt-in per-request profiler.
+
+An admin adds `X-Profile: 1` (or `?profile=1`) to a request and that single
+request runs under a sampling profiler. Background sampling profiles a random
+fraction of all requests (PROFILE_SAMPLE_RATE, default 0 = off).
+
+The sampler is a thread that reads sys._current_frames() every
+PROFILE_INTERVAL_MS and keeps the stacks that run inside the matched endpoint.
+That covers async endpoints on the event loop as well as sync endpoints in the
+thread pool, which cProfile (current thread only) would miss. Time spent
+awaiting I/O in async endpoints does not show up as samples.
+
+On the event loop thread a stack only counts while the profiled request's own
+task is running, so other requests hitting the same async endpoint in the
+meantime are left out. Sync endpoints run in a pool thread the sampler cannot
+tie back to the request: concurrent calls of the same sync endpoint end up in
+one profile. Profile those on a quiet instance.
+
+Profiles are written to PROFILE_DIR as <id>.json (metadata, top functions) and
+<id>.folded (collapsed stacks for speedscope/flamegraph.pl); the id is returned
+in the X-Profile-Id response header. Retrieve them via /admin/profiles.
+
+Requests without the flag take one header lookup and, with background
+sampling off, nothing else.
+"""
+from collections import Counter
+from datetime import datetime
+from typing import List, Optional
+from urllib.parse import parse_qs
+from fastapi import APIRouter, Depends, HTTPException
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import FileResponse
+from jose import JWTError, jwt
+from auth import require_roles, get_user
+from config import SECRET_KEY, ALGORITHM
+from database import AsyncSessionLocal
+from models import User
+import token_revocation
+import asyncio
+import json
+import logging
+import os
+import random
+import re
+import sys
+import threading
+import time
+import uuid
+
+logger = logging.getLogger(__name__)
+
+router = APIRouter(
+    prefix="/admin/profiles",
+    tags=["admin"]
+)
+
+PROFILE_DIR = os.getenv("PROFILE_DIR", os.path.join(os.path.dirname(__file__), "profiles"))
+PROFILE_SAMPLE_RATE = float(os.getenv("PROFILE_SAMPLE_RATE", "0"))
+PROFILE_INTERVAL_MS = float(os.getenv("PROFILE_INTERVAL_MS", "5"))
+PROFILE_MAX_FILES = int(os.getenv("PROFILE_MAX_FILES", "200"))
+
+_PROFILE_ID = re.compile(r"^[A-Za-z0-9_-]+$")
+
+
+class _StackSampler(threading.Thread):
+    """Collects stacks below the request's endpoint function, in whichever thread it runs.
+
+    Must be created from the request's task: on the loop thread only that task is sampled.
+    """
+
+    def __init__(self, scope, interval: float):
+        super().__init__(name="request-profiler", daemon=True)
+        self.scope = scope
+        self.interval = interval
+        self.loop = asyncio.get_running_loop()
+        self.loop_thread_id = threading.get_ident()
+        self.task = asyncio.current_task()
+        self.samples: Counter = Counter()
+        self.sample_count = 0
+        self._stopped = threading.Event()
+
+    def run(self):
+        own_id = threading.get_ident()
+        while not self._stopped.wait(self.interval):
+            # The router fills in the endpoint once it has matched the request
+            endpoint = self.scope.get("endpoint")
+            code = getattr(endpoint, "__code__", None)
+            if code is None:
+                continue
+            self.sample_count += 1
+            frames = sys._current_frames()
+            running_task = asyncio.current_task(self.loop)
+            for thread_id, frame in frames.items():
+                if thread_id == own_id:
+                    continue
+                if thread_id == self.loop_thread_id and running_task is not self.task:
+                    # The loop is running another request (possibly in the same endpoint)
+                    continue
+                stack = []
+                while frame is not None:
+                    frame_code = frame.f_code
+                    stack.append(f"{frame_code.co_name} ({os.path.basename(frame_code.co_filename)}:{frame_code.co_firstlineno})")
+                    if frame_code is code:
+                        self.samples[tuple(reversed(stack))] += 1
+                        break
+                    frame = frame.f_back
+
+    def stop(self):
+        self._stopped.set()
+        self.join()
+
+
+def _top_functions(samples: Counter, limit: int = 25) -> List[dict]:
+    self_samples: Counter = Counter()
+    total_samples: Counter = Counter()
+    for stack, count in samples.items():
+        self_samples[stack[-1]] += count
+        for function in set(stack):
+            total_samples[function] += count
+    return [
+        {"function": function, "total": total, "self": self_samples.get(function, 0)}
+        for function, total in total_samples.most_common(limit)
+    ]
+
+def _write_profile(profile_id: str, meta: dict, samples: Counter) -> None:
+    os.makedirs(PROFILE_DIR, exist_ok=True)
+    with open(os.path.join(PROFILE_DIR, f"{profile_id}.folded"), "w") as f:
+        for stack, count in samples.most_common():
+            f.write(f"{';'.join(stack)} {count}\n")
+    meta["top_functions"] = _top_functions(samples)
+    with open(os.path.join(PROFILE_DIR, f"{profile_id}.json"), "w") as f:
+        json.dump(meta, f, indent=2)
+
+    # Keep the directory bounded; ids start with a timestamp, so sorting is chronological
+    metas = sorted(name for name in os.listdir(PROFILE_DIR) if name.endswith(".json"))
+    for name in metas[:-PROFILE_MAX_FILES]:
+        for extension in (".json", ".folded"):
+            try:
+                os.remove(os.path.join(PROFILE_DIR, name[:-5] + extension))
+            except FileNotFoundError:
+                pass
+
+
+async def _is_admin(authorization: Optional[str]) -> bool:
+    if not authorization or not authorization.lower().startswith("bearer "):
+        return False
+    try:
+        payload = jwt.decode(authorization[7:], SECRET_KEY, algorithms=[ALGORITHM])
+    except JWTError:
+        return False
+    username = payload.get("sub")
+    if not username or payload.get("type", "access") != "access":
+        return False
+    if token_revocation.is_revoked(payload.get("uid"), payload.get("iat")):
+        return False
+    if "roles" in payload:
+        return "admin" in payload["roles"]
+    async with AsyncSessionLocal() as db:
+        user = await get_user(db, username)
+    return user is not None and any(role.name == "admin" for role in user.roles)
+
+def _profile_requested(scope, headers: dict) -> bool:
+    if headers.get(b"x-profile") == b"1":
+        return True
+    query_string = scope.get("query_string", b"")
+    return b"profile" in query_string and parse_qs(query_string.decode()).get("profile") == ["1"]
+
+
+class RequestProfilerMiddleware:
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        headers = dict(scope["headers"])
+        trigger = None
+        if _profile_requested(scope, headers):
+            # The flag is silently ignored for anyone who is not an admin
+            if await _is_admin(headers.get(b"authorization", b"").decode("latin-1")):
+                trigger = "on-demand"
+        elif PROFILE_SAMPLE_RATE > 0 and random.random() < PROFILE_SAMPLE_RATE:
+            trigger = "background"
+
+        if trigger is None:
+            await self.app(scope, receive, send)
+            return
+
+        profile_id = f"{datetime.utcnow():%Y%m%dT%H%M%S}_{uuid.uuid4().hex[:8]}"
+        status_code = 500
+
+        async def send_wrapper(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                message.setdefault("headers", [])
+                message["headers"] = list(message["headers"]) + [(b"x-profile-id", profile_id.encode())]
+            await send(message)
+
+        sampler = _StackSampler(scope, PROFILE_INTERVAL_MS / 1000)
+        started = time.perf_counter()
+        sampler.start()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            sampler.stop()
+            route = scope.get("route")
+            meta = {
+                "id": profile_id,
+                "trigger": trigger,
+                "method": scope["method"],
+                "path": scope["path"],
+                "route": route.path if route is not None else None,
+                "endpoint": getattr(scope.get("endpoint"), "__qualname__", None),
+                "status": status_code,
+                "duration_ms": round((time.perf_counter() - started) * 1000, 1),
+                "interval_ms": PROFILE_INTERVAL_MS,
+                "samples": sampler.sample_count,
+                "created_at": datetime.utcnow().isoformat()
+            }
+            try:
+                await run_in_threadpool(_write_profile, profile_id, meta, sampler.samples)
+                logger.info(f"Stored {trigger} profile {profile_id} for {scope['method']} {scope['path']}")
+            except OSError as e:
+                logger.warning(f"Could not store profile {profile_id}: {str(e)}")
+
+
+def _profile_path(profile_id: str, extension: str) -> str:
+    if not _PROFILE_ID.match(profile_id):
+        raise HTTPException(status_code=400, detail="Ongeldig profiel-id")
+    path = os.path.join(PROFILE_DIR, profile_id + extension)
+    if not os.path.exists(path):
+        raise HTTPException(status_code=404, detail="Profiel niet gevonden")
+    return path
+
+@router.get("")
+def list_profiles(limit: int = 50, current_user: User = Depends(require_roles(["admin"]))):
+    """Meest recente profielen, nieuwste eerst (zonder de functielijst)."""
+    if not os.path.isdir(PROFILE_DIR):
+        return []
+    names = sorted((name for name in os.listdir(PROFILE_DIR) if name.endswith(".json")), reverse=True)
+    profiles = []
+    for name in names[:limit]:
+        with open(os.path.join(PROFILE_DIR, name)) as f:
+            meta = json.load(f)
+        meta.pop("top_functions", None)
+        profiles.append(meta)
+    return profiles
+
+@router.get("/{profile_id}")
+def get_profile(profile_id: str, current_user: User = Depends(require_roles(["admin"]))):
+    """Metadata en de functies met de meeste samples."""
+    with open(_profile_path(profile_id, ".json")) as f:
+        return json.load(f)
+
+@router.get("/{profile_id}/folded")
+def get_profile_stacks(profile_id: str, current_user: User = Depends(require_roles(["admin"]))):
+    """Collapsed stacks, te openen in speedscope of flamegraph.pl."""
+    return FileResponse(_profile_path(profile_id, ".folded"), media_type="text/plain", filename=f"{profile_id}.folded")
@@ -0,0 +1,75 @@
+"""
+Token-bucket rate limiting for sensitive endpoints.
+
+Each TokenBucketLimiter keeps one bucket per key (client IP, username, email).
+A bucket holds up to `capacity` tokens and regains them evenly over `period`
+seconds; every request takes one. An empty bucket means 429 with a Retry-After
+header, so a burst of legitimate logins at shift start passes while password
+guessing is slowed down to the refill rate.
+
+Limits are configured as "<capacity>/<period seconds>", e.g.
+LOGIN_RATE_LIMIT_IP=20/60. Buckets live in the process: with several API
+workers the effective limit is per worker.
+"""
+from collections import OrderedDict
+from threading import Lock
+from typing import Optional, Tuple
+from fastapi import HTTPException, Request, status
+import logging
+import math
+import os
+import time
+
+logger = logging.getLogger(__name__)
+
+# Least recently used keys are forgotten beyond this; a forgotten key starts with a full bucket
+RATE_LIMIT_MAX_KEYS = int(os.getenv("RATE_LIMIT_MAX_KEYS", "10000"))
+
+
+def _parse_rate(value: str) -> Tuple[int, float]:
+    capacity, _, period = value.partition("/")
+    return int(capacity), float(period)
+
+
+class TokenBucketLimiter:
+    def __init__(self, name: str, rate: str):
+        self.name = name
+        self.capacity, self.period = _parse_rate(rate)
+        self.refill_per_second = self.capacity / self.period
+        self._lock = Lock()
+        # key -> (tokens, last refill)
+        self._buckets: "OrderedDict[str, Tuple[float, float]]" = OrderedDict()
+
+    def acquire(self, key: str) -> Optional[float]:
+        """Take a token for `key`; None when allowed, otherwise seconds until the next token."""
+        now = time.monotonic()
+        with self._lock:
+            tokens, updated = self._buckets.pop(key, (float(self.capacity), now))
+            tokens = min(float(self.capacity), tokens + (now - updated) * self.refill_per_second)
+            allowed = tokens >= 1
+            if allowed:
+                tokens -= 1
+            self._buckets[key] = (tokens, now)
+            while len(self._buckets) > RATE_LIMIT_MAX_KEYS:
+                self._buckets.popitem(last=False)
+        if allowed:
+            return None
+        return (1 - tokens) / self.refill_per_second
+
+
+def client_ip(request: Request) -> str:
+    return request.client.host if request.client else "unknown"
+
+
+def enforce(*checks: Tuple[TokenBucketLimiter, str]) -> None:
+    """Take a token from every (limiter, key); 429 with Retry-After when one of them is empty."""
+    for limiter, key in checks:
+        retry_after = limiter.acquire(key)
+        if retry_after is not None:
+            logger.warning("Rate limit %s hit for %s", limiter.name, key)
+            seconds = max(1, math.ceil(retry_after))
+            raise HTTPException(
+                status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+                detail=f"Te veel pogingen, probeer het over {seconds} seconden opnieuw",
+                headers={"Retry-After": str(seconds)}
+            )
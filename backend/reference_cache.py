@@ -0,0 +1,113 @@
+"""
+In-process cache and HTTP revalidation for reference data.
+
+Locations, opdrachtgevers, location rates, tarieven and roles change rarely but
+are fetched on every page load. Their list endpoints go through cached_response /
+cached_response_async:
+
+- The serialized body is kept per (datasets, key) together with the version
+  counters of the datasets it was built from. Every write calls bump(dataset),
+  which makes those entries stale for the next reader in this process.
+- Every response carries an ETag (hash of the body) and Cache-Control: private,
+  no-cache. The browser revalidates with If-None-Match and gets a 304 straight
+  from the cache, without a query.
+
+Writes from other processes (a second API worker, seed scripts) are not seen by
+the version counters; entries therefore also expire after REFERENCE_CACHE_TTL
+seconds (default 60). Because the ETag is derived from the content, a client
+holding an older copy still gets a 304 whenever the data did not change.
+"""
+from collections import OrderedDict
+from threading import Lock
+from typing import Any, Awaitable, Callable, Dict, Hashable, Tuple
+from fastapi import Request, Response
+from fast_json import FastJSONResponse
+import hashlib
+import os
+import time
+
+REFERENCE_CACHE_TTL = float(os.getenv("REFERENCE_CACHE_TTL", "60"))
+REFERENCE_CACHE_MAX_ENTRIES = int(os.getenv("REFERENCE_CACHE_MAX_ENTRIES", "256"))
+
+CACHE_CONTROL = "private, no-cache"
+
+_lock = Lock()
+_versions: Dict[str, int] = {}
+# (datasets, key) -> (versions at load time, expires at, body, etag)
+_entries: "OrderedDict[Tuple[Tuple[str, ...], Hashable], Tuple[Tuple[int, ...], float, bytes, str]]" = OrderedDict()
+
+
+def bump(*datasets: str) -> None:
+    """Call after committing a write to one of these datasets."""
+    with _lock:
+        for dataset in datasets:
+            _versions[dataset] = _versions.get(dataset, 0) + 1
+
+def version(dataset: str) -> int:
+    """Current write version of `dataset`, for other per-process caches keyed on it."""
+    return _versions.get(dataset, 0)
+
+def _current_versions(datasets: Tuple[str, ...]) -> Tuple[int, ...]:
+    return tuple(_versions.get(dataset, 0) for dataset in datasets)
+
+
+def _etag(body: bytes) -> str:
+    return f'W/"{hashlib.blake2b(body, digest_size=16).hexdigest()}"'
+
+def _matches(request: Request, etag: str) -> bool:
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    candidates = [candidate.strip() for candidate in header.split(",")]
+    # Weak comparison (RFC 7232): W/ prefixes are ignored
+    bare = etag[2:] if etag.startswith("W/") else etag
+    return any(candidate == "*" or candidate == etag or candidate == bare or candidate == "W/" + bare
+               for candidate in candidates)
+
+def _response(request: Request, body: bytes, etag: str) -> Response:
+    headers = {"ETag": etag, "Cache-Control": CACHE_CONTROL}
+    if _matches(request, etag):
+        return Response(status_code=304, headers=headers)
+    return Response(content=body, media_type="application/json", headers=headers)
+
+
+def _lookup(request: Request, datasets: Tuple[str, ...], key: Hashable):
+    """(response from cache or None, versions to store a fresh load under)."""
+    with _lock:
+        versions = _current_versions(datasets)
+        entry = _entries.get((datasets, key))
+        if entry is not None:
+            entry_versions, expires_at, body, etag = entry
+            if entry_versions == versions and expires_at > time.monotonic():
+                _entries.move_to_end((datasets, key))
+                return _response(request, body, etag), versions
+    return None, versions
+
+def _store(request: Request, datasets: Tuple[str, ...], key: Hashable, versions: Tuple[int, ...], content: Any) -> Response:
+    body = FastJSONResponse(content).body
+    etag = _etag(body)
+    with _lock:
+        # Versions were read before loading: a write that raced the load leaves this entry stale
+        _entries[(datasets, key)] = (versions, time.monotonic() + REFERENCE_CACHE_TTL, body, etag)
+        _entries.move_to_end((datasets, key))
+        while len(_entries) > REFERENCE_CACHE_MAX_ENTRIES:
+            _entries.popitem(last=False)
+    return _response(request, body, etag)
+
+
+def cached_response(request: Request, datasets: Tuple[str, ...], load: Callable[[], Any], key: Hashable = ()) -> Response:
+    """
+    Serve `load()` (JSON-serializable content) from the cache of `datasets`, or load and
+    cache it. `key` tells apart variants of the same list (filters, paging).
+    """
+    response, versions = _lookup(request, datasets, key)
+    if response is not None:
+        return response
+    return _store(request, datasets, key, versions, load())
+
+async def cached_response_async(request: Request, datasets: Tuple[str, ...], load: Callable[[], Awaitable[Any]], key: Hashable = ()) -> Response:
+    """cached_response for async endpoints; `load` is a coroutine function."""
+    response, versions = _lookup(request, datasets, key)
+    if response is not None:
+        return response
+    return _store(request, datasets, key, versions, await load())
@@ -1,37 +1,20 @@
-from apscheduler.schedulers.background import BackgroundScheduler
 from datetime import datetime, date, timedelta
 from models import Factuur, Opdrachtgever, Shift
 from planning import fake_shifts_db
-from betalingsherinneringen import send_payment_reminders
-from tarieven import fake_tarieven_db
-import holidays
 import io
 from email_config import EMAIL_CONFIG, send_invoice_email
 from fastapi import APIRouter, HTTPException
 from fastapi.responses import StreamingResponse
-from reportlab.lib.pagesizes import A4
-from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Table, TableStyle
-from reportlab.lib.styles import getSampleStyleSheet
-from reportlab.lib import colors
 from invoice_payroll import generate_invoice
 from database import get_db
+from job_telemetry import tracked_job, job_stats
 import logging
-import sys
 from typing import List, Dict, Optional
 from sqlalchemy.orm import Session
 from sqlalchemy import and_, or_
-from apscheduler.triggers.cron import CronTrigger
 import os
 from dotenv import load_dotenv
 
-# Configure logging to display in console with timestamp
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(levelname)s - %(message)s',
-    handlers=[
-        logging.StreamHandler(sys.stdout)
-    ]
-)
 logger = logging.getLogger(__name__)
 
 # Load environment variables
@@ -40,9 +23,6 @@ load_dotenv()
 # BTW-percentage
 VAT_PERCENTAGE = 0.21
 
-# Gebruik python-holidays voor Nederland voor meerdere jaren
-nl_holidays = holidays.Netherlands(years=[2025, 2026, 2027])
-
 
 def calculate_shift_hours(start_time, end_time):
     def minutes(t):
@@ -161,8 +141,10 @@ def generate_invoices():
     logger.info(f"{datetime.now()} - Finished generating invoices.")
 
 
+@tracked_job("generate_weekly_payroll_invoices")
 def generate_weekly_invoices():
     """Generate invoices for all opdrachtgevers for the previous week."""
+    stats = job_stats()
     logger.info("Starting weekly invoice generation...")
     
     # Calculate date range (previous week)
@@ -174,22 +156,26 @@ def generate_weekly_invoices():
     try:
         # Get all opdrachtgevers
         opdrachtgevers = db.query(Opdrachtgever).all()
+        stats.rows_scanned += len(opdrachtgevers)
         
         for opdrachtgever in opdrachtgevers:
             try:
                 # Generate invoice for the previous week
                 invoice = generate_invoice(db, opdrachtgever.id, last_monday, last_sunday)
                 if invoice:
+                    stats.invoices_created += 1
                     logger.info(f"Generated invoice {invoice.factuurnummer} for opdrachtgever {opdrachtgever.id}")
                 else:
                     logger.warning(f"No invoice generated for opdrachtgever {opdrachtgever.id} - no shifts found")
             except Exception as e:
                 logger.error(f"Error generating invoice for opdrachtgever {opdrachtgever.id}: {str(e)}")
+                stats.record_error(e)
                 continue
         
         db.commit()
     except Exception as e:
         logger.error(f"Error in weekly invoice generation: {str(e)}")
+        stats.record_error(e)
         db.rollback()
     finally:
         db.close()
@@ -199,6 +185,10 @@ def generate_weekly_invoices():
 
 def create_invoice_pdf(invoice: Factuur) -> bytes:
     """Create a PDF version of the invoice."""
+    from reportlab.lib.pagesizes import A4
+    from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Table, TableStyle
+    from reportlab.lib.styles import getSampleStyleSheet
+
     buffer = io.BytesIO()
     doc = SimpleDocTemplate(buffer, pagesize=A4)
     styles = getSampleStyleSheet()
@@ -243,58 +233,40 @@ def create_invoice_pdf(invoice: Factuur) -> bytes:
     buffer.seek(0)
     return buffer.getvalue()
 
+@tracked_job("process_invoices", skip_idle=True)
 def process_invoices():
     """Process all open invoices and update their status."""
+    stats = job_stats()
     logger.info("Starting invoice processing...")
     
     db = next(get_db())
     try:
         # Get all open invoices
         open_invoices = db.query(Factuur).filter(Factuur.status == 'open').all()
+        stats.rows_scanned += len(open_invoices)
         
         for invoice in open_invoices:
             try:
                 # Only update status if needed
                 if invoice.status != 'open':
                     invoice.status = 'open'
+                    stats.rows_written += 1
                     logger.info(f"Updated status for invoice {invoice.id}")
             
             except Exception as e:
                 logger.error(f"Error processing invoice {invoice.id}: {str(e)}")
+                stats.record_error(e)
         
         db.commit()
         logger.info("Invoice processing completed")
     
     except Exception as e:
         logger.error(f"Error in process_invoices: {str(e)}")
+        stats.record_error(e)
         db.rollback()
     finally:
         db.close()
 
-# Initialize scheduler with timezone
-scheduler = BackgroundScheduler(timezone='Europe/Amsterdam')
-
-# Add jobs with updated interval
-scheduler.add_job(process_invoices, 'interval', seconds=10)
-scheduler.add_job(send_payment_reminders, 'cron', hour=9, minute=0)
-scheduler.add_job(
-    generate_weekly_invoices,
-    'cron',
-    day_of_week='mon',
-    hour=9,
-    minute=0,
-    id='weekly_invoice_generation'
-)
-
-# Start scheduler
-scheduler.start()
-print(f"\n{'='*50}")
-print("🚀 Scheduler started")
-print("📧 Invoice processing will run every 10 seconds")
-print("📊 Weekly invoice generation will run every Monday at 9:00 AM")
-print(f"{'='*50}\n")
-logger.info("Scheduler started - Invoice processing and weekly generation configured")
-
 # PDF Export Router
 pdf_export_router = APIRouter(
     prefix="/pdf-export",
@@ -302,8 +274,12 @@ pdf_export_router = APIRouter(
 )
 
 @pdf_export_router.get("/facturen")
-async def export_facturen_pdf():
+def export_facturen_pdf():
     """Export all invoices as PDF."""
+    from reportlab.lib.pagesizes import A4
+    from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer
+    from reportlab.lib.styles import getSampleStyleSheet
+
     db = next(get_db())
     try:
         facturen = db.query(Factuur).all()
@@ -0,0 +1,134 @@
+from datetime import datetime, timedelta
+from typing import List, Optional
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+from job_telemetry import job_stats, tracked_job
+from models import Shift as DBShift, Dienstaanvraag as DBDienstaanvraag
+import logging
+import os
+
+logger = logging.getLogger(__name__)
+
+# Statuses that still compete for a shift
+PENDING_REQUEST_STATUSES = ["requested"]
+
+# Auto-approvable requests for a shift are held this long after the first one arrives; then the
+# shift goes to the strongest claim (lowest claim_priority, see auto_approval.PRIORITY_*), earliest
+# first among equals. 0 means first come, first served: the first claim is approved immediately.
+CLAIM_WINDOW_SECONDS = int(os.getenv("CLAIM_WINDOW_SECONDS", "0"))
+
+
+def claim_shift(db: Session, shift_id: int, username: str, new_status: str = "assigned") -> bool:
+    """
+    Wijs een open shift atomair toe aan een medewerker.
+
+    Eén conditionele UPDATE (WHERE medewerker_id IS NULL AND status = 'open'): de database
+    serialiseert gelijktijdige claims op de rij, dus precies één aanvrager wint.
+    Geeft True terug als deze aanroep de shift heeft gekregen. Commit wordt aan de aanroeper overgelaten.
+    """
+    claimed = db.query(DBShift).filter(
+        DBShift.id == shift_id,
+        DBShift.medewerker_id.is_(None),
+        DBShift.status == "open"
+    ).update(
+        {DBShift.medewerker_id: username, DBShift.status: new_status},
+        synchronize_session=False
+    )
+    if claimed != 1:
+        logger.info("Claim on shift %s by %s lost: shift no longer open", shift_id, username)
+    return claimed == 1
+
+
+def approve_request(db: Session, aanvraag_id: int) -> bool:
+    """Zet een aanvraag conditioneel op 'approved'; False als een andere planner al heeft beslist."""
+    updated = db.query(DBDienstaanvraag).filter(
+        DBDienstaanvraag.id == aanvraag_id,
+        DBDienstaanvraag.status.in_(PENDING_REQUEST_STATUSES)
+    ).update({DBDienstaanvraag.status: "approved"}, synchronize_session=False)
+    return updated == 1
+
+
+def reject_competing_requests(db: Session, shift_id: int, winner_request_id: int = None) -> int:
+    """Wijs alle overige openstaande aanvragen voor de shift af in één set-based UPDATE."""
+    query = db.query(DBDienstaanvraag).filter(
+        DBDienstaanvraag.shift_id == shift_id,
+        DBDienstaanvraag.status.in_(PENDING_REQUEST_STATUSES)
+    )
+    if winner_request_id is not None:
+        query = query.filter(DBDienstaanvraag.id != winner_request_id)
+    rejected = query.update({DBDienstaanvraag.status: "rejected"}, synchronize_session=False)
+    if rejected:
+        logger.info("Rejected %s competing requests for shift %s", rejected, shift_id)
+    return rejected
+
+
+def settle_claim_window(db: Session, shift_id: int, now: Optional[datetime] = None) -> Optional[int]:
+    """
+    Wijs de shift toe aan de sterkste claim als het claimvenster van de shift verstreken is.
+
+    Geeft het id van de goedgekeurde aanvraag terug, of None als het venster nog loopt of er
+    niets te beslissen valt. Commit zelf: elke shift is een eigen transactie.
+    """
+    held = db.query(DBDienstaanvraag.id, DBDienstaanvraag.employee_id, DBDienstaanvraag.requested_at).filter(
+        DBDienstaanvraag.shift_id == shift_id,
+        DBDienstaanvraag.claim_priority.isnot(None),
+        DBDienstaanvraag.status.in_(PENDING_REQUEST_STATUSES)
+    ).order_by(
+        DBDienstaanvraag.claim_priority, DBDienstaanvraag.requested_at, DBDienstaanvraag.id
+    ).all()
+    if not held:
+        return None
+    opened_at = min(row.requested_at or datetime.min for row in held)
+    if opened_at + timedelta(seconds=CLAIM_WINDOW_SECONDS) > (now or datetime.utcnow()):
+        return None
+
+    winner = held[0]
+    claimed = claim_shift(db, shift_id, winner.employee_id)
+    if claimed and approve_request(db, winner.id):
+        reject_competing_requests(db, shift_id, winner.id)
+        db.commit()
+        logger.info("Claim window of shift %s awarded to request %s (%s held)", shift_id, winner.id, len(held))
+        return winner.id
+    db.rollback()
+    if not claimed:
+        # Assigned in the meantime, e.g. by a planner: what is left are ordinary requests for the planner
+        db.query(DBDienstaanvraag).filter(
+            DBDienstaanvraag.id.in_([row.id for row in held]),
+            DBDienstaanvraag.status.in_(PENDING_REQUEST_STATUSES)
+        ).update({DBDienstaanvraag.claim_priority: None}, synchronize_session=False)
+        db.commit()
+    # Otherwise the winner withdrew between the read and the update; the next run picks the next claim
+    return None
+
+
+def due_claim_windows(db: Session, now: Optional[datetime] = None) -> List[int]:
+    """Shifts whose claim window has closed, in one grouped query over the held claims."""
+    cutoff = (now or datetime.utcnow()) - timedelta(seconds=CLAIM_WINDOW_SECONDS)
+    rows = db.query(DBDienstaanvraag.shift_id).filter(
+        DBDienstaanvraag.claim_priority.isnot(None),
+        DBDienstaanvraag.status.in_(PENDING_REQUEST_STATUSES)
+    ).group_by(DBDienstaanvraag.shift_id).having(func.min(DBDienstaanvraag.requested_at) <= cutoff).all()
+    return [row.shift_id for row in rows]
+
+
+@tracked_job("claim_windows", skip_idle=True)
+def run_claim_window_job() -> None:
+    """Entry point for the scheduler: award every shift whose claim window has closed."""
+    if CLAIM_WINDOW_SECONDS <= 0:
+        return
+    from database import SessionLocal
+
+    db = SessionLocal()
+    try:
+        shift_ids = due_claim_windows(db)
+        job_stats().rows_scanned += len(shift_ids)
+        for shift_id in shift_ids:
+            try:
+                if settle_claim_window(db, shift_id) is not None:
+                    job_stats().rows_written += 1
+            except Exception as e:
+                logger.error("Settling the claim window of shift %s failed: %s", shift_id, e, exc_info=True)
+                job_stats().record_error(e)
+                db.rollback()
+    finally:
+        db.close()
@@ -0,0 +1,182 @@
+"""
+Automatische statusovergangen voor shifts.
+
+Goedgekeurde/toegewezen shifts waarvan de eindtijd verstreken is gaan per batch in één
+set-based UPDATE naar 'completed'. Per batch wordt een auditregel geschreven en worden de
+downstream hooks (ervaringstellers, factuur-markering) in bulk aangeroepen.
+De job is idempotent: een tweede run vindt dezelfde shifts niet meer terug.
+
+    python shift_lifecycle.py
+"""
+from datetime import datetime, timedelta
+from typing import Callable, List, Optional
+from sqlalchemy.orm import Session
+from models import Shift as DBShift, Location, ShiftLifecycleAudit, InvoiceDirtyPeriod
+from location_experience import record_completed_shifts
+from job_telemetry import tracked_job, job_stats
+import logging
+
+logger = logging.getLogger(__name__)
+
+# 'assigned' is the status a shift gets when it is claimed through auto-approval
+COMPLETABLE_STATUSES = ["approved", "assigned"]
+COMPLETED_STATUS = "completed"
+BATCH_SIZE = 500
+
+# Hooks receive (db, rows) for every committed batch; rows expose
+# id, medewerker_id, location_id, opdrachtgever_id, datum
+CompletionHook = Callable[[Session, List], None]
+_completion_hooks: List[CompletionHook] = []
+
+
+def register_completion_hook(hook: CompletionHook) -> CompletionHook:
+    """Registreer een functie die per batch voltooide shifts wordt aangeroepen (binnen dezelfde transactie)."""
+    _completion_hooks.append(hook)
+    return hook
+
+
+def _shift_end(row) -> Optional[datetime]:
+    try:
+        start = datetime.strptime(row.start_tijd, "%H:%M").time()
+        end = datetime.strptime(row.eind_tijd, "%H:%M").time()
+    except (TypeError, ValueError):
+        return None
+    end_at = datetime.combine(row.datum, end)
+    if end <= start:
+        end_at += timedelta(days=1)  # Dienst over middernacht
+    return end_at
+
+
+@register_completion_hook
+def _update_experience(db: Session, rows: List) -> None:
+    record_completed_shifts(db, ((row.medewerker_id, row.location_id, row.datum) for row in rows))
+
+
+@register_completion_hook
+def _mark_invoice_periods(db: Session, rows: List) -> None:
+    """Markeer (opdrachtgever, week) als te factureren; bestaande markeringen blijven staan."""
+    periods = {
+        (row.opdrachtgever_id, row.datum - timedelta(days=row.datum.weekday()))
+        for row in rows
+        if row.opdrachtgever_id is not None
+    }
+    if not periods:
+        return
+    prefix = "IGNORE" if db.get_bind().dialect.name == "mysql" else "OR IGNORE"
+    db.execute(
+        InvoiceDirtyPeriod.__table__.insert().prefix_with(prefix),
+        [
+            {"opdrachtgever_id": client_id, "period_start": period_start, "marked_at": datetime.utcnow()}
+            for client_id, period_start in periods
+        ]
+    )
+
+
+def complete_finished_shifts(db: Session, now: Optional[datetime] = None, batch_size: int = BATCH_SIZE) -> int:
+    """
+    Zet alle shifts met een verstreken eindtijd op 'completed'. Geeft het aantal gewijzigde shifts terug.
+
+    Kandidaten komen uit de index (status, datum) met datum <= vandaag; shifts van vandaag of
+    nachtdiensten die nog niet voorbij zijn worden overgeslagen en bij een volgende run opnieuw bekeken.
+    Per batch: rijen vergrendelen, één UPDATE, auditregel, hooks, commit.
+    """
+    now = now or datetime.now()
+    stats = job_stats()
+    total = 0
+    cursor = None  # (datum, id) of the last candidate seen; skipped rows are never re-read in this run
+
+    while True:
+        query = db.query(
+            DBShift.id,
+            DBShift.medewerker_id,
+            DBShift.location_id,
+            DBShift.datum,
+            DBShift.start_tijd,
+            DBShift.eind_tijd,
+            Location.opdrachtgever_id
+        ).outerjoin(
+            Location, Location.id == DBShift.location_id
+        ).filter(
+            DBShift.status.in_(COMPLETABLE_STATUSES),
+            DBShift.datum <= now.date()
+        )
+        if cursor:
+            query = query.filter(
+                (DBShift.datum > cursor[0]) | ((DBShift.datum == cursor[0]) & (DBShift.id > cursor[1]))
+            )
+        candidates = query.order_by(DBShift.datum, DBShift.id).limit(batch_size).with_for_update(
+            of=DBShift, skip_locked=True
+        ).all()
+        if not candidates:
+            break
+        cursor = (candidates[-1].datum, candidates[-1].id)
+        stats.rows_scanned += len(candidates)
+
+        finished = []
+        for row in candidates:
+            end_at = _shift_end(row)
+            if end_at is None:
+                logger.warning("Shift %s has invalid times, not completing automatically", row.id)
+            elif end_at <= now:
+                finished.append(row)
+
+        if finished:
+            ids = [row.id for row in finished]
+            # Also the change version; doubles as the mark of this batch's UPDATE
+            marker = datetime.utcnow().replace(microsecond=0)
+            updated = db.query(DBShift).filter(
+                DBShift.id.in_(ids),
+                DBShift.status.in_(COMPLETABLE_STATUSES)
+            ).update({DBShift.status: COMPLETED_STATUS, DBShift.updated_at: marker}, synchronize_session=False)
+            if updated != len(finished):
+                # A shift changed between the read and the UPDATE (backends without row locks):
+                # audit and hooks get only the shifts this UPDATE completed
+                transitioned = {row.id for row in db.query(DBShift.id).filter(
+                    DBShift.id.in_(ids),
+                    DBShift.status == COMPLETED_STATUS,
+                    DBShift.updated_at == marker
+                )}
+                finished = [row for row in finished if row.id in transitioned]
+                ids = [row.id for row in finished]
+
+            db.add(ShiftLifecycleAudit(
+                from_statuses=",".join(COMPLETABLE_STATUSES),
+                to_status=COMPLETED_STATUS,
+                cutoff=now,
+                shift_count=updated,
+                shift_ids=ids
+            ))
+            for hook in _completion_hooks:
+                hook(db, finished)
+            total += updated
+            stats.rows_written += updated
+        db.commit()
+
+        if len(candidates) < batch_size:
+            break
+
+    if total:
+        logger.info("Completed %s finished shifts (cutoff %s)", total, now.isoformat(timespec="minutes"))
+    return total
+
+
+@tracked_job("shift_lifecycle", skip_idle=True)
+def run_lifecycle_job() -> None:
+    """Entry point for the scheduler: eigen sessie, fouten worden gelogd in plaats van de scheduler te stoppen."""
+    from database import SessionLocal
+
+    db = SessionLocal()
+    try:
+        complete_finished_shifts(db)
+    except Exception as e:
+        logger.error(f"Error in shift lifecycle job: {str(e)}", exc_info=True)
+        job_stats().record_error(e)
+        db.rollback()
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    from logging_config import configure_logging
+    configure_logging()
+    run_lifecycle_job()
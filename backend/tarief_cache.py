@@ -0,0 +1,108 @@
+"""
+Per-process snapshot of the tarieven table.
+
+The tarieven list endpoint and payroll generation both read rates through
+tarief_snapshot(db); single rates are read by primary key. The whole table is small, so it is loaded in one query
+and indexed in memory.
+
+Every write through the router bumps the "tarieven" row of reference_versions
+in its own transaction (bump_tarieven_version). tarief_snapshot reads that row,
+one primary-key lookup, and reloads when it changed, so a rate written by
+another API worker or the job worker is used by the next payroll run. Writes
+that bypass the router (SQL by hand) are picked up after REFERENCE_CACHE_TTL
+seconds.
+"""
+from threading import Lock
+from typing import Dict, List, NamedTuple, Optional, Tuple
+from sqlalchemy import select, update
+from sqlalchemy.orm import Session
+from models import ReferenceVersion, Tarief
+import reference_cache
+import time
+
+
+class TariefRow(NamedTuple):
+    id: int
+    opdrachtgever_id: Optional[int]
+    locatie: Optional[str]
+    pas_type: Optional[str]
+    bedrag: Optional[float]
+
+
+def _normalize(value: Optional[str]) -> Optional[str]:
+    # The MySQL collation compares case-insensitively; lookups here do the same
+    return value.lower() if value else None
+
+
+class TariefSnapshot:
+    def __init__(self, rows: List[TariefRow]):
+        self.rows = sorted(rows, key=lambda row: row.id)
+        self.by_client: Dict[Optional[int], List[TariefRow]] = {}
+        self._by_key: Dict[Tuple[Optional[int], Optional[str], Optional[str]], TariefRow] = {}
+        # (locatie, pas_type) -> lowest id over all clients
+        self._by_location_pass: Dict[Tuple[Optional[str], Optional[str]], TariefRow] = {}
+        for row in self.rows:
+            self.by_client.setdefault(row.opdrachtgever_id, []).append(row)
+            key = (_normalize(row.locatie), _normalize(row.pas_type))
+            self._by_key.setdefault((row.opdrachtgever_id,) + key, row)
+            self._by_location_pass.setdefault(key, row)
+
+    def find(self, opdrachtgever_id: Optional[int] = None, locatie: Optional[str] = None,
+             pas_type: Optional[str] = None) -> List[TariefRow]:
+        """Rows matching every given filter, in id order."""
+        rows = self.rows if opdrachtgever_id is None else self.by_client.get(opdrachtgever_id, [])
+        if locatie:
+            rows = [row for row in rows if _normalize(row.locatie) == locatie.lower()]
+        if pas_type:
+            rows = [row for row in rows if _normalize(row.pas_type) == pas_type.lower()]
+        return rows
+
+    def rate(self, locatie: Optional[str], pas_type: Optional[str], opdrachtgever_id: Optional[int] = None) -> Optional[float]:
+        """
+        Hourly rate for a shift: the client's rate for the location, else the client-wide rate,
+        else the rate any client has for this location and pass. None when nothing matches.
+        """
+        key = (_normalize(locatie), _normalize(pas_type))
+        row = None
+        if opdrachtgever_id is not None:
+            row = self._by_key.get((opdrachtgever_id,) + key) or self._by_key.get((opdrachtgever_id, None, key[1]))
+        if row is None:
+            row = self._by_location_pass.get(key)
+        return row.bedrag if row is not None else None
+
+
+_lock = Lock()
+# (tarieven version, expires at, snapshot)
+_cached: Optional[Tuple[int, float, TariefSnapshot]] = None
+
+def _tarieven_version(db: Session) -> int:
+    return db.execute(
+        select(ReferenceVersion.version).where(ReferenceVersion.dataset == "tarieven")
+    ).scalar() or 0
+
+def bump_tarieven_version(db: Session) -> None:
+    """Mark tarieven changed for every process; call in the writing transaction, before the commit."""
+    updated = db.execute(
+        update(ReferenceVersion).where(ReferenceVersion.dataset == "tarieven")
+        .values(version=ReferenceVersion.version + 1)
+    ).rowcount
+    if not updated:
+        db.add(ReferenceVersion(dataset="tarieven", version=1))
+
+def tarief_snapshot(db: Session) -> TariefSnapshot:
+    global _cached
+    version = _tarieven_version(db)
+    cached = _cached
+    if cached is not None and cached[0] == version and cached[1] > time.monotonic():
+        return cached[2]
+    with _lock:
+        cached = _cached
+        if cached is not None and cached[0] == version and cached[1] > time.monotonic():
+            return cached[2]
+        rows = db.execute(select(
+            Tarief.id, Tarief.opdrachtgever_id, Tarief.locatie, Tarief.pas_type, Tarief.bedrag
+        )).all()
+        snapshot = TariefSnapshot([TariefRow(*row) for row in rows])
+        # Version read before the load: a write that raced it leaves this snapshot stale
+        _cached = (version, time.monotonic() + reference_cache.REFERENCE_CACHE_TTL, snapshot)
+        return snapshot
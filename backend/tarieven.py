@@ -1,7 +1,13 @@
-from fastapi import APIRouter, HTTPException, Depends, Query
+from fastapi import APIRouter, HTTPException, Depends, Query, Request
 from pydantic import BaseModel
 from typing import List, Optional
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
 from auth import require_roles
+from database import get_db
+from models import Tarief as DBTarief, Opdrachtgever
+from tarief_cache import bump_tarieven_version, tarief_snapshot
+import reference_cache
 
 router = APIRouter(
     prefix="/tarieven",
@@ -15,52 +21,94 @@ class Tarief(BaseModel):
     pas_type: str  # Bijvoorbeeld "Grijze pas", "Blauwe pas (Horeca)", etc.
     hourly_rate: float  # Het uurtarief voor dit pas-type
 
-fake_tarieven_db: List[dict] = []
-next_tarief_id = 1
+def _to_response(row) -> dict:
+    return {
+        "id": row.id,
+        "opdrachtgever_id": row.opdrachtgever_id,
+        "location": row.locatie,
+        "pas_type": row.pas_type,
+        "hourly_rate": row.bedrag
+    }
+
+def _check_unique(db: Session, tarief: Tarief, tarief_id: Optional[int] = None) -> None:
+    """409 when the client already has a rate for this location and pass. The unique index
+    catches races, but treats locatie NULL as distinct, so client-wide rates are checked here."""
+    if db.get(Opdrachtgever, tarief.opdrachtgever_id) is None:
+        raise HTTPException(status_code=404, detail="Opdrachtgever niet gevonden")
+    query = db.query(DBTarief.id).filter(
+        DBTarief.opdrachtgever_id == tarief.opdrachtgever_id,
+        DBTarief.locatie == tarief.location if tarief.location else DBTarief.locatie.is_(None),
+        DBTarief.pas_type == tarief.pas_type
+    )
+    if tarief_id is not None:
+        query = query.filter(DBTarief.id != tarief_id)
+    if query.first() is not None:
+        raise HTTPException(status_code=409, detail="Er bestaat al een tarief voor deze opdrachtgever, locatie en pas")
+
+def _commit(db: Session) -> None:
+    bump_tarieven_version(db)
+    try:
+        db.commit()
+    except IntegrityError:
+        db.rollback()
+        raise HTTPException(status_code=409, detail="Er bestaat al een tarief voor deze opdrachtgever, locatie en pas")
+    reference_cache.bump("tarieven")
 
 @router.get("/", response_model=List[Tarief])
-async def get_tarieven(
+def get_tarieven(
+    request: Request,
     opdrachtgever_id: Optional[int] = Query(None),
     location: Optional[str] = Query(None),
     pas_type: Optional[str] = Query(None),
-    current_user: dict = Depends(require_roles(["admin", "boekhouding"]))
+    current_user: dict = Depends(require_roles(["admin", "boekhouding"])),
+    db: Session = Depends(get_db)
 ):
-    tarieven = fake_tarieven_db
-    if opdrachtgever_id is not None:
-        tarieven = [t for t in tarieven if t.get("opdrachtgever_id") == opdrachtgever_id]
-    if location:
-        tarieven = [t for t in tarieven if t.get("location", "").lower() == location.lower()]
-    if pas_type:
-        tarieven = [t for t in tarieven if t.get("pas_type", "").lower() == pas_type.lower()]
-    return tarieven
+    def load():
+        return [_to_response(row) for row in tarief_snapshot(db).find(opdrachtgever_id, location, pas_type)]
+
+    key = (opdrachtgever_id, (location or "").lower(), (pas_type or "").lower())
+    return reference_cache.cached_response(request, ("tarieven",), load, key=key)
 
 @router.get("/{tarief_id}", response_model=Tarief)
-async def get_tarief(tarief_id: int, current_user: dict = Depends(require_roles(["admin", "boekhouding"]))):
-    for tarief in fake_tarieven_db:
-        if tarief["id"] == tarief_id:
-            return tarief
-    raise HTTPException(status_code=404, detail="Tarief niet gevonden")
+def get_tarief(tarief_id: int, current_user: dict = Depends(require_roles(["admin", "boekhouding"])), db: Session = Depends(get_db)):
+    # Primary-key lookup, not the snapshot: a rate just created on another worker must be found
+    db_tarief = db.get(DBTarief, tarief_id)
+    if db_tarief is None:
+        raise HTTPException(status_code=404, detail="Tarief niet gevonden")
+    return _to_response(db_tarief)
 
 @router.post("/", response_model=Tarief, status_code=201)
-async def create_tarief(tarief: Tarief, current_user: dict = Depends(require_roles(["admin", "boekhouding"]))):
-    global next_tarief_id
-    tarief.id = next_tarief_id
-    next_tarief_id += 1
-    fake_tarieven_db.append(tarief.dict())
-    return tarief
+def create_tarief(tarief: Tarief, current_user: dict = Depends(require_roles(["admin", "boekhouding"])), db: Session = Depends(get_db)):
+    _check_unique(db, tarief)
+    db_tarief = DBTarief(
+        opdrachtgever_id=tarief.opdrachtgever_id,
+        locatie=tarief.location or None,
+        pas_type=tarief.pas_type,
+        bedrag=tarief.hourly_rate
+    )
+    db.add(db_tarief)
+    _commit(db)
+    return _to_response(db_tarief)
 
 @router.put("/{tarief_id}", response_model=Tarief)
-async def update_tarief(tarief_id: int, tarief: Tarief, current_user: dict = Depends(require_roles(["admin", "boekhouding"]))):
-    for index, existing in enumerate(fake_tarieven_db):
-        if existing["id"] == tarief_id:
-            tarief.id = tarief_id
-            fake_tarieven_db[index] = tarief.dict()
-            return tarief
-    raise HTTPException(status_code=404, detail="Tarief niet gevonden")
+def update_tarief(tarief_id: int, tarief: Tarief, current_user: dict = Depends(require_roles(["admin", "boekhouding"])), db: Session = Depends(get_db)):
+    db_tarief = db.get(DBTarief, tarief_id)
+    if db_tarief is None:
+        raise HTTPException(status_code=404, detail="Tarief niet gevonden")
+    _check_unique(db, tarief, tarief_id)
+    db_tarief.opdrachtgever_id = tarief.opdrachtgever_id
+    db_tarief.locatie = tarief.location or None
+    db_tarief.pas_type = tarief.pas_type
+    db_tarief.bedrag = tarief.hourly_rate
+    _commit(db)
+    return _to_response(db_tarief)
 
 @router.delete("/{tarief_id}", response_model=Tarief)
-async def delete_tarief(tarief_id: int, current_user: dict = Depends(require_roles(["admin", "boekhouding"]))):
-    for index, tarief in enumerate(fake_tarieven_db):
-        if tarief["id"] == tarief_id:
-            return fake_tarieven_db.pop(index)
-    raise HTTPException(status_code=404, detail="Tarief niet gevonden")
+def delete_tarief(tarief_id: int, current_user: dict = Depends(require_roles(["admin", "boekhouding"])), db: Session = Depends(get_db)):
+    db_tarief = db.get(DBTarief, tarief_id)
+    if db_tarief is None:
+        raise HTTPException(status_code=404, detail="Tarief niet gevonden")
+    removed = _to_response(db_tarief)
+    db.delete(db_tarief)
+    _commit(db)
+    return removed
@@ -1,14 +1,21 @@
-from fastapi import APIRouter, HTTPException, Depends
+from fastapi import APIRouter, HTTPException, Depends, Query
 from pydantic import BaseModel
-from typing import List
+from typing import List, Optional
 from datetime import datetime
-from auth import get_current_user
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from auth import TokenUser, get_token_user
+from database import get_async_db
+from models import Notitie
 
 router = APIRouter(
     prefix="/tijdlijn",
     tags=["tijdlijn"]
 )
 
+NOTES_PAGE_SIZE = 50
+NOTES_MAX_PAGE_SIZE = 200
+
 class Note(BaseModel):
     id: int = 0  # Wordt automatisch ingesteld bij creatie
     associated_type: str  # 'opdrachtgever' of 'medewerker'
@@ -16,52 +23,91 @@ class Note(BaseModel):
     content: str
     timestamp: datetime = None
 
-# Simuleer een database met een lijst van notities
-fake_notes_db = []
-next_note_id = 1
+def _to_note(notitie: Notitie) -> dict:
+    return {
+        "id": notitie.id,
+        "associated_type": notitie.associated_type,
+        "associated_id": notitie.associated_id,
+        "content": notitie.inhoud,
+        "timestamp": notitie.timestamp
+    }
+
+async def _get_notitie(db: AsyncSession, note_id: int) -> Notitie:
+    notitie = await db.get(Notitie, note_id)
+    if notitie is None:
+        raise HTTPException(status_code=404, detail="Notitie niet gevonden")
+    return notitie
+
+async def _get_own_notitie(db: AsyncSession, note_id: int, current_user: TokenUser) -> Notitie:
+    """The note, if the caller wrote it or is an admin; everyone reads the timeline, only the author changes it."""
+    notitie = await _get_notitie(db, note_id)
+    if notitie.user_id != current_user.id and not any(role.name == "admin" for role in current_user.roles):
+        raise HTTPException(status_code=403, detail="Alleen de auteur of een admin kan deze notitie wijzigen")
+    return notitie
 
 @router.get("/", response_model=List[Note])
-async def get_notes(current_user: dict = Depends(get_current_user)):
-    """Haal alle notities op."""
-    return fake_notes_db
+async def get_notes(
+    associated_type: Optional[str] = Query(None, description="Alleen notities bij dit type ('opdrachtgever' of 'medewerker')"),
+    associated_id: Optional[int] = Query(None, description="Alleen notities bij dit ID; vereist associated_type"),
+    before_id: Optional[int] = Query(None, description="Alleen notities van voor deze notitie (volgende pagina)"),
+    mine: bool = Query(False, description="Alleen eigen notities"),
+    limit: int = Query(NOTES_PAGE_SIZE, ge=1, le=NOTES_MAX_PAGE_SIZE),
+    current_user: TokenUser = Depends(get_token_user),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """
+    Haal notities op, nieuwste eerst, per pagina van `limit`. Geef het ID van de laatste
+    notitie als before_id mee voor de volgende pagina.
+    """
+    if associated_id is not None and associated_type is None:
+        raise HTTPException(status_code=400, detail="associated_id vereist associated_type")
+    query = select(Notitie).order_by(Notitie.id.desc()).limit(limit)
+    if associated_type is not None:
+        query = query.where(Notitie.associated_type == associated_type)
+    if associated_id is not None:
+        query = query.where(Notitie.associated_id == associated_id)
+    if mine:
+        query = query.where(Notitie.user_id == current_user.id)
+    if before_id is not None:
+        query = query.where(Notitie.id < before_id)
+    return [_to_note(notitie) for notitie in (await db.execute(query)).scalars()]
 
 @router.get("/{note_id}", response_model=Note)
-async def get_note(note_id: int, current_user: dict = Depends(get_current_user)):
+async def get_note(note_id: int, current_user: TokenUser = Depends(get_token_user), db: AsyncSession = Depends(get_async_db)):
     """Haal een specifieke notitie op via het ID."""
-    for note in fake_notes_db:
-        if note["id"] == note_id:
-            return note
-    raise HTTPException(status_code=404, detail="Notitie niet gevonden")
+    return _to_note(await _get_notitie(db, note_id))
 
 @router.post("/", response_model=Note, status_code=201)
-async def create_note(note: Note, current_user: dict = Depends(get_current_user)):
+async def create_note(note: Note, current_user: TokenUser = Depends(get_token_user), db: AsyncSession = Depends(get_async_db)):
     """Maak een nieuwe notitie aan."""
-    global next_note_id
-    note_dict = note.dict()
-    note_dict["id"] = next_note_id
-    # Als er geen timestamp is opgegeven, gebruik de huidige UTC-tijd
-    if note_dict.get("timestamp") is None:
-        note_dict["timestamp"] = datetime.utcnow()
-    next_note_id += 1
-    fake_notes_db.append(note_dict)
-    return note_dict
+    notitie = Notitie(
+        associated_type=note.associated_type,
+        associated_id=note.associated_id,
+        inhoud=note.content,
+        # Als er geen timestamp is opgegeven, gebruik de huidige UTC-tijd
+        timestamp=note.timestamp or datetime.utcnow(),
+        user_id=current_user.id
+    )
+    db.add(notitie)
+    await db.commit()
+    return _to_note(notitie)
 
 @router.put("/{note_id}", response_model=Note)
-async def update_note(note_id: int, note: Note, current_user: dict = Depends(get_current_user)):
-    """Werk een bestaande notitie bij."""
-    for idx, existing_note in enumerate(fake_notes_db):
-        if existing_note["id"] == note_id:
-            updated_note = note.dict()
-            updated_note["id"] = note_id  # Behoud het ID
-            fake_notes_db[idx] = updated_note
-            return updated_note
-    raise HTTPException(status_code=404, detail="Notitie niet gevonden")
+async def update_note(note_id: int, note: Note, current_user: TokenUser = Depends(get_token_user), db: AsyncSession = Depends(get_async_db)):
+    """Werk een eigen notitie bij (admins: elke notitie)."""
+    notitie = await _get_own_notitie(db, note_id, current_user)
+    notitie.associated_type = note.associated_type
+    notitie.associated_id = note.associated_id
+    notitie.inhoud = note.content
+    notitie.timestamp = note.timestamp or notitie.timestamp
+    await db.commit()
+    return _to_note(notitie)
 
 @router.delete("/{note_id}", response_model=Note)
-async def delete_note(note_id: int, current_user: dict = Depends(get_current_user)):
-    """Verwijder een notitie op basis van het ID."""
-    for idx, note in enumerate(fake_notes_db):
-        if note["id"] == note_id:
-            removed_note = fake_notes_db.pop(idx)
-            return removed_note
-    raise HTTPException(status_code=404, detail="Notitie niet gevonden")
+async def delete_note(note_id: int, current_user: TokenUser = Depends(get_token_user), db: AsyncSession = Depends(get_async_db)):
+    """Verwijder een eigen notitie op basis van het ID (admins: elke notitie)."""
+    notitie = await _get_own_notitie(db, note_id, current_user)
+    removed = _to_note(notitie)
+    await db.delete(notitie)
+    await db.commit()
+    return removed
@@ -0,0 +1,116 @@
+"""
+Revocation of issued JWTs.
+
+Access tokens carry the user's id and role names, so require_roles authorizes
+without a query. That needs a way to invalidate tokens early: when a user is
+deleted or renamed, their password is reset or their roles change, the code
+calls revoke_user_tokens(_async). All access and refresh tokens of that user
+issued before that moment are then rejected.
+
+Revocations are rows in token_revocations (one per user, the latest time
+wins) and an in-memory dict of user id -> revoked at, which is what the
+per-request check reads. Revocations made in this process apply as soon as the
+caller's transaction commits (not at all if it rolls back); those from other
+workers arrive with the reload every
+TOKEN_REVOCATION_RELOAD_SECONDS (default 30). Rows older than the refresh
+token lifetime are pruned: every token they could reject has expired anyway.
+"""
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Optional
+from sqlalchemy import delete, event, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+from config import REFRESH_TOKEN_EXPIRE_DAYS
+from database import AsyncSessionLocal
+from models import TokenRevocation
+import asyncio
+import logging
+import os
+import time
+
+logger = logging.getLogger(__name__)
+
+TOKEN_REVOCATION_RELOAD_SECONDS = float(os.getenv("TOKEN_REVOCATION_RELOAD_SECONDS", "30"))
+
+# user id -> epoch seconds; tokens of that user issued before it are revoked
+_revoked: Dict[int, float] = {}
+_task: Optional[asyncio.Task] = None
+
+
+def _epoch(moment: datetime) -> float:
+    return moment.replace(tzinfo=timezone.utc).timestamp()
+
+def is_revoked(user_id: Optional[int], issued_at: Optional[float]) -> bool:
+    """True for tokens of a revoked user issued before the revocation; no database access."""
+    if user_id is None or issued_at is None:
+        return False
+    revoked_at = _revoked.get(user_id)
+    return revoked_at is not None and issued_at <= revoked_at
+
+
+def _record(session: Session, user_id: int) -> TokenRevocation:
+    now = datetime.utcnow()
+    # Applied to _revoked by _apply_pending once the session commits
+    pending = session.info.setdefault("token_revocations", {})
+    pending[user_id] = max(pending.get(user_id, 0.0), _epoch(now))
+    return TokenRevocation(user_id=user_id, revoked_at=now)
+
+def revoke_user_tokens(db: Session, user_id: int) -> None:
+    """Revoke the user's tokens as part of the caller's transaction; the caller commits."""
+    db.merge(_record(db, user_id))
+
+async def revoke_user_tokens_async(db: AsyncSession, user_id: int) -> None:
+    await db.merge(_record(db.sync_session, user_id))
+
+@event.listens_for(Session, "after_commit")
+def _apply_pending(session: Session) -> None:
+    for user_id, revoked_at in session.info.pop("token_revocations", {}).items():
+        _revoked[user_id] = max(_revoked.get(user_id, 0.0), revoked_at)
+
+@event.listens_for(Session, "after_transaction_end")
+def _discard_pending(session: Session, transaction) -> None:
+    # Reached without after_commit only when the transaction rolled back or was closed
+    if transaction.parent is None:
+        session.info.pop("token_revocations", None)
+
+
+async def reload() -> None:
+    cutoff = datetime.utcnow() - timedelta(days=REFRESH_TOKEN_EXPIRE_DAYS)
+    async with AsyncSessionLocal() as db:
+        await db.execute(delete(TokenRevocation).where(TokenRevocation.revoked_at < cutoff))
+        rows = (await db.execute(select(TokenRevocation.user_id, TokenRevocation.revoked_at))).all()
+        await db.commit()
+    loaded = {user_id: _epoch(revoked_at) for user_id, revoked_at in rows}
+    # Keep recent local revocations: their transaction may have committed after the select
+    recent = time.time() - 2 * TOKEN_REVOCATION_RELOAD_SECONDS
+    for user_id, revoked_at in list(_revoked.items()):
+        if revoked_at > recent and revoked_at > loaded.get(user_id, 0.0):
+            loaded[user_id] = revoked_at
+    _revoked.clear()
+    _revoked.update(loaded)
+
+async def _reload_forever() -> None:
+    while True:
+        await asyncio.sleep(TOKEN_REVOCATION_RELOAD_SECONDS)
+        try:
+            await reload()
+        except Exception:
+            logger.exception("Reloading token revocations failed")
+
+async def start() -> None:
+    global _task
+    try:
+        await reload()
+    except Exception:
+        logger.exception("Loading token revocations failed; retrying in the background")
+    _task = asyncio.create_task(_reload_forever())
+
+async def stop() -> None:
+    global _task
+    if _task is not None:
+        _task.cancel()
+        try:
+            await _task
+        except asyncio.CancelledError:
+            pass
+        _task = None
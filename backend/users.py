@@ -5,6 +5,7 @@ from database import get_db
 from models import User, Role, Medewerker, ChatMessage
 from auth import get_current_user, UserResponse, UserBase, UserCreate, pwd_context
 from datetime import datetime
+from token_revocation import revoke_user_tokens
 import logging
 
 router = APIRouter(
@@ -20,12 +21,12 @@ async def get_current_user_info(current_user: User = Depends(get_current_user)):
     return current_user
 
 @router.get("/", response_model=List[UserResponse])
-async def get_users(current_user: dict = Depends(get_current_user), db: Session = Depends(get_db)):
+def get_users(current_user: dict = Depends(get_current_user), db: Session = Depends(get_db)):
     """Get all users. Only accessible for authenticated users."""
     return db.query(User).all()
 
 @router.get("/{user_id}", response_model=UserResponse)
-async def get_user_by_id(user_id: int, current_user: dict = Depends(get_current_user), db: Session = Depends(get_db)):
+def get_user_by_id(user_id: int, current_user: dict = Depends(get_current_user), db: Session = Depends(get_db)):
     """Get a specific user by ID."""
     user = db.query(User).filter(User.id == user_id).first()
     if not user:
@@ -33,7 +34,7 @@ async def get_user_by_id(user_id: int, current_user: dict = Depends(get_current_
     return user
 
 @router.put("/{user_id}", response_model=UserResponse)
-async def update_user(user_id: int, user_update: UserBase, current_user: dict = Depends(get_current_user), db: Session = Depends(get_db)):
+def update_user(user_id: int, user_update: UserBase, current_user: dict = Depends(get_current_user), db: Session = Depends(get_db)):
     """Update an existing user."""
     db_user = db.query(User).filter(User.id == user_id).first()
     if not db_user:
@@ -41,13 +42,15 @@ async def update_user(user_id: int, user_update: UserBase, current_user: dict =
     
     for key, value in user_update.dict(exclude_unset=True).items():
         setattr(db_user, key, value)
+    # Tokens name the user by username
+    revoke_user_tokens(db, db_user.id)
     
     db.commit()
     db.refresh(db_user)
     return db_user
 
 @router.delete("/{user_id}", response_model=UserResponse)
-async def delete_user(user_id: int, current_user: dict = Depends(get_current_user), db: Session = Depends(get_db)):
+def delete_user(user_id: int, current_user: dict = Depends(get_current_user), db: Session = Depends(get_db)):
     """Delete a user and their associated employee profile if it exists."""
     try:
         db_user = db.query(User).filter(User.id == user_id).first()
@@ -68,6 +71,7 @@ async def delete_user(user_id: int, current_user: dict = Depends(get_current_use
         
         # Delete the user
         db.delete(db_user)
+        revoke_user_tokens(db, db_user.id)
         db.commit()
         
         return db_user
@@ -77,7 +81,7 @@ async def delete_user(user_id: int, current_user: dict = Depends(get_current_use
         raise HTTPException(status_code=500, detail=f"Failed to delete user: {str(e)}")
 
 @router.post("/", response_model=UserResponse)
-async def create_user(user: UserCreate, current_user: dict = Depends(get_current_user), db: Session = Depends(get_db)):
+def create_user(user: UserCreate, current_user: dict = Depends(get_current_user), db: Session = Depends(get_db)):
     """Create a new user. Only accessible for admin users."""
     logger.info(f"Starting user creation process for username: {user.username}")
     try:
@@ -281,8 +281,8 @@ async def export_payroll_csv(
 
 # Nieuwe endpoints voor loonstrook uploaden en downloaden
 
+# Created by the first upload
 UPLOAD_DIR = os.path.join(os.path.dirname(__file__), "uploads", "loonstroken")
-os.makedirs(UPLOAD_DIR, exist_ok=True)
 
 
 @router.post("/upload", status_code=201)
@@ -294,6 +294,7 @@ async def upload_loonstrook(employee_id: str, file: UploadFile = File(...),
     Het bestand wordt opgeslagen in de map uploads/loonstroken met een naam als: {employee_id}_{original_filename}
     """
     filename = f"{employee_id}_{file.filename}"
+    os.makedirs(UPLOAD_DIR, exist_ok=True)
     file_path = os.path.join(UPLOAD_DIR, filename)
 
     with open(file_path, "wb") as buffer:
@@ -309,8 +310,7 @@ async def list_loonstroken(current_user: dict = Depends(require_roles(["admin",
     Retourneert een lijst van bestandsnamen.
     """
     try:
-        files = os.listdir(UPLOAD_DIR)
-        return files
+        return os.listdir(UPLOAD_DIR) if os.path.isdir(UPLOAD_DIR) else []
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -329,7 +329,7 @@ async def download_loonstroken(employee_id: str, current_user: dict = Depends(ge
     if current_user["role"] == "medewerker" and current_user["username"] != employee_id:
         raise HTTPException(status_code=403, detail="Je kunt alleen je eigen loonstroken downloaden.")
 
-    files = [f for f in os.listdir(UPLOAD_DIR) if f.startswith(f"{employee_id}_")]
+    files = [f for f in os.listdir(UPLOAD_DIR) if f.startswith(f"{employee_id}_")] if os.path.isdir(UPLOAD_DIR) else []
 
     if not files:
         raise HTTPException(status_code=404, detail="Geen loonstroken gevonden voor deze medewerker.")
@@ -377,7 +377,7 @@ class VerloningResponse(BaseModel):
 
 
 @router.get("/", response_model=List[VerloningResponse])
-async def get_verloningen(
+def get_verloningen(
     current_user: dict = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
@@ -395,7 +395,7 @@ async def get_verloningen(
 
 
 @router.post("/", response_model=VerloningResponse, status_code=201)
-async def create_verloning(
+def create_verloning(
     verloning: VerloningCreate,
     current_user: dict = Depends(require_roles(["admin", "boekhouding"])),
     db: Session = Depends(get_db)
@@ -419,7 +419,7 @@ async def create_verloning(
 
 
 @router.get("/{verloning_id}", response_model=VerloningResponse)
-async def get_verloning(
+def get_verloning(
     verloning_id: int,
     current_user: dict = Depends(get_current_user),
     db: Session = Depends(get_db)
@@ -440,7 +440,7 @@ async def get_verloning(
 
 
 @router.put("/{verloning_id}", response_model=VerloningResponse)
-async def update_verloning(
+def update_verloning(
     verloning_id: int,
     verloning_update: VerloningBase,
     current_user: dict = Depends(require_roles(["admin", "boekhouding"])),
@@ -468,7 +468,7 @@ async def update_verloning(
 
 
 @router.delete("/{verloning_id}")
-async def delete_verloning(
+def delete_verloning(
     verloning_id: int,
     current_user: dict = Depends(require_roles(["admin"])),
     db: Session = Depends(get_db)
@@ -0,0 +1,169 @@
+"""
+Outbound side of the websocket endpoints.
+
+Every accepted websocket gets a ClientConnection: a bounded queue of outgoing
+messages drained by its own writer task. Sending or broadcasting only puts the
+message on the queues, so one slow or dead client never holds up the others and
+a failing send does not abort a broadcast.
+
+- WS_QUEUE_SIZE (default 100): a client whose queue is full is a slow consumer.
+  It is disconnected with close code 1013 and the message counts as dropped.
+- WS_SEND_TIMEOUT_SECONDS (default 5): a single send that takes longer
+  disconnects the client as well.
+- WS_HEARTBEAT_SECONDS (default 25): hubs with a heartbeat message send it on
+  connections that were idle that long, so proxies keep them open and dead peers
+  surface as failed sends. Endpoints answer a client "ping" with "pong".
+
+Per hub, GET /metrics reports connected clients, total queue depth, dropped
+messages and evictions (see render_lines).
+"""
+from collections import Counter
+from typing import Any, Dict, List, Optional, Set
+from fastapi import WebSocket
+import asyncio
+import logging
+import os
+
+logger = logging.getLogger(__name__)
+
+WS_QUEUE_SIZE = int(os.getenv("WS_QUEUE_SIZE", "100"))
+WS_SEND_TIMEOUT_SECONDS = float(os.getenv("WS_SEND_TIMEOUT_SECONDS", "5"))
+WS_HEARTBEAT_SECONDS = float(os.getenv("WS_HEARTBEAT_SECONDS", "25"))
+
+# 1013 "Try Again Later": the client may reconnect, and should read faster
+SLOW_CONSUMER_CLOSE_CODE = 1013
+
+_hubs: List["WebSocketHub"] = []
+
+
+class ClientConnection:
+    def __init__(self, hub: "WebSocketHub", websocket: WebSocket):
+        self.hub = hub
+        self.websocket = websocket
+        self.queue: "asyncio.Queue[Any]" = asyncio.Queue(maxsize=WS_QUEUE_SIZE)
+        self.closed = False
+        self.writer = asyncio.create_task(self._write())
+
+    def enqueue(self, message: Any) -> bool:
+        """Queue a str (sent as text) or JSON-serializable value; False when it was dropped."""
+        if self.closed:
+            self.hub.dropped["closed"] += 1
+            return False
+        try:
+            self.queue.put_nowait(message)
+        except asyncio.QueueFull:
+            self.hub.dropped["queue_full"] += 1
+            self.hub.evict(self, "slow_consumer")
+            return False
+        return True
+
+    async def _next_message(self) -> Any:
+        if self.hub.heartbeat is None:
+            return await self.queue.get()
+        try:
+            return await asyncio.wait_for(self.queue.get(), timeout=WS_HEARTBEAT_SECONDS)
+        except asyncio.TimeoutError:
+            return self.hub.heartbeat
+
+    async def _write(self) -> None:
+        while True:
+            message = await self._next_message()
+            if isinstance(message, str):
+                send = self.websocket.send_text(message)
+            else:
+                send = self.websocket.send_json(message)
+            try:
+                await asyncio.wait_for(send, timeout=WS_SEND_TIMEOUT_SECONDS)
+            except asyncio.TimeoutError:
+                self.hub.dropped["send_timeout"] += 1 + self.queue.qsize()
+                self.hub.evict(self, "send_timeout")
+                return
+            except Exception:
+                # The peer went away; the endpoint's receive loop sees the disconnect too
+                self.hub.dropped["closed"] += 1 + self.queue.qsize()
+                self.hub.remove(self)
+                return
+            self.hub.sent += 1
+
+    def stop(self) -> None:
+        self.closed = True
+        if self.writer is not asyncio.current_task():
+            self.writer.cancel()
+
+
+class WebSocketHub:
+    """
+    The connections of one websocket endpoint in this process. `heartbeat` is sent on idle
+    connections; leave it None for clients that would show it to the user.
+    """
+
+    def __init__(self, name: str, heartbeat: Optional[Any] = None):
+        self.name = name
+        self.heartbeat = heartbeat
+        self.clients: Dict[WebSocket, ClientConnection] = {}
+        self.sent = 0
+        self.dropped: Counter = Counter()
+        self.evictions: Counter = Counter()
+        self._closing: Set[asyncio.Task] = set()
+        _hubs.append(self)
+
+    async def accept(self, websocket: WebSocket) -> None:
+        await websocket.accept()
+        self.clients[websocket] = ClientConnection(self, websocket)
+
+    def disconnect(self, websocket: WebSocket) -> None:
+        client = self.clients.get(websocket)
+        if client is not None:
+            self.remove(client)
+
+    def send(self, websocket: WebSocket, message: Any) -> bool:
+        client = self.clients.get(websocket)
+        if client is None:
+            self.dropped["closed"] += 1
+            return False
+        return client.enqueue(message)
+
+    def broadcast(self, message: Any) -> int:
+        """Queue the message for every client; returns how many accepted it."""
+        return sum(client.enqueue(message) for client in list(self.clients.values()))
+
+    def remove(self, client: ClientConnection) -> None:
+        if self.clients.get(client.websocket) is client:
+            del self.clients[client.websocket]
+        client.stop()
+
+    def evict(self, client: ClientConnection, reason: str) -> None:
+        if client.closed:
+            return
+        logger.warning("Disconnecting %s websocket client: %s", self.name, reason)
+        self.evictions[reason] += 1
+        self.remove(client)
+        task = asyncio.create_task(self._close(client.websocket))
+        self._closing.add(task)
+        task.add_done_callback(self._closing.discard)
+
+    async def _close(self, websocket: WebSocket) -> None:
+        try:
+            await asyncio.wait_for(websocket.close(code=SLOW_CONSUMER_CLOSE_CODE), timeout=WS_SEND_TIMEOUT_SECONDS)
+        except Exception:
+            logger.debug("Closing evicted %s websocket failed", self.name, exc_info=True)
+
+    def queue_depth(self) -> int:
+        return sum(client.queue.qsize() for client in list(self.clients.values()))
+
+
+def render_lines() -> List[str]:
+    """Prometheus lines for every hub, appended to GET /metrics."""
+    lines = ["# TYPE websocket_connections gauge"]
+    lines += [f'websocket_connections{{hub="{hub.name}"}} {len(hub.clients)}' for hub in _hubs]
+    lines.append("# TYPE websocket_queue_depth gauge")
+    lines += [f'websocket_queue_depth{{hub="{hub.name}"}} {hub.queue_depth()}' for hub in _hubs]
+    lines.append("# TYPE websocket_messages_sent_total counter")
+    lines += [f'websocket_messages_sent_total{{hub="{hub.name}"}} {hub.sent}' for hub in _hubs]
+    lines.append("# TYPE websocket_messages_dropped_total counter")
+    lines += [f'websocket_messages_dropped_total{{hub="{hub.name}",reason="{reason}"}} {count}'
+              for hub in _hubs for reason, count in sorted(hub.dropped.items())]
+    lines.append("# TYPE websocket_evictions_total counter")
+    lines += [f'websocket_evictions_total{{hub="{hub.name}",reason="{reason}"}} {count}'
+              for hub in _hubs for reason, count in sorted(hub.evictions.items())]
+    return lines
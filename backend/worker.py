@@ -0,0 +1,99 @@
+"""
+Job worker: the only process that runs periodic jobs.
+
+The API never schedules anything; run this next to it (see docker-compose.yml):
+
+    python worker.py
+
+Jobs are kept in the database (apscheduler_jobs) and only the elected leader
+runs a scheduler, so each job fires once no matter how many workers run.
+"""
+from apscheduler.jobstores.sqlalchemy import SQLAlchemyJobStore
+from apscheduler.schedulers.background import BackgroundScheduler
+from apscheduler.triggers.cron import CronTrigger
+from database import engine
+from leader_election import LeaderLock
+from logging_config import configure_logging
+from betalingsherinneringen import send_payment_reminders
+from invoice_generation_weekly import generate_weekly_invoices, process_dirty_invoice_periods
+from scheduler import process_invoices, generate_weekly_invoices as generate_weekly_payroll_invoices
+from job_telemetry import prune_job_runs
+from shift_claims import run_claim_window_job
+from shift_lifecycle import run_lifecycle_job
+import logging
+import os
+import time
+
+logger = logging.getLogger(__name__)
+
+# How often a standby tries to take over, and how often the leader confirms it still holds the lock
+LEADER_POLL_SECONDS = int(os.getenv("WORKER_LEADER_POLL_SECONDS", "15"))
+
+
+def register_jobs(scheduler: BackgroundScheduler) -> None:
+    """All periodic jobs, with fixed ids so the persisted job store is updated instead of duplicated."""
+    scheduler.add_job(process_invoices, 'interval', seconds=10, id='process_invoices', replace_existing=True)
+    scheduler.add_job(send_payment_reminders, CronTrigger(hour=9, minute=0),
+                      id='payment_reminders', replace_existing=True)
+    scheduler.add_job(generate_weekly_invoices, CronTrigger(day_of_week='mon', hour=9, minute=0),
+                      id='weekly_invoice_generation', replace_existing=True)
+    scheduler.add_job(generate_weekly_payroll_invoices, CronTrigger(day_of_week='mon', hour=9, minute=0),
+                      id='weekly_payroll_invoices', replace_existing=True)
+    # Weeks that received completed shifts after they were invoiced (marked by the shift lifecycle job)
+    scheduler.add_job(process_dirty_invoice_periods, CronTrigger(hour=6, minute=0),
+                      id='dirty_invoice_periods', replace_existing=True)
+    # Approved shifts whose end time has passed -> completed (set-based, idempotent)
+    scheduler.add_job(run_lifecycle_job, 'interval', minutes=5, id='shift_lifecycle', replace_existing=True)
+    # Telemetry retention (JOB_RUN_RETENTION_DAYS)
+    scheduler.add_job(prune_job_runs, CronTrigger(hour=3, minute=30), id='prune_job_runs', replace_existing=True)
+    # Closed claim windows -> award the shift to the strongest claim (no-op with CLAIM_WINDOW_SECONDS=0)
+    scheduler.add_job(run_claim_window_job, 'interval', seconds=5, id='claim_windows', replace_existing=True)
+
+
+def build_scheduler() -> BackgroundScheduler:
+    scheduler = BackgroundScheduler(
+        jobstores={'default': SQLAlchemyJobStore(engine=engine, tablename='apscheduler_jobs')},
+        timezone='Europe/Amsterdam',
+        job_defaults={
+            'coalesce': True,
+            'max_instances': 1,
+            'misfire_grace_time': 300
+        }
+    )
+    register_jobs(scheduler)
+    return scheduler
+
+
+def main():
+    lock = LeaderLock(engine)
+    scheduler = None
+    logger.info(f"Job worker started as {lock.holder}, waiting for leadership...")
+    try:
+        while True:
+            if scheduler is None:
+                if lock.try_acquire():
+                    scheduler = build_scheduler()
+                    scheduler.start()
+                    logger.info("Leadership acquired, scheduler started")
+                    for job in scheduler.get_jobs():
+                        logger.info(f"Job {job.id}: next run at {job.next_run_time}")
+            elif not lock.renew():
+                logger.warning("Leadership lost, stopping scheduler and waiting for running jobs")
+                # Let running jobs finish before the lock or lease is given up, so a new leader
+                # cannot start the same job while this one is still running it
+                scheduler.shutdown(wait=True)
+                scheduler = None
+                lock.release()
+            time.sleep(LEADER_POLL_SECONDS)
+    except (KeyboardInterrupt, SystemExit):
+        logger.info("Received shutdown signal")
+    finally:
+        if scheduler is not None:
+            scheduler.shutdown()
+        lock.release()
+        logger.info("Job worker stopped")
+
+
+if __name__ == "__main__":
+    configure_logging()
+    main()